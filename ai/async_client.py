@@ -0,0 +1,299 @@
+"""
+Async Gemini Client Module
+
+This module provides an asyncio-based client for a real language model backend.
+Requests go through a pluggable transport, run with bounded concurrency, a
+per-request timeout and retries with exponential backoff, and fall back to the
+keyword heuristics of GeminiAIClient when the backend cannot answer in time.
+BackgroundLoop keeps one event loop alive on a thread, so synchronous callers
+such as Streamlit reruns reuse the client's pooled connections.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import random
+import threading
+
+from ai.gemini_integration import GeminiAIClient
+from ai.response_cache import make_key
+
+# Environment variable naming the backend as host:port; unset means in-process heuristics
+BACKEND_ENV = "GEMINI_BACKEND"
+
+# Seconds an interactive check-in waits for the backend before the heuristics answer
+CHECK_IN_DEADLINE = 3.0
+
+class TransportError(Exception):
+    """A backend request failed"""
+
+    def __init__(self, message, retryable=True):
+        """Initialize the error; retryable errors are retried with backoff"""
+        super().__init__(message)
+        self.retryable = retryable
+
+class LocalTransport:
+    """Transport answering requests in-process with GeminiAIClient heuristics"""
+
+    def __init__(self, client=None, journal_batcher=None):
+        """Initialize the transport over a synchronous client
+
+        journal_batcher: optional MicroBatcher that journal analyses are routed through
+        """
+        self.client = client or GeminiAIClient()
+        self.journal_batcher = journal_batcher
+
+    async def request(self, operation, payload):
+        """Call the synchronous client method named by operation"""
+        if operation == "analyze_journal_entry" and self.journal_batcher is not None:
+            return await asyncio.wrap_future(self.journal_batcher.submit(payload["journal_text"]))
+        return getattr(self.client, operation)(**payload)
+
+    async def close(self):
+        """Nothing to release"""
+
+class HTTPTransport:
+    """JSON-over-HTTP/1.1 transport with a pool of keep-alive connections
+
+    Each operation is sent as `POST {path_prefix}/{operation}` with the payload
+    as a JSON body; the response body is a JSON object whose "result" is returned.
+    """
+
+    def __init__(self, host, port, path_prefix="/v1", pool_size=8, headers=None):
+        """Initialize the transport; connections are opened on demand"""
+        self.host = host
+        self.port = port
+        self.path_prefix = path_prefix.rstrip("/")
+        self.pool_size = pool_size
+        self.headers = dict(headers or {})
+        self._idle = []
+        self._loop = None
+
+    async def _connect(self):
+        """Get an idle connection or open a new one"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Streams belong to the loop that opened them, so a new loop cannot reuse them
+            stale, self._idle = self._idle, []
+            for _, writer in stale:
+                try:
+                    writer.close()
+                except RuntimeError:
+                    # Their loop is already closed; the sockets are released with the streams
+                    pass
+            self._loop = loop
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return await asyncio.open_connection(self.host, self.port)
+
+    def _release(self, reader, writer, keep_alive):
+        """Return a connection to the pool, or close it"""
+        if keep_alive and len(self._idle) < self.pool_size and not writer.is_closing():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    async def request(self, operation, payload):
+        """Send one request and decode its JSON result"""
+        body = json.dumps(payload).encode("utf-8")
+        head = [
+            f"POST {self.path_prefix}/{operation} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive"
+        ]
+        head.extend(f"{name}: {value}" for name, value in self.headers.items())
+        message = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+        try:
+            reader, writer = await self._connect()
+        except OSError as error:
+            raise TransportError(f"{operation}: {error}") from error
+        try:
+            writer.write(message)
+            await writer.drain()
+            status, headers, response = await self._read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as error:
+            writer.close()
+            raise TransportError(f"{operation}: {error}") from error
+        except BaseException:
+            # Cancelled (e.g. by a timeout) mid-response: the connection is unusable
+            writer.close()
+            raise
+
+        self._release(reader, writer, headers.get("connection", "").lower() != "close")
+        if status >= 400:
+            raise TransportError(f"{operation}: HTTP {status}", retryable=status >= 500 or status == 429)
+        try:
+            return json.loads(response)["result"]
+        except (ValueError, KeyError) as error:
+            raise TransportError(f"{operation}: malformed response", retryable=False) from error
+
+    async def _read_response(self, reader):
+        """Read a status line, headers and a Content-Length body"""
+        status_line = await reader.readuntil(b"\r\n")
+        parts = status_line.decode("latin-1").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ValueError(f"bad status line {status_line!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return status, headers, body
+
+    async def close(self):
+        """Close every pooled connection"""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+class AsyncGeminiClient:
+    """Asynchronous client with the same operations as GeminiAIClient"""
+
+    def __init__(self, transport=None, fallback=None, max_concurrency=8, timeout=10.0,
+                 retries=2, backoff=0.25, cache=None):
+        """Initialize the client
+
+        transport: object with `async request(operation, payload)`; defaults to LocalTransport
+        fallback: synchronous client used when the backend fails; defaults to GeminiAIClient
+        cache: optional ResponseCache of backend results
+        """
+        self.cache = cache
+        self.fallback = fallback or GeminiAIClient()
+        self.transport = transport or LocalTransport(self.fallback)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.fallback_count = 0
+        self._semaphore = None
+        self._loop = None
+
+    def _limiter(self):
+        """Get the concurrency semaphore of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _call(self, operation, payload):
+        """Call the backend with timeout and retries, falling back to heuristics"""
+        if self.cache is not None:
+            key = make_key(operation, payload)
+            missing = object()
+            cached = self.cache.get(key, missing)
+            if cached is not missing:
+                return cached
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._limiter():
+                    result = await asyncio.wait_for(self.transport.request(operation, payload), self.timeout)
+                # Fallback results are not cached, so a recovered backend is used again
+                if self.cache is not None:
+                    self.cache.put(key, result)
+                return result
+            except asyncio.TimeoutError:
+                pass
+            except TransportError as error:
+                if not error.retryable:
+                    break
+            if attempt < self.retries:
+                # Exponential backoff with jitter so retries do not arrive in lockstep
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+        self.fallback_count += 1
+        return getattr(self.fallback, operation)(**payload)
+
+    async def analyze_journal_entry(self, journal_text):
+        """Analyze a journal entry to identify emotions and concerns"""
+        return await self._call("analyze_journal_entry", {"journal_text": journal_text})
+
+    async def generate_coping_response(self, mood_rating, concerns, journal_text):
+        """Generate a personalized coping response"""
+        return await self._call("generate_coping_response", {
+            "mood_rating": mood_rating,
+            "concerns": list(concerns),
+            "journal_text": journal_text
+        })
+
+    async def analyze_assessment_results(self, assessment_type, score, level):
+        """Analyze assessment results and provide recommendations"""
+        return await self._call("analyze_assessment_results", {
+            "assessment_type": assessment_type,
+            "score": score,
+            "level": level
+        })
+
+    async def check_in(self, mood_rating, concerns, journal_text, deadline=None):
+        """Run the journal analysis and the coping response of a check-in concurrently
+
+        deadline: total seconds to wait, retries included, before the heuristics answer
+        Returns (analysis or None without journal text, response).
+        """
+        try:
+            return await asyncio.wait_for(self._check_in(mood_rating, concerns, journal_text), deadline)
+        except asyncio.TimeoutError:
+            self.fallback_count += 1
+            analysis = self.fallback.analyze_journal_entry(journal_text) if journal_text else None
+            return analysis, self.fallback.generate_coping_response(mood_rating, list(concerns), journal_text)
+
+    async def _check_in(self, mood_rating, concerns, journal_text):
+        """Both calls of a check-in, without an overall deadline"""
+        response = self.generate_coping_response(mood_rating, concerns, journal_text)
+        if not journal_text:
+            return None, await response
+        return tuple(await asyncio.gather(self.analyze_journal_entry(journal_text), response))
+
+    async def close(self):
+        """Release the transport's connections"""
+        await self.transport.close()
+
+class BackgroundLoop:
+    """Event loop running on a daemon thread, for calling async clients from synchronous code"""
+
+    def __init__(self, name="async-client-loop"):
+        """Start the loop and its thread"""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the loop and wait for its result; it is cancelled on timeout"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Stop the loop and wait for its thread"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+# Create a client for the backend configured in the environment
+def client_from_environment(fallback=None, cache=None, journal_batcher=None):
+    """Create an AsyncGeminiClient for $GEMINI_BACKEND, or an in-process one if unset"""
+    backend = os.getenv(BACKEND_ENV)
+    if not backend:
+        fallback = fallback or GeminiAIClient()
+        transport = LocalTransport(fallback, journal_batcher)
+        return AsyncGeminiClient(transport, fallback=fallback, cache=cache)
+    host, _, port = backend.rpartition(":")
+    return AsyncGeminiClient(HTTPTransport(host or "127.0.0.1", int(port)), fallback=fallback, cache=cache)
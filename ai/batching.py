@@ -0,0 +1,133 @@
+"""
+Batching Module
+
+This module provides a micro-batching scheduler in front of GeminiAIClient.
+Journal analysis requests arriving within a short window are collected,
+identical texts are de-duplicated, the batch is sent as one
+analyze_journal_entries call and each result is handed back to its caller.
+"""
+
+import copy
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+# Hand a result or error to one waiting caller
+def _deliver(future, result=None, error=None):
+    """Resolve a future, ignoring one that is already done so the worker keeps running"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+class MicroBatcher:
+    """Collects analyze_journal_entry requests into batched client calls"""
+
+    def __init__(self, client, max_batch_size=64, max_wait_ms=20):
+        """Initialize the batcher
+
+        client: object with analyze_journal_entries(texts) returning one result per text
+        max_batch_size: most distinct texts sent in one call
+        max_wait_ms: longest time the first request of a batch waits for company
+        """
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Pending requests: text -> futures waiting for its result, in arrival order
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._worker = None
+        self._closed = False
+        self.requests = 0
+        self.batches = 0
+        self.texts_sent = 0
+
+    def submit(self, journal_text):
+        """Queue a journal text for analysis; returns a Future of the result"""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.setdefault(journal_text, []).append(future)
+            self.requests += 1
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="journal-batcher", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+        return future
+
+    def analyze_journal_entry(self, journal_text, timeout=None):
+        """Analyze a journal entry through the batcher, blocking until its batch is done"""
+        return self.submit(journal_text).result(timeout)
+
+    def _next_batch(self):
+        """Wait for requests and take up to max_batch_size distinct texts"""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+
+            # The first request waits at most max_wait for the batch to fill
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            texts = list(self._pending)[:self.max_batch_size]
+            batch = []
+            for text in texts:
+                # Callers that gave up (cancelled their future) are skipped; the
+                # rest can no longer be cancelled once their text is sent
+                futures = [future for future in self._pending.pop(text) if future.set_running_or_notify_cancel()]
+                if futures:
+                    batch.append((text, futures))
+            return batch
+
+    def _run(self):
+        """Send batches until the batcher is closed and drained"""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                results = self.client.analyze_journal_entries(texts)
+            except Exception as error:
+                for _, futures in batch:
+                    for future in futures:
+                        _deliver(future, error=error)
+                continue
+
+            self.batches += 1
+            self.texts_sent += len(texts)
+            for (_, futures), result in zip(batch, results):
+                # Callers waiting on the same text each get their own copy
+                _deliver(futures[0], result)
+                for future in futures[1:]:
+                    _deliver(future, copy.deepcopy(result))
+
+    def close(self):
+        """Stop accepting requests, finish pending ones and stop the worker"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+
+    def stats(self):
+        """Get request, batch and de-duplication counts"""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts_sent": self.texts_sent,
+            "average_batch_size": self.texts_sent / self.batches if self.batches else 0.0
+        }
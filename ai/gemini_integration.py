@@ -7,58 +7,37 @@ This module provides integration with Google's Gemini AI for the Mental Health S
 import os
 import json
 
+from ai.journal_analyzer import default_analyzer
+from ai.response_cache import cached_operation, make_key
+from monitoring.instrumentation import timed
+
 # In a real implementation, we would use the google-generativeai library
 # For simplicity and to avoid API key requirements, we'll simulate the responses
 
 class GeminiAIClient:
     """Client for interacting with Gemini AI"""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, journal_analyzer=None, cache=None):
         """Initialize the Gemini AI client"""
         # In a real implementation, we would use the API key
         # self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         # self.genai = google.generativeai.GenerativeModel('gemini-pro')
-        pass
+        self.journal_analyzer = journal_analyzer or default_analyzer
+        # Optional ResponseCache for the results of model calls
+        self.cache = cache
     
+    @timed("gemini.analyze_journal_entry")
+    @cached_operation
     def analyze_journal_entry(self, journal_text):
         """
         Analyze a journal entry to identify emotions and concerns
         
         In a real implementation, this would call the Gemini API
         """
-        # Simulate AI analysis of journal text
-        emotions = []
-        concerns = []
-        
-        # Simple keyword-based analysis (in real app, this would use Gemini AI)
-        if "stress" in journal_text.lower() or "overwhelm" in journal_text.lower():
-            emotions.append("stressed")
-            concerns.append("stress")
-        
-        if "anxious" in journal_text.lower() or "worry" in journal_text.lower() or "nervous" in journal_text.lower():
-            emotions.append("anxious")
-            concerns.append("anxiety")
-        
-        if "sad" in journal_text.lower() or "down" in journal_text.lower() or "depress" in journal_text.lower():
-            emotions.append("sad")
-            concerns.append("depression")
-        
-        if "tired" in journal_text.lower() or "exhaust" in journal_text.lower() or "sleep" in journal_text.lower():
-            emotions.append("tired")
-            concerns.append("sleep")
-        
-        if "focus" in journal_text.lower() or "concentrat" in journal_text.lower():
-            concerns.append("concentration")
-        
-        if "motivat" in journal_text.lower() or "energy" in journal_text.lower():
-            concerns.append("motivation")
-        
-        if "friend" in journal_text.lower() or "social" in journal_text.lower() or "alone" in journal_text.lower():
-            concerns.append("social")
-        
-        # If no emotions detected, add a neutral one
-        if not emotions:
-            emotions.append("neutral")
+        # Keyword-based analysis (in real app, this would use Gemini AI)
+        analysis = self.journal_analyzer.analyze(journal_text)
+        emotions = analysis["emotions"]
+        concerns = analysis["concerns"]
         
         return {
             "emotions": emotions,
@@ -66,6 +45,30 @@ class GeminiAIClient:
             "summary": self._generate_summary(journal_text, emotions, concerns)
         }
     
+    @timed("gemini.analyze_journal_entries")
+    def analyze_journal_entries(self, journal_texts):
+        """Analyze many journal entries, e.g. to re-analyze a corpus after lexicon updates"""
+        journal_texts = list(journal_texts)
+        analyses = [None] * len(journal_texts)
+        
+        # Serve what the cache has; analyze only the rest, in one batch
+        missing = list(range(len(journal_texts)))
+        if self.cache is not None:
+            keys = [make_key("analyze_journal_entry", {"journal_text": text}) for text in journal_texts]
+            missing = []
+            for i, key in enumerate(keys):
+                analyses[i] = self.cache.get(key)
+                if analyses[i] is None:
+                    missing.append(i)
+        
+        computed = self.journal_analyzer.analyze_many([journal_texts[i] for i in missing])
+        for i, analysis in zip(missing, computed):
+            analysis["summary"] = self._generate_summary(journal_texts[i], analysis["emotions"], analysis["concerns"])
+            analyses[i] = analysis
+            if self.cache is not None:
+                self.cache.put(keys[i], analysis)
+        return analyses
+    
     def _generate_summary(self, journal_text, emotions, concerns):
         """Generate a summary of the journal entry"""
         # In a real implementation, this would use Gemini to generate a personalized summary
@@ -80,6 +83,8 @@ class GeminiAIClient:
         else:
             return "Thank you for sharing your thoughts."
     
+    @timed("gemini.generate_coping_response")
+    @cached_operation
     def generate_coping_response(self, mood_rating, concerns, journal_text):
         """Generate a personalized coping response"""
         # In a real implementation, this would use Gemini to generate a personalized response
@@ -109,6 +114,8 @@ class GeminiAIClient:
         
         return response
     
+    @timed("gemini.analyze_assessment_results")
+    @cached_operation
     def analyze_assessment_results(self, assessment_type, score, level):
         """Analyze assessment results and provide recommendations"""
         # In a real implementation, this would use Gemini to generate personalized recommendations
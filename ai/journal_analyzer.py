@@ -0,0 +1,89 @@
+"""
+Journal Analyzer Module
+
+This module provides the keyword analysis behind GeminiAIClient.analyze_journal_entry.
+The keyword rules are a declarative lexicon compiled once into a flat keyword
+table, so each journal entry is lowercased once and every keyword is looked up
+at most once, skipping keywords of rules that already matched.
+"""
+
+# Keyword rules in reporting order: any keyword (matched as a lowercase
+# substring) adds the rule's emotion, if any, and its concern
+JOURNAL_LEXICON = (
+    {"keywords": ("stress", "overwhelm"), "emotion": "stressed", "concern": "stress"},
+    {"keywords": ("anxious", "worry", "nervous"), "emotion": "anxious", "concern": "anxiety"},
+    {"keywords": ("sad", "down", "depress"), "emotion": "sad", "concern": "depression"},
+    {"keywords": ("tired", "exhaust", "sleep"), "emotion": "tired", "concern": "sleep"},
+    {"keywords": ("focus", "concentrat"), "emotion": None, "concern": "concentration"},
+    {"keywords": ("motivat", "energy"), "emotion": None, "concern": "motivation"},
+    {"keywords": ("friend", "social", "alone"), "emotion": None, "concern": "social"}
+)
+
+# Emotion reported when no rule with an emotion matches
+DEFAULT_EMOTION = "neutral"
+
+class JournalAnalyzer:
+    """Keyword analyzer compiled from a lexicon"""
+
+    def __init__(self, lexicon=JOURNAL_LEXICON, default_emotion=DEFAULT_EMOTION):
+        """Compile the lexicon into a keyword table"""
+        self.lexicon = tuple(lexicon)
+        self.default_emotion = default_emotion
+
+        # (keyword, rule bit) pairs in lexicon order; a keyword listed by
+        # several rules is searched once and sets all of their bits
+        keyword_rules = {}
+        for i, rule in enumerate(self.lexicon):
+            for keyword in rule["keywords"]:
+                keyword = keyword.lower()
+                keyword_rules[keyword] = keyword_rules.get(keyword, 0) | (1 << i)
+        self._keywords = tuple(keyword_rules.items())
+
+        # Rule bitmask -> (emotions, concerns)
+        self._results = {}
+
+    def _matched_rules(self, journal_text):
+        """Get the bitmask of rules whose keywords occur in the text"""
+        text = journal_text.lower()
+        rules = 0
+        for keyword, keyword_rules in self._keywords:
+            # Substring search runs in C; skip it once all the keyword's rules matched
+            if keyword_rules & ~rules and keyword in text:
+                rules |= keyword_rules
+        return rules
+
+    def _result(self, rules):
+        """Get the emotions and concerns for a rule bitmask"""
+        result = self._results.get(rules)
+        if result is None:
+            emotions = []
+            concerns = []
+            for i, rule in enumerate(self.lexicon):
+                if rules >> i & 1:
+                    if rule["emotion"]:
+                        emotions.append(rule["emotion"])
+                    concerns.append(rule["concern"])
+            if not emotions:
+                emotions.append(self.default_emotion)
+            result = self._results[rules] = (tuple(emotions), tuple(concerns))
+        return result
+
+    def analyze(self, journal_text):
+        """Analyze one journal entry into emotions and concerns"""
+        emotions, concerns = self._result(self._matched_rules(journal_text))
+        return {"emotions": list(emotions), "concerns": list(concerns)}
+
+    def analyze_many(self, journal_texts):
+        """Analyze many journal entries, scanning each distinct text once"""
+        scanned = {}
+        results = []
+        for journal_text in journal_texts:
+            rules = scanned.get(journal_text)
+            if rules is None:
+                rules = scanned[journal_text] = self._matched_rules(journal_text)
+            emotions, concerns = self._result(rules)
+            results.append({"emotions": list(emotions), "concerns": list(concerns)})
+        return results
+
+# Analyzer for the default lexicon, compiled once
+default_analyzer = JournalAnalyzer()
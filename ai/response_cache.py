@@ -0,0 +1,195 @@
+"""
+Response Cache Module
+
+This module provides a size-bounded LRU cache with time-to-live expiry for the
+results of AI calls. Entries are keyed by a hash of the operation and its
+normalized arguments, can be persisted to disk so a restarted server keeps warm
+results, and hit/miss/eviction counts are tracked for monitoring.
+"""
+
+import atexit
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Arguments each operation's result depends on; others are left out of the key
+CACHE_KEY_ARGUMENTS = {
+    "analyze_journal_entry": ("journal_text",),
+    "generate_coping_response": ("mood_rating", "concerns", "journal_text"),
+    "analyze_assessment_results": ("assessment_type", "level")
+}
+
+_whitespace = re.compile(r"\s+")
+
+# Normalize an argument so trivially different inputs share a cache entry
+def normalize_argument(value):
+    """Collapse whitespace in strings, recursively through lists and tuples"""
+    if isinstance(value, str):
+        return _whitespace.sub(" ", value).strip()
+    if isinstance(value, (list, tuple)):
+        return [normalize_argument(item) for item in value]
+    return value
+
+# Check that a persisted expiry is a real timestamp
+def _is_timestamp(value):
+    """Whether a value loaded from JSON is a number usable as an expiry time"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Compute the cache key of an operation call
+def make_key(operation, arguments):
+    """Get the content hash of an operation and its normalized key arguments"""
+    names = CACHE_KEY_ARGUMENTS.get(operation, tuple(sorted(arguments)))
+    normalized = [operation] + [normalize_argument(arguments.get(name)) for name in names]
+    encoded = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Thread-safe LRU cache with TTL expiry and optional persistence"""
+
+    def __init__(self, maxsize=1024, ttl=None, path=None):
+        """Initialize the cache
+
+        maxsize: number of entries kept; the least recently used one is evicted
+        ttl: seconds an entry stays valid, or None to never expire
+        path: JSON file the cache is loaded from and saved to on exit
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        # key -> (expiry wall-clock time or None, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    def __len__(self):
+        """Get the number of cached entries"""
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Get a copy of a cached value, or default on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        # Callers may mutate results, so never hand out the cached object itself
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """Cache a copy of a value, evicting the least recently used entries"""
+        expiry = time.time() + self.ttl if self.ttl is not None else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, operation, arguments, compute):
+        """Get the cached result of an operation call, computing and caching it on a miss"""
+        key = make_key(operation, arguments)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get hit/miss/eviction counts and the hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def save(self, path=None):
+        """Write unexpired entries to a JSON file atomically"""
+        path = path or self.path
+        if path is None:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [
+                [key, expiry, value] for key, (expiry, value) in self._entries.items()
+                if expiry is None or expiry > now
+            ]
+        temporary = path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"entries": entries}, file)
+        os.replace(temporary, path)
+
+    def load(self, path=None):
+        """Load unexpired entries from a JSON file, if it exists"""
+        path = path or self.path
+        if path is None or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as file:
+                entries = json.load(file)["entries"]
+            entries = list(entries)
+        except (OSError, ValueError, KeyError, TypeError):
+            # A damaged cache file only costs warm entries
+            return
+        now = time.time()
+        with self._lock:
+            for row in entries:
+                try:
+                    key, expiry, value = row
+                    if not isinstance(key, str) or not (expiry is None or _is_timestamp(expiry)):
+                        raise TypeError(f"Invalid cache entry: {row!r}")
+                except (ValueError, TypeError):
+                    # Skip damaged rows and keep the rest
+                    continue
+                if expiry is None or expiry > now:
+                    self._entries[key] = (expiry, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+# Decorator caching a client method in the client's `cache` attribute
+def cached_operation(method):
+    """Serve a client method from self.cache (a ResponseCache) when one is set"""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = getattr(self, "cache", None)
+        if cache is None:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        return cache.get_or_compute(method.__name__, bound.arguments, lambda: method(self, *args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,169 @@
+"""
+Stub Server Module
+
+This module provides a local HTTP stand-in for the language model backend used by
+AsyncGeminiClient. It answers with the keyword heuristics of GeminiAIClient after
+a configurable latency, and can inject failures, for tests and latency benchmarks.
+
+Run `python -m ai.stub_server --latency 0.2` to serve, or add `--benchmark 200`
+to measure check-in latency through AsyncGeminiClient against it.
+"""
+
+import asyncio
+import json
+import random
+import time
+
+from ai.gemini_integration import GeminiAIClient
+
+# Operations the stub answers, all methods of GeminiAIClient
+OPERATIONS = ("analyze_journal_entry", "generate_coping_response", "analyze_assessment_results")
+
+class StubServer:
+    """Keep-alive HTTP/1.1 server answering POST /v1/<operation> requests"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0, path_prefix="/v1"):
+        """Initialize the server; port 0 picks a free port on start"""
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.path_prefix = path_prefix.rstrip("/")
+        self.client = GeminiAIClient()
+        self.requests = 0
+        self.connections = 0
+        self._server = None
+        self._handlers = set()
+
+    async def start(self):
+        """Start listening; returns the server for use as an async context"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop listening, close open connections and wait for their handlers"""
+        if self._server is not None:
+            self._server.close()
+            for writer in [handler[1] for handler in self._handlers]:
+                writer.close()
+            await asyncio.gather(*(handler[0] for handler in list(self._handlers)), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        """Start the server"""
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        """Stop the server"""
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        self.connections += 1
+        handler = (asyncio.current_task(), writer)
+        self._handlers.add(handler)
+        try:
+            while True:
+                try:
+                    request_line = await reader.readuntil(b"\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readuntil(b"\r\n")
+                    if line == b"\r\n":
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, result = await self._respond(method, path, body)
+                payload = json.dumps(result).encode("utf-8")
+                writer.write((
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    "Connection: keep-alive\r\n\r\n"
+                ).encode("latin-1") + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def _respond(self, method, path, body):
+        """Compute the status and JSON body of one request"""
+        self.requests += 1
+        operation = path[len(self.path_prefix) + 1:] if path.startswith(self.path_prefix + "/") else ""
+        if method != "POST" or operation not in OPERATIONS:
+            return 404, {"error": "not found"}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return 503, {"error": "injected failure"}
+        try:
+            return 200, {"result": getattr(self.client, operation)(**json.loads(body))}
+        except (TypeError, ValueError) as error:
+            return 400, {"error": str(error)}
+
+# Measure check-in latency through AsyncGeminiClient against a stub server
+async def benchmark(check_ins=200, latency=0.05, concurrency=32, failure_rate=0.0):
+    """Run concurrent check-ins against a stub server and report latency percentiles"""
+    from ai.async_client import AsyncGeminiClient, HTTPTransport
+
+    async with StubServer(latency=latency, failure_rate=failure_rate) as server:
+        transport = HTTPTransport(server.host, server.port, pool_size=concurrency)
+        client = AsyncGeminiClient(transport, max_concurrency=concurrency, timeout=max(1.0, latency * 10))
+        latencies = []
+
+        async def check_in(i):
+            started = time.perf_counter()
+            await client.check_in(random.randint(1, 10), ["stress"], f"Feeling stressed and tired {i}")
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(check_in(i) for i in range(check_ins)))
+        elapsed = time.perf_counter() - started
+        await client.close()
+
+    latencies.sort()
+    return {
+        "check_ins": check_ins,
+        "seconds": elapsed,
+        "check_ins_per_second": check_ins / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "connections": server.connections,
+        "fallbacks": client.fallback_count
+    }
+
+async def _serve(host, port, latency, failure_rate):
+    """Serve until interrupted"""
+    async with StubServer(host, port, latency, failure_rate) as server:
+        print(f"Stub server listening on http://{server.host}:{server.port}{server.path_prefix}/")
+        await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the language model backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--benchmark", type=int, metavar="CHECK_INS", help="run a latency benchmark instead of serving")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(asyncio.run(benchmark(args.benchmark, args.latency, args.concurrency, args.failure_rate)), indent=2))
+    else:
+        try:
+            asyncio.run(_serve(args.host, args.port, args.latency, args.failure_rate))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,579 @@
+"""
+ASGI Service Module
+
+This module exposes the Mental Health Support System as a JSON API for clients
+that cannot use the Streamlit UI. The application follows the ASGI interface, so
+any ASGI server can host it (`uvicorn api.asgi:app`), and a minimal asyncio HTTP
+server is included to run it locally without extra dependencies:
+
+    python -m api.asgi --port 8080
+
+Handlers are coroutines; CPU-bound analysis runs on a worker pool so that one
+slow request does not stall the event loop, and large responses are gzipped for
+clients that accept it.
+
+Endpoints:
+    POST /users/<user_id>/mood_entries   record a mood entry
+    GET  /users/<user_id>/insights       insights over the user's recent entries
+    POST /coping_strategies              {"mood_rating": 3, "concerns": ["stress"]}
+    POST /symptoms/analyze               {"symptoms": [...]} or {"symptom_lists": [[...], ...]}
+    POST /assessments/<type>/score       {"responses": [0, 1, 2, 3]} or {"responses_batch": [[...], ...]}
+    POST /journal/analyze                {"journal_text": "..."}
+    GET  /health
+
+The /users/<user_id> endpoints only serve existing users, and only to callers
+whose authenticated user ID, passed by the authenticating reverse proxy in
+the X-Forwarded-User header (or MHSS_AUTH_HEADER), is <user_id>.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from procedural.data_handling import create_mood_entry
+from procedural.sqlite_storage import open_database
+from oop.user_repository import UserRepository
+from oop.assessment import catalog_assessments
+from functional.analysis import generate_insights
+from logical.prolog_interface import PrologInterface
+from ai.gemini_integration import GeminiAIClient
+from ai.response_cache import ResponseCache
+from ai.batching import MicroBatcher
+
+# Responses smaller than this are sent uncompressed; gzip would not pay for itself
+COMPRESS_MIN_SIZE = 1024
+
+# Largest request body accepted, in bytes; larger requests are answered with 413
+MAX_BODY_SIZE = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+# Request header in which the authenticating reverse proxy passes the caller's user ID;
+# the proxy must set it on every request and drop any client-sent value
+AUTH_HEADER = os.getenv("MHSS_AUTH_HEADER", "X-Forwarded-User")
+
+class HTTPError(Exception):
+    """Error answered with an HTTP status and a JSON {"error": message} body"""
+
+    def __init__(self, status, message):
+        """Initialize the error with its HTTP status"""
+        super().__init__(message)
+        self.status = status
+
+# Get a field of a JSON request body
+def require(body, field, kind):
+    """Get a required field of the request body, checking its type"""
+    if field not in body:
+        raise HTTPError(400, f"Missing field: {field}")
+    value = body[field]
+    if not isinstance(value, kind) or isinstance(value, bool) and kind is not bool:
+        raise HTTPError(400, f"Invalid field: {field}")
+    return value
+
+# Get a list of strings from a JSON request body
+def require_strings(body, field):
+    """Get a required list field, checking that every item is a string"""
+    values = require(body, field, list)
+    if not all(isinstance(value, str) for value in values):
+        raise HTTPError(400, f"Invalid field: {field}")
+    return values
+
+# Check whether a client accepts gzip-encoded responses
+def accepts_gzip(accept_encoding):
+    """Check an Accept-Encoding header for gzip (or *) with a non-zero quality"""
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip().lower()
+            return not quality.startswith("q=") or float(quality[2:] or 0) > 0
+    return False
+
+class ApiApp:
+    """ASGI application serving the system's components as JSON endpoints"""
+
+    def __init__(self, repository=None, prolog=None, gemini=None, assessments=None,
+                 executor=None, workers=4, compress_min_size=COMPRESS_MIN_SIZE, auth_header=AUTH_HEADER,
+                 max_body_size=MAX_BODY_SIZE):
+        """Initialize the application; components left as None are built on startup
+
+        repository: UserRepository holding the users; defaults to MHSS_DATABASE (in-memory if unset)
+        executor: worker pool for CPU-bound analysis; defaults to a pool of `workers` threads
+        auth_header: request header holding the caller's authenticated user ID
+        max_body_size: largest request body accepted, in bytes
+        """
+        self.repository = repository
+        self.prolog = prolog
+        self.gemini = gemini
+        self.assessments = assessments
+        self.executor = executor
+        self.workers = workers
+        self.compress_min_size = compress_min_size
+        self.auth_header = auth_header.lower()
+        self.max_body_size = max_body_size
+        self.journal_batcher = None
+        self._owned = []
+        self._routes = [
+            ("GET", re.compile(r"/health"), self.health),
+            ("POST", re.compile(r"/users/(?P<user_id>[^/]+)/mood_entries"), self.add_mood_entry),
+            ("GET", re.compile(r"/users/(?P<user_id>[^/]+)/insights"), self.generate_insights),
+            ("POST", re.compile(r"/coping_strategies"), self.get_coping_strategies),
+            ("POST", re.compile(r"/symptoms/analyze"), self.analyze_symptoms),
+            ("POST", re.compile(r"/assessments/(?P<assessment_type>[^/]+)/score"), self.score_assessment),
+            ("POST", re.compile(r"/journal/analyze"), self.analyze_journal_entry)
+        ]
+
+    def startup(self):
+        """Build the components that were not given, once"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="api-worker")
+            self._owned.append(lambda: self.executor.shutdown(wait=True))
+        if self.repository is None:
+            database = os.getenv("MHSS_DATABASE", ":memory:")
+            self.repository = UserRepository(open_database(database, pool_size=8))
+            self._owned.append(self.repository.close)
+        if self.prolog is None:
+            self.prolog = PrologInterface()
+        if self.assessments is None:
+            self.assessments = catalog_assessments()
+        if self.gemini is None:
+            self.gemini = GeminiAIClient(cache=ResponseCache(maxsize=1024, ttl=24 * 60 * 60))
+        if self.journal_batcher is None:
+            # Simultaneous journal requests share one batched, de-duplicated analysis
+            self.journal_batcher = MicroBatcher(self.gemini, max_batch_size=64, max_wait_ms=5)
+            self._owned.append(self.journal_batcher.close)
+
+    def shutdown(self):
+        """Close the components built by startup, flushing pending user changes"""
+        while self._owned:
+            self._owned.pop()()
+
+    async def run_in_worker(self, function, *args):
+        """Run a CPU-bound function on the worker pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def __call__(self, scope, receive, send):
+        """ASGI entry point"""
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        if self.journal_batcher is None:
+            # Servers without lifespan support start the application on first use
+            self.startup()
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        try:
+            status, result = await self._dispatch(scope, receive, headers)
+        except HTTPError as error:
+            status, result = error.status, {"error": str(error)}
+        except Exception:
+            # Details stay in the server log; clients only learn that the request failed
+            logger.exception("Unhandled error in %s %s", scope["method"], scope["path"])
+            status, result = 500, {"error": "Internal server error"}
+
+        payload = json.dumps(result).encode("utf-8")
+        response_headers = [(b"content-type", b"application/json"), (b"vary", b"accept-encoding")]
+        if len(payload) >= self.compress_min_size and accepts_gzip(headers.get("accept-encoding", "")):
+            payload = gzip.compress(payload, compresslevel=5)
+            response_headers.append((b"content-encoding", b"gzip"))
+        response_headers.append((b"content-length", str(len(payload)).encode("latin-1")))
+
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _lifespan(self, receive, send):
+        """Handle ASGI lifespan startup and shutdown events"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.startup()
+                except Exception as error:
+                    await send({"type": "lifespan.startup.failed", "message": str(error)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _authorize(self, headers, user_id):
+        """Check that the caller is authenticated as the user a /users/<user_id> route serves"""
+        caller = headers.get(self.auth_header)
+        if not caller:
+            raise HTTPError(401, "Authentication required")
+        if caller != user_id:
+            raise HTTPError(403, "Forbidden")
+
+    async def _dispatch(self, scope, receive, headers):
+        """Route one request to its handler; returns (status, JSON-serializable result)"""
+        path = scope["path"]
+        allowed = False
+        for method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            allowed = True
+            if method == scope["method"]:
+                if "user_id" in pattern.groupindex:
+                    self._authorize(headers, match["user_id"])
+                body = await self._read_json(receive, headers) if method == "POST" else {}
+                return await handler(body, **match.groupdict())
+        if allowed:
+            raise HTTPError(405, "Method not allowed")
+        raise HTTPError(404, "Not found")
+
+    async def _read_json(self, receive, headers):
+        """Read the request body, up to max_body_size bytes, and decode it as a JSON object"""
+        too_large = HTTPError(413, f"Request body exceeds {self.max_body_size} bytes")
+        try:
+            declared = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if declared > self.max_body_size:
+            raise too_large
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                raise too_large
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        try:
+            body = json.loads(b"".join(chunks) or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return body
+
+    async def health(self, body):
+        """Report that the service is up, with user cache counts"""
+        return 200, {"status": "ok", "users": self.repository.stats()}
+
+    async def add_mood_entry(self, body, user_id):
+        """Record a mood entry for an existing user"""
+        mood_rating = require(body, "mood_rating", int)
+        if not 1 <= mood_rating <= 10:
+            raise HTTPError(400, "mood_rating must be between 1 and 10")
+        sleep_hours = require(body, "sleep_hours", (int, float)) if "sleep_hours" in body else 0
+        if not 0 <= sleep_hours <= 24:
+            raise HTTPError(400, "sleep_hours must be between 0 and 24")
+        new_entry = create_mood_entry(
+            None,
+            mood_rating,
+            str(body.get("journal_entry", "")),
+            require_strings(body, "concerns") if "concerns" in body else [],
+            sleep_hours,
+            bool(body.get("exercised", False))
+        )
+
+        def add():
+            # Loading a user from storage is blocking I/O, so it runs on the pool too
+            try:
+                self.repository.add_mood_entry(user_id, new_entry)
+            except KeyError:
+                return None
+            return new_entry.to_dict()
+
+        result = await self.run_in_worker(add)
+        if result is None:
+            raise HTTPError(404, f"Unknown user: {user_id}")
+        return 201, result
+
+    async def generate_insights(self, body, user_id):
+        """Generate insights over a user's recent mood entries"""
+        def insights():
+            with self.repository.lock(user_id):
+                user = self.repository.get(user_id)
+                if user is None:
+                    return None
+                return generate_insights(user.get_recent_mood_entries(self.repository.insights_window))
+
+        result = await self.run_in_worker(insights)
+        if result is None:
+            raise HTTPError(404, f"Unknown user: {user_id}")
+        return 200, {"user_id": user_id, "insights": result}
+
+    async def get_coping_strategies(self, body):
+        """Get coping strategies for a mood rating and concerns"""
+        mood_rating = require(body, "mood_rating", int)
+        concerns = require_strings(body, "concerns") if "concerns" in body else []
+        # A precompiled bitmask lookup; cheaper to answer inline than to hand off
+        return 200, {"strategies": self.prolog.get_coping_strategies(mood_rating, concerns)}
+
+    async def analyze_symptoms(self, body):
+        """Analyze one symptom list, or many at once, and recommend strategies"""
+        if "symptom_lists" in body:
+            symptom_lists = require(body, "symptom_lists", list)
+            if not all(
+                isinstance(symptoms, list) and all(isinstance(symptom, str) for symptom in symptoms)
+                for symptoms in symptom_lists
+            ):
+                raise HTTPError(400, "Invalid field: symptom_lists")
+
+            def analyze_batch():
+                analyses = self.prolog.analyze_symptoms_batch(symptom_lists)
+                recommendations = self.prolog.get_recommendations_batch(analyses)
+                return [
+                    {"analysis": analysis, "recommendations": recommendation}
+                    for analysis, recommendation in zip(analyses, recommendations)
+                ]
+
+            return 200, {"results": await self.run_in_worker(analyze_batch)}
+
+        symptoms = require_strings(body, "symptoms")
+
+        def analyze():
+            analysis = self.prolog.analyze_symptoms(symptoms)
+            return {"analysis": analysis, "recommendations": self.prolog.get_recommendations(analysis)}
+
+        return 200, await self.run_in_worker(analyze)
+
+    async def score_assessment(self, body, assessment_type):
+        """Score one respondent's responses, or many at once, and interpret the results"""
+        assessment = self.assessments.get(assessment_type)
+        if assessment is None:
+            raise HTTPError(404, f"Unknown assessment: {assessment_type}")
+        if "responses_batch" in body:
+            responses_batch = require(body, "responses_batch", list)
+            if not all(
+                isinstance(responses, list)
+                and all(isinstance(response, int) and not isinstance(response, bool) for response in responses)
+                for responses in responses_batch
+            ):
+                raise HTTPError(400, "Invalid field: responses_batch")
+            if any(len(responses) != len(assessment.questions) for responses in responses_batch):
+                raise HTTPError(400, "Number of responses doesn't match number of questions")
+
+            def score_batch():
+                batch = assessment.score_batch(responses_batch)
+                if "error" in batch:
+                    return batch
+                results = [
+                    {"score": score, "level": level, "description": description}
+                    for score, level, description in zip(
+                        batch["scores"].tolist(), batch["levels"].tolist(), batch["descriptions"].tolist()
+                    )
+                ]
+                if "interpretation_indices" in batch:
+                    for result, index in zip(results, batch["interpretation_indices"].tolist()):
+                        result["interpretation"] = assessment.INTERPRETATIONS[index]
+                return {"results": results}
+
+            result = await self.run_in_worker(score_batch)
+            if "error" in result:
+                raise HTTPError(400, result["error"])
+            return 200, result
+
+        responses = require(body, "responses", list)
+        if not all(isinstance(response, int) and not isinstance(response, bool) for response in responses):
+            raise HTTPError(400, "Invalid field: responses")
+
+        result = assessment.calculate_score(responses)
+        if "error" in result:
+            raise HTTPError(400, result["error"])
+        if hasattr(assessment, "interpret_results"):
+            result["interpretation"] = assessment.interpret_results(result["score"])
+        return 200, result
+
+    async def analyze_journal_entry(self, body):
+        """Analyze a journal entry's emotions and concerns"""
+        journal_text = require(body, "journal_text", str)
+        # The batcher analyzes on its own worker thread; awaiting its future keeps the loop free
+        analysis = await asyncio.wrap_future(self.journal_batcher.submit(journal_text))
+        return 200, analysis
+
+class LocalServer:
+    """Minimal keep-alive HTTP/1.1 server hosting an ASGI application"""
+
+    def __init__(self, app, host="127.0.0.1", port=0, max_body_size=MAX_BODY_SIZE):
+        """Initialize the server; port 0 picks a free port on start"""
+        self.app = app
+        self.host = host
+        self.port = port
+        self.max_body_size = max_body_size
+        self.requests = 0
+        self._server = None
+        self._handlers = set()
+        self._lifespan = None
+        self._lifespan_events = None
+
+    async def start(self):
+        """Run the application's startup, then start listening"""
+        await self._start_lifespan()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop listening, close open connections and run the application's shutdown"""
+        if self._server is not None:
+            self._server.close()
+            for writer in [handler[1] for handler in self._handlers]:
+                writer.close()
+            await asyncio.gather(*(handler[0] for handler in list(self._handlers)), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+            await self._stop_lifespan()
+
+    async def __aenter__(self):
+        """Start the server"""
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        """Stop the server"""
+        await self.stop()
+
+    async def _start_lifespan(self):
+        """Send lifespan.startup to the application and wait for it to complete"""
+        self._lifespan_events = asyncio.Queue()
+        started = asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            if not started.done():
+                started.set_result(message)
+
+        await self._lifespan_events.put({"type": "lifespan.startup"})
+        self._lifespan = asyncio.create_task(
+            self.app({"type": "lifespan", "asgi": {"version": "3.0"}}, self._lifespan_events.get, send)
+        )
+        # An application without lifespan support returns (or raises) without answering
+        await asyncio.wait([started, self._lifespan], return_when=asyncio.FIRST_COMPLETED)
+        if self._lifespan.done() and not self._lifespan.cancelled():
+            self._lifespan.exception()
+        if started.done() and started.result()["type"] == "lifespan.startup.failed":
+            raise RuntimeError(started.result().get("message", "Application startup failed"))
+
+    async def _stop_lifespan(self):
+        """Send lifespan.shutdown to the application and wait for it to finish"""
+        if self._lifespan is not None and not self._lifespan.done():
+            await self._lifespan_events.put({"type": "lifespan.shutdown"})
+            await asyncio.gather(self._lifespan, return_exceptions=True)
+        self._lifespan = None
+
+    async def _handle(self, reader, writer):
+        """Serve requests on one connection until either side closes it"""
+        handler = (asyncio.current_task(), writer)
+        self._handlers.add(handler)
+        client = writer.get_extra_info("peername")
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request_line = await reader.readuntil(b"\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                method, target, version = request_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+                headers = []
+                while True:
+                    line = await reader.readuntil(b"\r\n")
+                    if line == b"\r\n":
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+                header_map = dict(headers)
+                length = int(header_map.get(b"content-length", 0))
+                if length > self.max_body_size:
+                    # Refused before reading, so the body is never buffered; the connection cannot be reused
+                    payload = json.dumps({"error": f"Request body exceeds {self.max_body_size} bytes"}).encode("utf-8")
+                    writer.write((
+                        "HTTP/1.1 413 Payload Too Large\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+                    ).encode("latin-1") + payload)
+                    await writer.drain()
+                    return
+                body = await reader.readexactly(length) if length else b""
+                connection = header_map.get(b"connection", b"").lower()
+                keep_alive = connection != b"close" and (version != "HTTP/1.0" or connection == b"keep-alive")
+
+                path, _, query = target.partition("?")
+                scope = {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": version[len("HTTP/"):],
+                    "method": method,
+                    "scheme": "http",
+                    "path": path,
+                    "raw_path": path.encode("latin-1"),
+                    "query_string": query.encode("latin-1"),
+                    "root_path": "",
+                    "headers": headers,
+                    "server": (self.host, self.port),
+                    "client": client
+                }
+                self.requests += 1
+                await self._run_app(scope, body, writer, keep_alive)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def _run_app(self, scope, body, writer, keep_alive):
+        """Call the application for one request and write its response"""
+        received = False
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Request bodies are read whole, so any further read means the client is gone
+                await asyncio.Event().wait()
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+
+        payload = b"".join(response["body"])
+        status = response["status"]
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        for name, value in response["headers"]:
+            # The body is buffered, so the length is always known here
+            if name.lower() not in (b"content-length", b"connection", b"transfer-encoding"):
+                lines.append(f"{name.decode('latin-1')}: {value.decode('latin-1')}")
+        lines.append(f"Content-Length: {len(payload)}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+# The application served by `uvicorn api.asgi:app` and `python -m api.asgi`
+app = ApiApp(workers=int(os.getenv("MHSS_API_WORKERS", "4")))
+
+async def _serve(host, port):
+    """Serve the application until interrupted"""
+    async with LocalServer(app, host, port) as server:
+        print(f"API listening on http://{server.host}:{server.port}/")
+        await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="JSON API of the Mental Health Support System")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,210 @@
+"""
+Load Test Module
+
+This module drives the JSON API of api/asgi.py with concurrent keep-alive clients
+and reports latency percentiles and throughput, overall and per endpoint.
+
+Run `python -m api.load_test --requests 5000` to test an in-process server, or
+add `--url http://host:port` to test a server that is already running; its
+database must already hold the users load_user_0 ... load_user_<users - 1>.
+Requests carry their user ID in the header an authenticating proxy would set.
+"""
+
+import asyncio
+import gzip
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+# Weighted request mix: (weight, endpoint name, request builder)
+SYMPTOMS = ("sleep_issues", "fatigue", "concentration_problems", "irritability",
+            "worry", "physical_tension", "racing_thoughts", "sadness")
+CONCERNS = ("stress", "anxiety", "depression", "sleep", "concentration", "motivation")
+JOURNAL_TEXTS = (
+    "Feeling stressed about the exam and could not sleep well.",
+    "Had a great day with friends, feeling happy and grateful.",
+    "Anxious and worried about my assignment deadline.",
+    "Feeling down and tired, no motivation to study today."
+)
+
+# Header carrying the caller's user ID, as set by the authenticating proxy
+AUTH_HEADER = "X-Forwarded-User"
+
+# Get the IDs of the users a load test acts as
+def load_user_ids(users):
+    """Get the user IDs load_user_0 ... load_user_<users - 1>"""
+    return [f"load_user_{i}" for i in range(users)]
+
+# Build a random mood entry request
+def mood_entry_request(rng, user_id):
+    """Build a POST request recording a random mood entry"""
+    return "POST", f"/users/{user_id}/mood_entries", {
+        "mood_rating": rng.randint(1, 10),
+        "journal_entry": rng.choice(JOURNAL_TEXTS),
+        "concerns": rng.sample(CONCERNS, rng.randint(0, 2)),
+        "sleep_hours": rng.randint(4, 9),
+        "exercised": rng.random() < 0.3
+    }
+
+REQUEST_MIX = (
+    (3, "mood_entries", mood_entry_request),
+    (3, "insights", lambda rng, user_id: ("GET", f"/users/{user_id}/insights", None)),
+    (2, "coping_strategies", lambda rng, user_id: ("POST", "/coping_strategies", {
+        "mood_rating": rng.randint(1, 10), "concerns": rng.sample(CONCERNS, rng.randint(0, 2))
+    })),
+    (1, "symptoms", lambda rng, user_id: ("POST", "/symptoms/analyze", {
+        "symptoms": rng.sample(SYMPTOMS, rng.randint(1, 5))
+    })),
+    (1, "assessments", lambda rng, user_id: ("POST", "/assessments/stress/score", {
+        "responses": [rng.randint(0, 4) for _ in range(4)]
+    })),
+    (2, "journal", lambda rng, user_id: ("POST", "/journal/analyze", {
+        "journal_text": rng.choice(JOURNAL_TEXTS)
+    }))
+)
+
+class Connection:
+    """One keep-alive HTTP/1.1 client connection"""
+
+    def __init__(self, host, port, auth_header=AUTH_HEADER):
+        """Initialize the connection; it opens on first use"""
+        self.host = host
+        self.port = port
+        self.auth_header = auth_header
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, body=None, user_id=None):
+        """Send a request, as user_id if given, and return (status, decoded JSON body, bytes on the wire)"""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self._writer.write((
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Accept-Encoding: gzip\r\n"
+            "Content-Type: application/json\r\n"
+            + (f"{self.auth_header}: {user_id}\r\n" if user_id is not None else "")
+            + f"Content-Length: {len(payload)}\r\n\r\n"
+        ).encode("latin-1") + payload)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split(b" ", 2)[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        raw = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        content = gzip.decompress(raw) if headers.get("content-encoding") == "gzip" else raw
+        return status, json.loads(content) if content else None, len(raw)
+
+    async def close(self):
+        """Close the connection"""
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+# Get a percentile of sorted latencies in milliseconds
+def percentile_ms(latencies, fraction):
+    """Get the given percentile of sorted latencies (seconds), in milliseconds"""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+# Summarize the latencies of a set of requests
+def summarize(latencies):
+    """Summarize latencies (seconds) as count, p50 and p99"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile_ms(latencies, 0.5),
+        "p99_ms": percentile_ms(latencies, 0.99)
+    }
+
+# Run the load test against a running server
+async def load_test(host, port, requests=2000, concurrency=32, users=100, seed=0, auth_header=AUTH_HEADER):
+    """Send a weighted mix of requests from concurrent connections and report latency"""
+    rng = random.Random(seed)
+    user_ids = load_user_ids(users)
+    weights = [weight for weight, _, _ in REQUEST_MIX]
+    plan = []
+    for _, name, build in rng.choices(REQUEST_MIX, weights=weights, k=requests):
+        user_id = rng.choice(user_ids)
+        plan.append((name, user_id, build(rng, user_id)))
+
+    connections = [Connection(host, port, auth_header) for _ in range(concurrency)]
+    # Every user gets an entry first, so insights requests measure real work, not 404s
+    for i, user_id in enumerate(user_ids):
+        method, path, body = mood_entry_request(rng, user_id)
+        await connections[i % concurrency].request(method, path, body, user_id)
+
+    latencies = {}
+    statuses = {}
+    wire_bytes = 0
+    queue = iter(plan)
+
+    async def worker(connection):
+        nonlocal wire_bytes
+        for name, user_id, (method, path, body) in queue:
+            started = time.perf_counter()
+            status, _, size = await connection.request(method, path, body, user_id)
+            latencies.setdefault(name, []).append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            wire_bytes += size
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(connection) for connection in connections))
+    elapsed = time.perf_counter() - started
+    for connection in connections:
+        await connection.close()
+
+    report = summarize([latency for values in latencies.values() for latency in values])
+    report.update({
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "concurrency": concurrency,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "response_bytes": wire_bytes,
+        "endpoints": {name: summarize(values) for name, values in sorted(latencies.items())}
+    })
+    return report
+
+# Run the load test against a server started in this process
+async def load_test_local(requests=2000, concurrency=32, users=100, workers=4, seed=0):
+    """Start the API on a free local port, load test it and stop it"""
+    from api.asgi import ApiApp, LocalServer
+    from procedural.sqlite_storage import save_user
+
+    app = ApiApp(workers=workers, auth_header=AUTH_HEADER)
+    async with LocalServer(app) as server:
+        for user_id in load_user_ids(users):
+            user_info = {"user_id": user_id, "username": user_id, "email": f"{user_id}@example.com"}
+            save_user(app.repository.pool, user_info)
+        return await load_test(server.host, server.port, requests, concurrency, users, seed)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test the JSON API")
+    parser.add_argument("--url", help="base URL of a running server; omit to start one in-process")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4, help="worker threads of the in-process server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--auth-header", default=AUTH_HEADER, help="header the server reads the user ID from")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        report = asyncio.run(load_test(
+            url.hostname, url.port or 80, args.requests, args.concurrency, args.users, args.seed, args.auth_header
+        ))
+    else:
+        report = asyncio.run(load_test_local(args.requests, args.concurrency, args.users, args.workers, args.seed))
+    print(json.dumps(report, indent=2))
@@ -9,27 +9,131 @@ import streamlit as st
 import datetime
 import sys
 import os
+from contextlib import nullcontext
 
 # Add the project root to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import modules from different paradigms
-from procedural.data_handling import initialize_data, generate_sample_data, add_mood_entry
+from procedural.data_handling import initialize_data, generate_sample_data, add_mood_entry, create_mood_entry
+from procedural.mood_store import MoodStore
+from procedural.sqlite_storage import open_database
 from oop.user import User
-from oop.assessment import StressAssessment, AnxietyAssessment
-from functional.analysis import calculate_average_mood, identify_mood_patterns, generate_insights
+from oop.user_repository import UserRepository
+from oop.assessment import catalog_assessments
+from functional.incremental_insights import IncrementalInsights
 from logical.prolog_interface import PrologInterface
 from ai.gemini_integration import GeminiAIClient
+from ai.async_client import CHECK_IN_DEADLINE, BackgroundLoop, client_from_environment
+from ai.response_cache import ResponseCache
+from ai.batching import MicroBatcher
+from monitoring.instrumentation import ENABLED as METRICS_ENABLED, timed, profiled, start_exporters
+
+# Server mode: with MHSS_DATABASE set, users are served from that SQLite database
+# and picked with the ?user=<id> query parameter instead of a per-session demo user
+SERVER_DATABASE = os.getenv("MHSS_DATABASE")
+
+# Request header in which the authenticating reverse proxy passes the signed-in user ID
+# (server mode); the proxy must set it on every request and drop any client-sent value
+AUTH_HEADER = os.getenv("MHSS_AUTH_HEADER", "X-Forwarded-User")
+
+# Stateless components are built once per process and shared by every session
+
+# Get the shared Prolog interface (Logical)
+@st.cache_resource
+def get_prolog():
+    """Get the process-wide, read-only Prolog interface"""
+    return PrologInterface()
+
+# Get the shared assessments (OOP)
+@st.cache_resource
+def get_assessments():
+    """Get the process-wide, read-only assessments of the catalog by type"""
+    return catalog_assessments()
+
+# Get the shared Gemini AI client
+@st.cache_resource
+def get_gemini():
+    """Get the process-wide Gemini AI client and its response cache"""
+    # Cache model results for a day; GEMINI_CACHE_FILE keeps them across restarts
+    response_cache = ResponseCache(maxsize=1024, ttl=24 * 60 * 60, path=os.getenv("GEMINI_CACHE_FILE"))
+    return GeminiAIClient(cache=response_cache)
+
+# Journal analysis batcher shared by every session, so simultaneous check-ins share calls
+@st.cache_resource
+def get_journal_batcher():
+    """Get the process-wide journal analysis micro-batcher"""
+    return MicroBatcher(get_gemini(), max_batch_size=64, max_wait_ms=20)
+
+# Event loop shared by every session, so the client's connection pool is reused
+@st.cache_resource
+def get_client_loop():
+    """Get the process-wide background event loop for async client calls"""
+    return BackgroundLoop()
+
+# Concurrent model client shared by every session, falling back to the heuristics
+@st.cache_resource
+def get_async_gemini():
+    """Get the process-wide async model client, sharing the response cache and batcher"""
+    return client_from_environment(cache=get_gemini().cache, journal_batcher=get_journal_batcher())
+
+# Get the shared user repository (server mode)
+@st.cache_resource
+def get_repository():
+    """Get the process-wide repository of users stored in MHSS_DATABASE"""
+    return UserRepository(
+        open_database(SERVER_DATABASE, pool_size=8),
+        capacity=int(os.getenv("MHSS_USER_CACHE_SIZE", "10000"))
+    )
+
+# Get the user of this session
+def current_user():
+    """Get the session's User; in server mode, the repository's current copy"""
+    if SERVER_DATABASE:
+        return get_repository().get(st.session_state.user_id)
+    return st.session_state.user
+
+# Get the insights of this session's user
+def current_insights():
+    """Get the incrementally maintained insights of the session's user"""
+    if SERVER_DATABASE:
+        return get_repository().insights(st.session_state.user_id)
+    return st.session_state.insights
+
+# Lock the session's user against concurrent sessions of the same user
+def user_lock():
+    """Get a context manager holding the session user's lock (a no-op outside server mode)"""
+    if SERVER_DATABASE:
+        return get_repository().lock(st.session_state.user_id)
+    return nullcontext()
+
+# Initialize session state for server mode
+def init_server_session_state():
+    """Attach the session to the stored user the proxy authenticated, instead of creating demo data"""
+    user_id = st.context.headers.get(AUTH_HEADER)
+    if not user_id:
+        st.error("Sign-in required: this server only accepts sessions through its authentication proxy.")
+        st.stop()
+    # Accounts are provisioned ahead of time, never created from a request
+    if get_repository().get(user_id) is None:
+        st.error("There is no account for the signed-in user.")
+        st.stop()
+    
+    st.session_state.user_id = user_id
+    st.session_state.page = "Dashboard"
+    st.session_state.initialized = True
 
 # Initialize session state
 def init_session_state():
     """Initialize the session state with default values"""
-    if 'initialized' not in st.session_state:
+    if 'initialized' not in st.session_state and SERVER_DATABASE:
+        init_server_session_state()
+    elif 'initialized' not in st.session_state:
         # Initialize data
         data = initialize_data()
         
         # Generate sample data
-        data["mood_entries"] = generate_sample_data()
+        data["mood_entries"] = MoodStore.from_entries(generate_sample_data())
         
         # Create user instance (OOP)
         user = User(
@@ -38,67 +142,91 @@ def init_session_state():
             data["user_info"]["email"]
         )
         
-        # Add mood entries to user
-        for entry in data["mood_entries"]:
-            user.add_mood_entry(entry)
-        
-        # Create assessments (OOP)
-        stress_assessment = StressAssessment()
-        anxiety_assessment = AnxietyAssessment()
+        # Add mood entries to user in bulk
+        user.add_mood_entries(data["mood_entries"])
         
-        # Initialize Prolog interface (Logical)
-        prolog = PrologInterface()
-        
-        # Initialize Gemini AI client
-        gemini = GeminiAIClient()
+        # Keep dashboard insights up to date as entries are added
+        insights = IncrementalInsights(window=7).subscribe_to(user)
         
         # Store everything in session state
         st.session_state.data = data
+        st.session_state.user_id = user.user_id
         st.session_state.user = user
-        st.session_state.stress_assessment = stress_assessment
-        st.session_state.anxiety_assessment = anxiety_assessment
-        st.session_state.prolog = prolog
-        st.session_state.gemini = gemini
+        st.session_state.insights = insights
         st.session_state.page = "Dashboard"
         st.session_state.initialized = True
 
+# Memoize a per-user computation until the user's history changes
+def memoize_for_user(user, name, compute):
+    """Get compute() for the user's current history version, computing it at most once"""
+    memo = st.session_state.setdefault("memo", {})
+    key = (user.user_id, user.history_version)
+    entry = memo.get(name)
+    if entry is None or entry[0] != key:
+        # Only the latest version of each computation is kept
+        entry = memo[name] = (key, compute())
+    return entry[1]
+
+# Compute the dashboard's mood metrics
+def dashboard_metrics(insights):
+    """Get the average mood and trend shown on the dashboard"""
+    mood_patterns = insights.mood_patterns()
+    if any(p["type"] == "improving_mood" for p in mood_patterns):
+        trend = "Improving"
+    elif any(p["type"] == "declining_mood" for p in mood_patterns):
+        trend = "Declining"
+    else:
+        trend = "Stable"
+    return {"average_mood": insights.average_mood(), "trend": trend}
+
+# Compute the dashboard's chart series
+def dashboard_chart(user):
+    """Get the dates and ratings of the recent mood entries, oldest first"""
+    mood_entries = user.get_recent_mood_entries()
+    return {
+        "dates": [entry["timestamp"].split("T")[0] for entry in reversed(mood_entries)],
+        "ratings": [entry["mood_rating"] for entry in reversed(mood_entries)]
+    }
+
+# Compute the coping strategies for the most recent mood entry
+def dashboard_strategies(user):
+    """Get coping strategies for the latest mood entry, or None without entries"""
+    mood_entries = user.get_recent_mood_entries(1)
+    if not mood_entries:
+        return None
+    recent_entry = mood_entries[0]
+    # Use logical programming to get strategies
+    return get_prolog().get_coping_strategies(recent_entry["mood_rating"], recent_entry.get("concerns", []))
+
 # Dashboard page
+@timed("page.show_dashboard")
 def show_dashboard():
     """Show the dashboard page"""
     st.title("Mental Health Dashboard")
     
-    # Get recent mood entries
-    mood_entries = st.session_state.user.get_recent_mood_entries()
-    
-    # Use functional programming to analyze mood data
-    avg_mood = calculate_average_mood(mood_entries)
-    mood_patterns = identify_mood_patterns(mood_entries)
-    insights = generate_insights(mood_entries)
+    # Reruns without a new check-in reuse everything computed for this history version
+    with user_lock():
+        user = current_user()
+        insights_state = current_insights()
+        metrics = memoize_for_user(user, "dashboard_metrics", lambda: dashboard_metrics(insights_state))
+        chart = memoize_for_user(user, "dashboard_chart", lambda: dashboard_chart(user))
+        insights = memoize_for_user(user, "dashboard_insights", insights_state.insights)
+        strategies = memoize_for_user(user, "dashboard_strategies", lambda: dashboard_strategies(user))
     
     # Display mood statistics
     st.subheader("Mood Overview")
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Average Mood", f"{avg_mood:.1f}/10")
+        st.metric("Average Mood", f"{metrics['average_mood']:.1f}/10")
     with col2:
-        if mood_patterns:
-            trend = "Improving" if any(p["type"] == "improving_mood" for p in mood_patterns) else \
-                   "Declining" if any(p["type"] == "declining_mood" for p in mood_patterns) else \
-                   "Stable"
-            st.metric("Trend", trend)
-        else:
-            st.metric("Trend", "Stable")
+        st.metric("Trend", metrics["trend"])
     
     # Display mood chart
     st.subheader("Mood Tracking")
     
-    # Extract dates and ratings for chart
-    dates = [entry["timestamp"].split("T")[0] for entry in reversed(mood_entries)]
-    ratings = [entry["mood_rating"] for entry in reversed(mood_entries)]
-    
     # Create a simple chart using Streamlit
     st.line_chart({
-        "Mood Rating": ratings
+        "Mood Rating": chart["ratings"]
     })
     
     # Display insights
@@ -112,21 +240,14 @@ def show_dashboard():
     # Get coping strategies using logical programming
     st.subheader("Recommended Coping Strategies")
     
-    # Get the most recent mood entry
-    if mood_entries:
-        recent_entry = mood_entries[0]
-        mood_rating = recent_entry["mood_rating"]
-        concerns = recent_entry.get("concerns", [])
-        
-        # Use logical programming to get strategies
-        strategies = st.session_state.prolog.get_coping_strategies(mood_rating, concerns)
-        
+    if strategies is not None:
         for strategy in strategies:
             st.success(strategy["description"])
     else:
         st.success("Complete a daily check-in to get personalized coping strategies.")
 
 # Daily Check-in page
+@timed("page.show_daily_checkin")
 def show_daily_checkin():
     """Show the daily check-in page"""
     st.title("Daily Check-in")
@@ -166,57 +287,58 @@ def show_daily_checkin():
         submitted = st.form_submit_button("Submit Check-in")
         
         if submitted:
-            # Use procedural programming to add mood entry
-            new_entry = add_mood_entry(
-                st.session_state.data,
-                mood_rating,
-                journal_entry,
-                concerns,
-                sleep_hours,
-                exercised
-            )
+            if SERVER_DATABASE:
+                # The repository updates the shared user and writes the entry behind
+                new_entry = create_mood_entry(None, mood_rating, journal_entry, concerns, sleep_hours, exercised)
+                get_repository().add_mood_entry(st.session_state.user_id, new_entry)
+            else:
+                # Use procedural programming to add mood entry
+                new_entry = add_mood_entry(
+                    st.session_state.data,
+                    mood_rating,
+                    journal_entry,
+                    concerns,
+                    sleep_hours,
+                    exercised
+                )
+                
+                # Use OOP to add entry to user
+                st.session_state.user.add_mood_entry(new_entry)
             
-            # Use OOP to add entry to user
-            st.session_state.user.add_mood_entry(new_entry)
+            # Use AI to analyze the journal entry and write a personalized response concurrently
+            analysis, response = get_client_loop().run(
+                get_async_gemini().check_in(mood_rating, concerns, journal_entry, deadline=CHECK_IN_DEADLINE)
+            )
             
-            # Use AI to analyze journal entry
-            if journal_entry:
-                analysis = st.session_state.gemini.analyze_journal_entry(journal_entry)
-                
+            if analysis is not None:
                 st.subheader("AI Analysis")
                 st.write(analysis["summary"])
             
             # Use logical programming to get coping strategies
-            strategies = st.session_state.prolog.get_coping_strategies(mood_rating, concerns)
+            strategies = get_prolog().get_coping_strategies(mood_rating, concerns)
             
             if strategies:
                 st.subheader("Recommended Coping Strategy")
                 st.success(strategies[0]["description"])
             
-            # Use AI to generate personalized response
-            response = st.session_state.gemini.generate_coping_response(
-                mood_rating, concerns, journal_entry
-            )
-            
             st.subheader("Personalized Response")
             st.info(response)
             
             st.success("Check-in recorded successfully!")
 
 # Assessments page
+@timed("page.show_assessments")
 def show_assessments():
     """Show the assessments page"""
     st.title("Mental Health Assessments")
     
+    assessments = get_assessments()
     assessment_type = st.selectbox(
         "Select an assessment",
-        ["Stress Assessment", "Anxiety Assessment"]
+        list(assessments),
+        format_func=lambda assessment_type: assessments[assessment_type].title
     )
-    
-    if assessment_type == "Stress Assessment":
-        assessment = st.session_state.stress_assessment
-    else:  # Anxiety Assessment
-        assessment = st.session_state.anxiety_assessment
+    assessment = assessments[assessment_type]
     
     st.write(assessment.description)
     
@@ -229,7 +351,7 @@ def show_assessments():
             response = st.radio(
                 "Select your answer",
                 options=question["options"],
-                key=f"q{i}"
+                key=f"{assessment_type}_q{i}"
             )
             # Extract the numeric value from the option (e.g., "Never (0)" -> 0)
             value = int(response.split("(")[1].split(")")[0])
@@ -252,8 +374,8 @@ def show_assessments():
                 st.write(interpretation)
             
             # Use AI to provide recommendations
-            recommendations = st.session_state.gemini.analyze_assessment_results(
-                assessment_type.split()[0].lower(),
+            recommendations = get_gemini().analyze_assessment_results(
+                assessment_type,
                 result['score'],
                 result['level']
             )
@@ -262,26 +384,16 @@ def show_assessments():
             st.info(recommendations)
             
             # Use logical programming to analyze symptoms
-            symptoms = []
-            if assessment_type == "Stress Assessment":
-                if result['score'] > 8:
-                    symptoms.extend(["sleep_issues", "fatigue", "concentration_problems", "irritability"])
-                elif result['score'] > 4:
-                    symptoms.extend(["sleep_issues", "irritability"])
-            else:  # Anxiety Assessment
-                if result['score'] > 8:
-                    symptoms.extend(["worry", "physical_tension", "racing_thoughts", "sleep_issues"])
-                elif result['score'] > 4:
-                    symptoms.extend(["worry", "physical_tension"])
+            symptoms = list(assessment.symptoms_for(result['score']))
             
             if symptoms:
-                analysis = st.session_state.prolog.analyze_symptoms(symptoms)
+                analysis = get_prolog().analyze_symptoms(symptoms)
                 
                 st.subheader("Additional Insights")
                 st.write(f"Primary concern: {analysis['primary_concern'].capitalize()}")
                 st.write(f"Severity: {analysis['severity'].capitalize()}")
                 
-                recommendations = st.session_state.prolog.get_recommendations(analysis)
+                recommendations = get_prolog().get_recommendations(analysis)
                 
                 st.subheader("Recommended Strategies")
                 for rec in recommendations:
@@ -291,6 +403,7 @@ def show_assessments():
                         st.info(rec["description"])
 
 # Resources page
+@timed("page.show_resources")
 def show_resources():
     """Show the resources page"""
     st.title("Mental Health Resources")
@@ -309,11 +422,11 @@ def show_resources():
         )
         
         # Use logical programming to get strategies for the concern
-        strategies = st.session_state.prolog.concern_strategy_map.get(concern.lower(), [])
+        strategies = get_prolog().concern_strategy_map.get(concern.lower(), [])
         
         if strategies:
             for strategy in strategies:
-                description = st.session_state.prolog.coping_strategies.get(strategy, "")
+                description = get_prolog().coping_strategies.get(strategy, "")
                 st.success(f"**{strategy.replace('_', ' ').title()}**: {description}")
         else:
             st.info("No specific strategies found for this concern.")
@@ -345,12 +458,13 @@ def show_resources():
         """)
 
 # Settings page
+@timed("page.show_settings")
 def show_settings():
     """Show the settings page"""
     st.title("Settings")
     
     # Get current user preferences
-    preferences = st.session_state.user.preferences
+    preferences = current_user().preferences
     
     with st.form("settings_form"):
         st.subheader("Notification Settings")
@@ -384,7 +498,10 @@ def show_settings():
                 "theme": theme.lower()
             }
             
-            st.session_state.user.update_preferences(new_preferences)
+            if SERVER_DATABASE:
+                get_repository().update_preferences(st.session_state.user_id, new_preferences)
+            else:
+                st.session_state.user.update_preferences(new_preferences)
             st.success("Settings updated successfully!")
 
 # Main application
@@ -396,6 +513,9 @@ def main():
         layout="wide"
     )
     
+    # Export timings to MHSS_METRICS_FILE / MHSS_METRICS_PORT when MHSS_METRICS is on
+    start_exporters()
+    
     # Initialize session state
     init_session_state()
     
@@ -408,17 +528,26 @@ def main():
         ["Dashboard", "Daily Check-in", "Assessments", "Resources", "Settings"]
     )
     
+    # With metrics on, ?profile=1 captures a cProfile of this one rerun
+    profile = METRICS_ENABLED and st.query_params.get("profile") == "1"
+    
     # Display the selected page
-    if page == "Dashboard":
-        show_dashboard()
-    elif page == "Daily Check-in":
-        show_daily_checkin()
-    elif page == "Assessments":
-        show_assessments()
-    elif page == "Resources":
-        show_resources()
-    elif page == "Settings":
-        show_settings()
+    with profiled(profile, label=page.lower().replace(" ", "_")) as capture:
+        if page == "Dashboard":
+            show_dashboard()
+        elif page == "Daily Check-in":
+            show_daily_checkin()
+        elif page == "Assessments":
+            show_assessments()
+        elif page == "Resources":
+            show_resources()
+        elif page == "Settings":
+            show_settings()
+    
+    if capture:
+        # Only the rerun that asked for it is profiled
+        del st.query_params["profile"]
+        st.sidebar.caption(f"Profile saved to {capture['path']}")
     
     # Footer
     st.sidebar.markdown("---")
@@ -0,0 +1,276 @@
+"""
+Benchmark Suite
+
+This module times the hot paths of the Mental Health Support System on
+synthetic histories of increasing size and records, for each one, latency
+percentiles per call, throughput and the peak memory traced while it runs.
+Results are written as JSON together with the commit they were measured at,
+and `--compare` reports the change against the results of an earlier commit.
+
+Run `python -m benchmarks.run_benchmarks --sizes 100 10000 1000000`, then
+`python -m benchmarks.run_benchmarks --compare benchmark_results.json` after a change.
+"""
+
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from procedural.data_handling import (
+    SAMPLE_DAYS, iter_sample_data, save_data, load_data, get_mood_entries_by_date_range
+)
+from procedural.journal import close_journal
+from procedural.mood_store import MoodStore, epoch_to_timestamp
+from oop.user import User
+from oop.assessment import StressAssessment
+from functional.analysis import generate_insights
+from logical.prolog_interface import PrologInterface
+from ai.gemini_integration import GeminiAIClient
+
+# History sizes benchmarked by default; --sizes goes up to 10^7
+DEFAULT_SIZES = (100, 10000, 1000000)
+
+# Calls per pass of the benchmarks whose cost does not depend on history size
+CALLS_PER_PASS = 2000
+
+# Relative slowdown of p50 latency reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.10
+
+# Time calls and trace their memory
+def measure(name, size, function, make_inputs, passes=5):
+    """Time function(*arguments) for every argument tuple of make_inputs(), `passes` times
+
+    make_inputs is called before each pass, untimed, so calls that consume their
+    inputs (such as saving to a new file) get fresh ones.
+    Returns a result dict with per-call latencies, throughput and peak traced memory.
+    """
+    latencies = []
+    total = 0.0
+    for _ in range(passes):
+        inputs = make_inputs()
+        for arguments in inputs:
+            started = time.perf_counter()
+            function(*arguments)
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            total += elapsed
+
+    # One more pass under tracemalloc, which slows calls down too much to time them
+    inputs = make_inputs()
+    tracemalloc.start()
+    try:
+        for arguments in inputs:
+            function(*arguments)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "size": size,
+        "calls": len(latencies),
+        "mean_ms": total / len(latencies) * 1000,
+        "min_ms": latencies[0] * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "calls_per_second": len(latencies) / total if total else float("inf"),
+        "peak_memory_bytes": peak
+    }
+
+# Benchmarks over a history of `size` entries
+def history_benchmarks(size, directory):
+    """Get (name, function, make_inputs) benchmarks of the paths whose cost grows with history size"""
+    store = MoodStore.from_entries(iter_sample_data(size, seed=size))
+    data = {"mood_entries": store, "assessments_taken": [], "user_info": {"user_id": "user_1"}}
+    user = User("user_1", "student", "student@example.com")
+    for entry in store:
+        user.add_mood_entry(entry)
+
+    # The newest tenth of the history, as a date range query
+    timestamps = store.timestamps
+    date_range = (
+        data, epoch_to_timestamp(timestamps[len(timestamps) * 9 // 10]), epoch_to_timestamp(timestamps[-1])
+    )
+
+    saved = os.path.join(directory, f"load_{size}.json")
+    save_data(data, saved)
+    close_journal(saved)
+    counter = iter(range(sys.maxsize))
+
+    def save_fresh(data):
+        # Each save starts a new file, so every call writes a full snapshot
+        filename = os.path.join(directory, f"save_{size}_{next(counter)}.json")
+        save_data(data, filename)
+        close_journal(filename)
+        os.remove(filename)
+
+    def load(filename):
+        load_data(filename)
+        close_journal(filename)
+
+    # Repeat calls on small histories so their timings are not dominated by noise
+    repeats = max(1, min(100, 100000 // max(size, 1)))
+    return [
+        ("generate_insights", generate_insights, lambda: [(store,)] * repeats),
+        ("generate_insights_recent", generate_insights, lambda: [(user.get_recent_mood_entries(7),)] * 100),
+        ("User.get_recent_mood_entries", user.get_recent_mood_entries, lambda: [(7,)] * CALLS_PER_PASS),
+        ("get_mood_entries_by_date_range", get_mood_entries_by_date_range, lambda: [date_range] * repeats),
+        ("save_data", save_fresh, lambda: [(data,)] * repeats),
+        ("load_data", load, lambda: [(saved,)] * repeats)
+    ]
+
+# Benchmarks whose cost does not depend on the history size
+def component_benchmarks(seed=0):
+    """Get (name, function, make_inputs) benchmarks of rule lookups, scoring and journal analysis"""
+    rng = random.Random(seed)
+    prolog = PrologInterface()
+    assessment = StressAssessment()
+    gemini = GeminiAIClient()
+    concerns = sorted(prolog.concern_strategy_map)
+    symptoms = list(prolog.symptom_order)
+    texts = [
+        " ".join(rng.choice(SAMPLE_DAYS)[1] for _ in range(rng.randint(1, 3)))
+        for _ in range(CALLS_PER_PASS)
+    ]
+
+    strategy_inputs = [
+        (rng.randint(1, 10), rng.sample(concerns, rng.randint(0, 2)))
+        for _ in range(CALLS_PER_PASS)
+    ]
+    symptom_inputs = [
+        (rng.sample(symptoms, rng.randint(1, min(6, len(symptoms)))),)
+        for _ in range(CALLS_PER_PASS)
+    ]
+    score_inputs = [
+        ([rng.randint(0, 4) for _ in assessment.questions],)
+        for _ in range(CALLS_PER_PASS)
+    ]
+    batch_inputs = [(np.array([responses for responses, in score_inputs]),)]
+    journal_inputs = [(text,) for text in texts]
+
+    return [
+        ("PrologInterface.get_coping_strategies", prolog.get_coping_strategies, lambda: strategy_inputs),
+        ("PrologInterface.analyze_symptoms", prolog.analyze_symptoms, lambda: symptom_inputs),
+        ("Assessment.calculate_score", assessment.calculate_score, lambda: score_inputs),
+        ("Assessment.score_batch", assessment.score_batch, lambda: batch_inputs),
+        ("GeminiAIClient.analyze_journal_entry", gemini.analyze_journal_entry, lambda: journal_inputs)
+    ]
+
+# Describe the code and machine the benchmarks ran on
+def environment():
+    """Get the commit, interpreter and machine details recorded with the results"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+# Run the whole suite
+def run_benchmarks(sizes=DEFAULT_SIZES, passes=5, only=None, progress=None):
+    """Run every benchmark (or those whose name contains `only`) and collect the results"""
+    results = []
+
+    def run(size, benchmarks):
+        for name, function, make_inputs in benchmarks:
+            if only is None or only in name:
+                results.append(measure(name, size, function, make_inputs, passes))
+                if progress is not None:
+                    progress(results[-1])
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            run(size, history_benchmarks(size, directory))
+    run(None, component_benchmarks())
+    return {"environment": environment(), "results": results}
+
+# Compare results with those of an earlier run
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Pair results by (name, size) and report the relative change of p50 latency and memory"""
+    earlier = {(result["name"], result["size"]): result for result in baseline["results"]}
+    changes = []
+    for result in current["results"]:
+        before = earlier.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        latency_change = result["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        memory_change = (
+            result["peak_memory_bytes"] / before["peak_memory_bytes"] - 1
+            if before["peak_memory_bytes"] else 0.0
+        )
+        changes.append({
+            "name": result["name"],
+            "size": result["size"],
+            "p50_ms_before": before["p50_ms"],
+            "p50_ms_after": result["p50_ms"],
+            "latency_change": latency_change,
+            "memory_change": memory_change,
+            "regression": latency_change > threshold or memory_change > threshold
+        })
+    return changes
+
+# Format one result as a line of the summary table
+def format_result(result):
+    """Format a result as a fixed-width summary line"""
+    size = "-" if result["size"] is None else f"{result['size']:,}"
+    return (
+        f"{result['name']:<40} {size:>12} {result['p50_ms']:>11.4f} {result['p99_ms']:>11.4f}"
+        f" {result['calls_per_second']:>14,.1f} {result['peak_memory_bytes'] / 2 ** 20:>10.2f}"
+    )
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the system")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="history sizes in entries (10^2 to 10^7)")
+    parser.add_argument("--passes", type=int, default=5, help="timed passes per benchmark")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of an earlier commit to compare with")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown or memory growth reported as a regression")
+    args = parser.parse_args()
+
+    # Read the baseline first, in case it is also the output file
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    print(f"{'benchmark':<40} {'size':>12} {'p50 ms':>11} {'p99 ms':>11} {'calls/s':>14} {'peak MiB':>10}",
+          file=sys.stderr)
+    report = run_benchmarks(
+        args.sizes, args.passes, args.only,
+        progress=lambda result: print(format_result(result), file=sys.stderr)
+    )
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if baseline is not None:
+        changes = compare(baseline, report, args.threshold)
+        for change in changes:
+            size = "-" if change["size"] is None else f"{change['size']:,}"
+            flag = "REGRESSION" if change["regression"] else ""
+            print(f"{change['name']:<40} {size:>12} {change['latency_change']:>+9.1%} latency"
+                  f" {change['memory_change']:>+9.1%} memory {flag}")
+        sys.exit(1 if any(change["regression"] for change in changes) else 0)
@@ -8,12 +8,40 @@ in the Mental Health Support System.
 from functools import reduce
 import datetime
 
+from monitoring.instrumentation import timed
+from procedural.mood_store import entry_epoch
+
+# Descriptions and severities of the patterns identified by this module
+PATTERN_DETAILS = {
+    "consistent_low_mood": ("Consistently low mood for 3+ days", "high"),
+    "improving_mood": ("Your mood has been steadily improving", "low"),
+    "declining_mood": ("Your mood has been declining recently", "medium"),
+    "mood_swings": ("You've experienced significant mood swings", "medium"),
+    "insufficient_sleep": ("You're averaging less than 6 hours of sleep", "high"),
+    "inconsistent_sleep": ("Your sleep schedule is inconsistent", "medium")
+}
+
+# Pure function to build a pattern dict
+def make_pattern(pattern_type):
+    """Build the pattern dict for a pattern type"""
+    description, severity = PATTERN_DETAILS[pattern_type]
+    return {
+        "type": pattern_type,
+        "description": description,
+        "severity": severity
+    }
+
 # Pure function to calculate average mood
 def calculate_average_mood(entries):
     """Calculate average mood rating - Functional Programming example"""
     if not entries:
         return 0
     
+    # Stores that can aggregate themselves (columnar or SQL) skip the per-entry walk
+    if hasattr(entries, "summary"):
+        summary = entries.summary()
+        return summary["rating_sum"] / summary["count"]
+    
     # Use functional programming approach with map and sum
     ratings = list(map(lambda entry: entry["mood_rating"], entries))
     return sum(ratings) / len(ratings)
@@ -24,56 +52,44 @@ def identify_mood_patterns(entries):
     if not entries:
         return []
     
-    # Sort entries by timestamp
-    sorted_entries = sorted(
-        entries,
-        key=lambda entry: entry["timestamp"],
-        reverse=True
-    )
-    
-    # Extract mood ratings
-    ratings = list(map(lambda entry: entry["mood_rating"], sorted_entries))
+    if hasattr(entries, "ratings_newest_first"):
+        # Let the store order its ratings column instead of sorting entries
+        ratings = entries.ratings_newest_first()
+    else:
+        # Sort entries by timestamp
+        sorted_entries = sorted(
+            entries,
+            key=entry_epoch,
+            reverse=True
+        )
+        
+        # Extract mood ratings
+        ratings = list(map(lambda entry: entry["mood_rating"], sorted_entries))
     
     # Identify patterns
     patterns = []
     
     # Pattern: Consistent low mood
     if len(ratings) >= 3 and all(rating <= 4 for rating in ratings[:3]):
-        patterns.append({
-            "type": "consistent_low_mood",
-            "description": "Consistently low mood for 3+ days",
-            "severity": "high"
-        })
+        patterns.append(make_pattern("consistent_low_mood"))
     
     # Pattern: Improving mood
     if len(ratings) >= 5:
         is_improving = all(ratings[i] >= ratings[i+1] for i in range(4))
         if is_improving:
-            patterns.append({
-                "type": "improving_mood",
-                "description": "Your mood has been steadily improving",
-                "severity": "low"
-            })
+            patterns.append(make_pattern("improving_mood"))
     
     # Pattern: Declining mood
     if len(ratings) >= 5:
         is_declining = all(ratings[i] <= ratings[i+1] for i in range(4))
         if is_declining:
-            patterns.append({
-                "type": "declining_mood",
-                "description": "Your mood has been declining recently",
-                "severity": "medium"
-            })
+            patterns.append(make_pattern("declining_mood"))
     
     # Pattern: Mood swings
     if len(ratings) >= 4:
         differences = [abs(ratings[i] - ratings[i+1]) for i in range(len(ratings)-1)]
         if any(diff >= 4 for diff in differences):
-            patterns.append({
-                "type": "mood_swings",
-                "description": "You've experienced significant mood swings",
-                "severity": "medium"
-            })
+            patterns.append(make_pattern("mood_swings"))
     
     return patterns
 
@@ -83,30 +99,29 @@ def analyze_sleep_patterns(entries):
     if not entries:
         return {"average": 0, "patterns": []}
     
-    # Extract sleep hours
-    sleep_hours = list(map(lambda entry: entry["sleep_hours"], entries))
-    
-    # Calculate average
-    average_sleep = sum(sleep_hours) / len(sleep_hours)
+    if hasattr(entries, "summary"):
+        # Use the store's own sleep aggregates
+        summary = entries.summary()
+        average_sleep = summary["sleep_sum"] / summary["count"]
+        sleep_range = summary["max_sleep"] - summary["min_sleep"]
+    else:
+        # Extract sleep hours
+        sleep_hours = list(map(lambda entry: entry["sleep_hours"], entries))
+        
+        # Calculate average
+        average_sleep = sum(sleep_hours) / len(sleep_hours)
+        sleep_range = max(sleep_hours) - min(sleep_hours)
     
     # Identify patterns
     patterns = []
     
     # Pattern: Insufficient sleep
     if average_sleep < 6:
-        patterns.append({
-            "type": "insufficient_sleep",
-            "description": "You're averaging less than 6 hours of sleep",
-            "severity": "high"
-        })
+        patterns.append(make_pattern("insufficient_sleep"))
     
     # Pattern: Inconsistent sleep
-    if max(sleep_hours) - min(sleep_hours) >= 3:
-        patterns.append({
-            "type": "inconsistent_sleep",
-            "description": "Your sleep schedule is inconsistent",
-            "severity": "medium"
-        })
+    if sleep_range >= 3:
+        patterns.append(make_pattern("inconsistent_sleep"))
     
     return {
         "average": average_sleep,
@@ -114,6 +129,7 @@ def analyze_sleep_patterns(entries):
     }
 
 # Pure function to generate insights
+@timed("generate_insights")
 def generate_insights(mood_entries):
     """Generate insights from mood data - Functional Programming example"""
     if not mood_entries:
@@ -123,7 +139,18 @@ def generate_insights(mood_entries):
     mood_patterns = identify_mood_patterns(mood_entries)
     sleep_analysis = analyze_sleep_patterns(mood_entries)
     
-    # Combine insights
+    # Add exercise insights
+    if hasattr(mood_entries, "summary"):
+        exercise_count = mood_entries.summary()["exercise_count"]
+    else:
+        exercise_count = len(list(filter(lambda entry: entry["exercised"], mood_entries)))
+    exercise_percentage = exercise_count / len(mood_entries) * 100
+    
+    return combine_insights(mood_patterns, sleep_analysis["patterns"], exercise_percentage)
+
+# Pure function to combine pattern analyses into sorted insights
+def combine_insights(mood_patterns, sleep_patterns, exercise_percentage):
+    """Combine mood patterns, sleep patterns and exercise ratio into insights"""
     insights = []
     
     # Add mood pattern insights
@@ -143,13 +170,10 @@ def generate_insights(mood_entries):
             "description": pattern["description"],
             "severity": pattern["severity"]
         },
-        sleep_analysis["patterns"]
+        sleep_patterns
     ))
     
     # Add exercise insights
-    exercise_days = list(filter(lambda entry: entry["exercised"], mood_entries))
-    exercise_percentage = len(exercise_days) / len(mood_entries) * 100
-    
     if exercise_percentage < 30:
         insights.append({
             "type": "exercise",
@@ -0,0 +1,259 @@
+"""
+Incremental Insights Module - Functional Programming Paradigm
+
+This module maintains the results of functional.analysis.generate_insights
+for the most recent mood entries while entries arrive one at a time, so the
+dashboard can read precomputed insights instead of re-analyzing history.
+StreamingSummary summarizes a whole history read once, in any order, in
+constant memory.
+"""
+
+import heapq
+from bisect import bisect_left
+from collections import deque
+
+from functional.analysis import make_pattern, combine_insights, generate_insights
+from procedural.mood_store import entry_epoch
+
+class IncrementalInsights:
+    """Running insight state over the last `window` mood entries"""
+
+    def __init__(self, window=7):
+        """Initialize empty running state; window=None tracks the whole history"""
+        self.window = window
+        # Chronological (oldest first) tuples of (timestamp, rating, sleep, exercised)
+        self._entries = deque()
+        self._reset_state()
+
+    def _reset_state(self):
+        """Clear all running sums, extremes and streaks"""
+        self._rating_sum = 0
+        self._sleep_sum = 0
+        self._exercise_count = 0
+        # Monotonic deques of (position, sleep) giving window min/max in O(1)
+        self._sleep_min = deque()
+        self._sleep_max = deque()
+        self._position = 0
+        self._evicted = 0
+        # Lengths of the current low / non-decreasing / non-increasing runs
+        self._low_streak = 0
+        self._improving_streak = 0
+        self._declining_streak = 0
+        # One flag per consecutive pair in the window: |difference| >= 4
+        self._swing_flags = deque()
+        self._swing_count = 0
+
+    def subscribe_to(self, user):
+        """Observe every mood entry added to a User"""
+        # The user's history is already in order, ties included, so the window is
+        # seeded directly; replaying it through observe would reverse equal timestamps
+        self._entries.clear()
+        self._reset_state()
+        for entry in reversed(user.get_recent_mood_entries(self.window or len(user.mood_history))):
+            self._push(self._item(entry))
+        user.subscribe(self.observe)
+        return self
+
+    @staticmethod
+    def _item(entry):
+        """Get the (timestamp, rating, sleep, exercised) tuple kept for an entry"""
+        return (
+            entry_epoch(entry),
+            entry["mood_rating"],
+            entry["sleep_hours"],
+            bool(entry["exercised"])
+        )
+
+    def observe(self, entry):
+        """Update the running state with a newly added mood entry"""
+        item = self._item(entry)
+        if not self._entries or item[0] > self._entries[-1][0]:
+            self._push(item)
+            return
+
+        # Out-of-order entry: it only matters if it lands inside the window.
+        # The window is rebuilt, so unbounded windows should be fed in time order
+        if self.window is not None and len(self._entries) >= self.window and item[0] < self._entries[0][0]:
+            return
+        # Equal timestamps sort before existing ones, matching sorted(..., reverse=True)
+        timestamps = [existing[0] for existing in self._entries]
+        items = list(self._entries)
+        items.insert(bisect_left(timestamps, item[0]), item)
+        self._entries.clear()
+        self._reset_state()
+        for existing in items:
+            self._push(existing)
+
+    def _push(self, item):
+        """Append the newest item and evict the oldest one beyond the window"""
+        _, rating, sleep_hours, exercised = item
+
+        if self._entries:
+            previous_rating = self._entries[-1][1]
+            swing = abs(rating - previous_rating) >= 4
+            self._swing_flags.append(swing)
+            self._swing_count += swing
+            self._improving_streak = self._improving_streak + 1 if rating >= previous_rating else 1
+            self._declining_streak = self._declining_streak + 1 if rating <= previous_rating else 1
+        else:
+            self._improving_streak = 1
+            self._declining_streak = 1
+        self._low_streak = self._low_streak + 1 if rating <= 4 else 0
+
+        self._entries.append(item)
+        self._rating_sum += rating
+        self._sleep_sum += sleep_hours
+        self._exercise_count += exercised
+
+        position = self._position
+        self._position += 1
+        while self._sleep_min and self._sleep_min[-1][1] >= sleep_hours:
+            self._sleep_min.pop()
+        self._sleep_min.append((position, sleep_hours))
+        while self._sleep_max and self._sleep_max[-1][1] <= sleep_hours:
+            self._sleep_max.pop()
+        self._sleep_max.append((position, sleep_hours))
+
+        if self.window is not None and len(self._entries) > self.window:
+            self._evict()
+
+    def _evict(self):
+        """Drop the oldest item from the window"""
+        _, rating, sleep_hours, exercised = self._entries.popleft()
+        self._rating_sum -= rating
+        self._sleep_sum -= sleep_hours
+        self._exercise_count -= exercised
+        self._swing_count -= self._swing_flags.popleft()
+
+        evicted = self._evicted
+        self._evicted += 1
+        if self._sleep_min[0][0] == evicted:
+            self._sleep_min.popleft()
+        if self._sleep_max[0][0] == evicted:
+            self._sleep_max.popleft()
+
+    def __len__(self):
+        """Get the number of entries in the window"""
+        return len(self._entries)
+
+    def average_mood(self):
+        """Average mood rating over the window"""
+        if not self._entries:
+            return 0
+        return self._rating_sum / len(self._entries)
+
+    def average_sleep(self):
+        """Average hours of sleep over the window"""
+        if not self._entries:
+            return 0
+        if self.window is None:
+            # Nothing is ever subtracted from an unbounded window's sum
+            return self._sleep_sum / len(self._entries)
+        # Summed newest first like generate_insights, so the float result is identical;
+        # a running sum that also subtracts evicted hours drifts away from it
+        return sum(item[2] for item in reversed(self._entries)) / len(self._entries)
+
+    def recent_ratings(self):
+        """Mood ratings in the window, newest first"""
+        return [item[1] for item in reversed(self._entries)]
+
+    def mood_patterns(self):
+        """Equivalent of identify_mood_patterns over the window"""
+        count = len(self._entries)
+        patterns = []
+        if count >= 3 and self._low_streak >= 3:
+            patterns.append(make_pattern("consistent_low_mood"))
+        if count >= 5 and self._improving_streak >= 5:
+            patterns.append(make_pattern("improving_mood"))
+        if count >= 5 and self._declining_streak >= 5:
+            patterns.append(make_pattern("declining_mood"))
+        if count >= 4 and self._swing_count > 0:
+            patterns.append(make_pattern("mood_swings"))
+        return patterns
+
+    def sleep_patterns(self):
+        """Equivalent of analyze_sleep_patterns(...)["patterns"] over the window"""
+        if not self._entries:
+            return []
+        patterns = []
+        if self.average_sleep() < 6:
+            patterns.append(make_pattern("insufficient_sleep"))
+        if self._sleep_max[0][1] - self._sleep_min[0][1] >= 3:
+            patterns.append(make_pattern("inconsistent_sleep"))
+        return patterns
+
+    def insights(self):
+        """Equivalent of generate_insights over the window"""
+        if not self._entries:
+            return []
+        return combine_insights(
+            self.mood_patterns(),
+            self.sleep_patterns(),
+            self._exercise_count / len(self._entries) * 100
+        )
+
+
+class StreamingSummary:
+    """Constant-memory summary of a stream of mood entries arriving in any order
+
+    Counts, sums and sleep extremes cover every entry; mood patterns look at the
+    newest `recent` entries, kept in a bounded heap. It provides the summary()
+    and ratings_newest_first() of a store, so generate_insights accepts it.
+    """
+
+    def __init__(self, recent=7):
+        """Initialize an empty summary keeping the newest `recent` ratings"""
+        self.recent = recent
+        self._count = 0
+        self._rating_sum = 0
+        self._sleep_sum = 0
+        self._min_sleep = None
+        self._max_sleep = None
+        self._exercise_count = 0
+        # Min-heap of ((timestamp, -arrival), rating); the root is the oldest entry kept.
+        # Among equal timestamps later arrivals count as older, like a stable newest-first sort
+        self._newest = []
+
+    def observe(self, entry):
+        """Add one mood entry to the summary"""
+        rating = entry["mood_rating"]
+        sleep_hours = entry["sleep_hours"]
+        self._rating_sum += rating
+        self._sleep_sum += sleep_hours
+        self._min_sleep = sleep_hours if self._min_sleep is None else min(self._min_sleep, sleep_hours)
+        self._max_sleep = sleep_hours if self._max_sleep is None else max(self._max_sleep, sleep_hours)
+        self._exercise_count += bool(entry["exercised"])
+
+        item = ((entry_epoch(entry), -self._count), rating)
+        self._count += 1
+        if len(self._newest) < self.recent:
+            heapq.heappush(self._newest, item)
+        elif item > self._newest[0]:
+            heapq.heapreplace(self._newest, item)
+
+    def __len__(self):
+        """Get the number of entries observed"""
+        return self._count
+
+    def summary(self):
+        """Aggregate counts and sums used by the analysis functions"""
+        return {
+            "count": self._count,
+            "rating_sum": self._rating_sum,
+            "sleep_sum": self._sleep_sum,
+            "min_sleep": self._min_sleep,
+            "max_sleep": self._max_sleep,
+            "exercise_count": self._exercise_count
+        }
+
+    def ratings_newest_first(self):
+        """Ratings of the newest `recent` entries, newest first"""
+        return [rating for _, rating in sorted(self._newest, reverse=True)]
+
+    def average_mood(self):
+        """Average mood rating over every entry"""
+        return self._rating_sum / self._count if self._count else 0
+
+    def insights(self):
+        """generate_insights over every entry, with mood patterns over the newest `recent`"""
+        return generate_insights(self)
@@ -0,0 +1,168 @@
+"""
+Vectorized Analysis Module - Functional Programming Paradigm
+
+This module implements the insight pipeline of functional.analysis as pure
+NumPy array operations, so the histories of many users can be analyzed in
+one call. Histories are passed as flat columns plus an `offsets` array:
+user `i` owns rows `offsets[i]:offsets[i + 1]`.
+"""
+
+import numpy as np
+
+from functional.analysis import make_pattern, combine_insights
+from procedural.mood_store import MoodStore, entry_epoch
+
+# Mood patterns in the order identify_mood_patterns reports them
+MOOD_PATTERN_TYPES = ("consistent_low_mood", "improving_mood", "declining_mood", "mood_swings")
+
+# Sleep patterns in the order analyze_sleep_patterns reports them
+SLEEP_PATTERN_TYPES = ("insufficient_sleep", "inconsistent_sleep")
+
+# Pure function to flatten many histories into columns and offsets
+def stack_histories(histories):
+    """Flatten a list of histories (MoodStores or lists of entry dicts) into columns"""
+    counts = np.fromiter((len(history) for history in histories), dtype=np.int64, count=len(histories))
+    offsets = np.zeros(len(histories) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    total = int(offsets[-1])
+
+    timestamps = np.empty(total, dtype=np.int64)
+    ratings = np.empty(total, dtype=np.int16)
+    sleep_hours = np.empty(total, dtype=np.float64)
+    exercised = np.empty(total, dtype=bool)
+
+    for history, start, end in zip(histories, offsets[:-1], offsets[1:]):
+        if start == end:
+            continue
+        if isinstance(history, MoodStore):
+            timestamps[start:end] = history.timestamps
+            ratings[start:end] = history.ratings
+            sleep_hours[start:end] = history.sleep_hours
+            exercised[start:end] = history.exercised
+        else:
+            timestamps[start:end] = [entry_epoch(entry) for entry in history]
+            ratings[start:end] = [entry["mood_rating"] for entry in history]
+            sleep_hours[start:end] = [entry["sleep_hours"] for entry in history]
+            exercised[start:end] = [bool(entry["exercised"]) for entry in history]
+
+    return {
+        "timestamps": timestamps,
+        "ratings": ratings,
+        "sleep_hours": sleep_hours,
+        "exercised": exercised,
+        "offsets": offsets
+    }
+
+# Pure function to compute rolling averages within each history
+def rolling_average(values, window, offsets=None):
+    """Trailing rolling mean of `values` over `window` rows, restarting at each offset"""
+    values = np.asarray(values, dtype=np.float64)
+    if offsets is None:
+        offsets = np.array([0, len(values)], dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    # Prefix sums turn each window sum into a single subtraction
+    prefix = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, out=prefix[1:])
+
+    positions = np.arange(len(values))
+    group_starts = np.repeat(offsets[:-1], np.diff(offsets))
+    window_starts = np.maximum(positions + 1 - window, group_starts)
+    return (prefix[positions + 1] - prefix[window_starts]) / (positions + 1 - window_starts)
+
+# Pure function to analyze a batch of histories
+def analyze_batch(timestamps, ratings, sleep_hours, exercised, offsets):
+    """Compute every pattern flag and summary statistic for each history"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    ratings = np.asarray(ratings, dtype=np.int16)
+    sleep_hours = np.asarray(sleep_hours, dtype=np.float64)
+    exercised = np.asarray(exercised, dtype=bool)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    user_count = len(offsets) - 1
+    counts = np.diff(offsets)
+    groups = np.repeat(np.arange(user_count), counts)
+    safe_counts = np.maximum(counts, 1)
+
+    # Order every history newest first; lexsort is stable, so equal timestamps
+    # keep insertion order exactly like sorted(..., reverse=True)
+    order = np.lexsort((-timestamps, groups))
+    newest_first = ratings[order]
+    positions = np.arange(len(order)) - offsets[groups]
+
+    # Consecutive pairs inside the same history
+    pair_groups = groups[:-1]
+    same_history = groups[:-1] == groups[1:]
+    pair_positions = positions[:-1]
+    differences = newest_first[:-1] - newest_first[1:]
+
+    def per_user(weights):
+        return np.bincount(groups, weights=weights, minlength=user_count)
+
+    def per_pair(weights):
+        return np.bincount(pair_groups, weights=weights, minlength=user_count)
+
+    # Mood patterns
+    low_recent = per_user((positions < 3) & (newest_first <= 4))
+    leading_pairs = same_history & (pair_positions < 4)
+    improving_pairs = per_pair(leading_pairs & (differences >= 0))
+    declining_pairs = per_pair(leading_pairs & (differences <= 0))
+    swing_pairs = per_pair(same_history & (np.abs(differences) >= 4))
+
+    # Sleep statistics; reduceat only sees non-empty histories
+    average_sleep = per_user(sleep_hours) / safe_counts
+    sleep_range = np.zeros(user_count, dtype=np.float64)
+    non_empty = counts > 0
+    if non_empty.any():
+        starts = offsets[:-1][non_empty]
+        sleep_range[non_empty] = (
+            np.maximum.reduceat(sleep_hours, starts) - np.minimum.reduceat(sleep_hours, starts)
+        )
+
+    return {
+        "counts": counts,
+        "average_mood": per_user(ratings) / safe_counts,
+        "consistent_low_mood": (counts >= 3) & (low_recent == 3),
+        "improving_mood": (counts >= 5) & (improving_pairs == 4),
+        "declining_mood": (counts >= 5) & (declining_pairs == 4),
+        "mood_swings": (counts >= 4) & (swing_pairs > 0),
+        "average_sleep": average_sleep,
+        "insufficient_sleep": non_empty & (average_sleep < 6),
+        "inconsistent_sleep": non_empty & (sleep_range >= 3),
+        "exercise_percentage": per_user(exercised) / safe_counts * 100
+    }
+
+# Pure function to turn batch flags for one user into pattern dicts
+def patterns_for_user(batch, user_index, pattern_types):
+    """Build the pattern dicts flagged for one user of an analyze_batch result"""
+    return [
+        make_pattern(pattern_type)
+        for pattern_type in pattern_types
+        if batch[pattern_type][user_index]
+    ]
+
+# Pure function to identify mood patterns for many histories
+def identify_mood_patterns_batch(histories):
+    """Vectorized identify_mood_patterns over a list of histories"""
+    batch = analyze_batch(**stack_histories(histories))
+    return [
+        patterns_for_user(batch, user_index, MOOD_PATTERN_TYPES)
+        for user_index in range(len(histories))
+    ]
+
+# Pure function to generate insights for many histories
+def generate_insights_batch(histories):
+    """Vectorized generate_insights over a list of histories"""
+    return insights_from_batch(analyze_batch(**stack_histories(histories)))
+
+# Pure function to turn a whole analyze_batch result into insight lists
+def insights_from_batch(batch):
+    """Build the generate_insights result for every user of an analyze_batch result"""
+    return [
+        combine_insights(
+            patterns_for_user(batch, user_index, MOOD_PATTERN_TYPES),
+            patterns_for_user(batch, user_index, SLEEP_PATTERN_TYPES),
+            float(batch["exercise_percentage"][user_index])
+        ) if batch["counts"][user_index] else []
+        for user_index in range(len(batch["counts"]))
+    ]
@@ -0,0 +1,213 @@
+"""
+Cohort Insights Job
+
+This module runs the insight pipeline for every user stored in an SQLite
+database and flags users whose recent mood shows the patterns in
+FLAGGED_PATTERNS, for the nightly review.
+
+Users are split into shards of consecutive user ids. A process pool analyzes
+shards independently, each one with a single range query and one call to the
+vectorized pipeline of functional.vectorized_analysis, so the job scales with
+the number of cores. Every finished shard is written atomically as a part file
+next to the output; a rerun after a crash skips shards whose part already
+exists, and the parts are merged into the output once all of them are done.
+
+Run `python -m jobs.cohort_insights users.db cohort.jsonl --workers 8`.
+"""
+
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from procedural.sqlite_storage import ConnectionPool, list_user_ids, list_user_ids_between, select_mood_columns
+from functional.vectorized_analysis import MOOD_PATTERN_TYPES, analyze_batch, insights_from_batch
+
+# Mood patterns that flag a user for review
+FLAGGED_PATTERNS = ("consistent_low_mood", "declining_mood")
+
+# Connection of the current worker process, opened by _init_worker
+_worker_pool = None
+
+# Pure function to turn one shard's rows into analyze_batch columns
+def shard_columns(user_ids, rows, window=None):
+    """Build columns and offsets for user_ids from select_mood_columns rows
+
+    window: keep only each user's newest `window` entries, as the dashboard does
+    """
+    index = {user_id: position for position, user_id in enumerate(user_ids)}
+    # Entries of users created after the shard list was taken are left for the next run
+    rows = [row for row in rows if row[0] in index]
+    groups = np.fromiter((index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+    columns = {
+        "timestamps": np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)),
+        "ratings": np.fromiter((row[2] for row in rows), dtype=np.int16, count=len(rows)),
+        "sleep_hours": np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows)),
+        "exercised": np.fromiter((row[4] for row in rows), dtype=bool, count=len(rows))
+    }
+
+    counts = np.bincount(groups, minlength=len(user_ids))
+    if window is not None:
+        # Rows come newest first per user, so the window is each group's leading rows
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        keep = np.arange(len(rows)) - starts < window
+        columns = {name: values[keep] for name, values in columns.items()}
+        counts = np.minimum(counts, window)
+
+    offsets = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    columns["offsets"] = offsets
+    return columns
+
+# Pure function to build the output records of one shard
+def shard_records(user_ids, columns):
+    """Analyze a shard's columns and build one record per user"""
+    batch = analyze_batch(**columns)
+    insights = insights_from_batch(batch)
+    records = []
+    for position, user_id in enumerate(user_ids):
+        patterns = [pattern for pattern in MOOD_PATTERN_TYPES if batch[pattern][position]]
+        records.append({
+            "user_id": user_id,
+            "entries": int(batch["counts"][position]),
+            "average_mood": float(batch["average_mood"][position]),
+            "mood_patterns": patterns,
+            "flags": [pattern for pattern in FLAGGED_PATTERNS if pattern in patterns],
+            "insights": insights[position]
+        })
+    return records
+
+# Write a file so that readers see either nothing or the whole file
+def write_atomically(path, lines):
+    """Write lines to a temporary file, sync it and rename it over path"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.writelines(lines)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+# Open the database connection of a worker process
+def _init_worker(database):
+    """Process pool initializer: open one read connection per worker"""
+    global _worker_pool
+    _worker_pool = ConnectionPool(database, size=1)
+
+# Analyze one shard in a worker process
+def analyze_shard(shard_index, first_user_id, last_user_id, part_path, window=None, flagged_only=False):
+    """Analyze the users in [first_user_id, last_user_id] and write their part file
+
+    Returns (shard_index, users analyzed, users flagged).
+    """
+    user_ids = list_user_ids_between(_worker_pool, first_user_id, last_user_id)
+    rows = select_mood_columns(_worker_pool, first_user_id, last_user_id)
+    records = shard_records(user_ids, shard_columns(user_ids, rows, window))
+    flagged = [record for record in records if record["flags"]]
+    write_atomically(part_path, (json.dumps(record) + "\n" for record in (flagged if flagged_only else records)))
+    return shard_index, len(records), len(flagged)
+
+# Split the stored users into shards of consecutive ids
+def plan_shards(pool, shard_size):
+    """Get [first_user_id, last_user_id] bounds of shards of shard_size users"""
+    user_ids = list_user_ids(pool)
+    return [
+        [user_ids[start], user_ids[min(start + shard_size, len(user_ids)) - 1]]
+        for start in range(0, len(user_ids), shard_size)
+    ]
+
+# Load the shard plan of an interrupted run, or plan and record a new one
+def load_or_plan(database, parts_directory, shard_size, window, flagged_only):
+    """Get the run's shard plan; the plan is saved so a resumed run keeps its shards"""
+    manifest_path = os.path.join(parts_directory, "manifest.json")
+    settings = {"database": os.path.abspath(database), "shard_size": shard_size,
+                "window": window, "flagged_only": flagged_only}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest["settings"] != settings:
+            raise ValueError(
+                f"{parts_directory} holds a run with different settings; remove it to start over"
+            )
+        return manifest["shards"]
+
+    pool = ConnectionPool(database, size=1)
+    try:
+        shards = plan_shards(pool, shard_size)
+    finally:
+        pool.close()
+    os.makedirs(parts_directory, exist_ok=True)
+    write_atomically(manifest_path, [json.dumps({"settings": settings, "shards": shards})])
+    return shards
+
+# Concatenate finished part files into the output
+def merge_parts(part_paths, output):
+    """Stream the part files, in shard order, into the output file atomically"""
+    temporary = f"{output}.tmp"
+    with open(temporary, "wb") as merged:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part:
+                shutil.copyfileobj(part, merged)
+        merged.flush()
+        os.fsync(merged.fileno())
+    os.replace(temporary, output)
+
+# Run the cohort job
+def run_cohort_job(database, output, workers=None, shard_size=1000, window=7, flagged_only=False,
+                   keep_parts=False, progress=None):
+    """Analyze every user of an SQLite database file and write JSON lines to output
+
+    workers: number of processes (defaults to the number of cores)
+    window: analyze each user's newest `window` entries, like the dashboard; None for all
+    flagged_only: write only users with a FLAGGED_PATTERNS pattern
+    progress: optional callable(done_shards, total_shards)
+    Returns counts of shards, resumed shards, users and flagged users.
+    """
+    if database == ":memory:":
+        raise ValueError("The cohort job reads the database from several processes; use a database file")
+    parts_directory = f"{output}.parts"
+    shards = load_or_plan(database, parts_directory, shard_size, window, flagged_only)
+    part_paths = [os.path.join(parts_directory, f"shard-{index:06d}.jsonl") for index in range(len(shards))]
+    todo = [index for index, part_path in enumerate(part_paths) if not os.path.exists(part_path)]
+
+    summary = {"shards": len(shards), "resumed_shards": len(shards) - len(todo), "users": 0, "flagged": 0}
+    if todo:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(database,)) as executor:
+            futures = [
+                executor.submit(analyze_shard, index, *shards[index], part_paths[index], window, flagged_only)
+                for index in todo
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                _, users, flagged = future.result()
+                summary["users"] += users
+                summary["flagged"] += flagged
+                if progress is not None:
+                    progress(summary["resumed_shards"] + done, len(shards))
+
+    merge_parts(part_paths, output)
+    if not keep_parts:
+        shutil.rmtree(parts_directory)
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Nightly cohort insights over every stored user")
+    parser.add_argument("database", help="SQLite database file of the server mode (MHSS_DATABASE)")
+    parser.add_argument("output", help="JSON lines file to write, one record per user")
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of cores)")
+    parser.add_argument("--shard-size", type=int, default=1000, help="users per shard and checkpoint")
+    parser.add_argument("--window", type=int, default=7, help="newest entries analyzed per user; 0 for all")
+    parser.add_argument("--flagged-only", action="store_true", help="write only users flagged for review")
+    parser.add_argument("--keep-parts", action="store_true", help="keep the per-shard part files after merging")
+    args = parser.parse_args()
+
+    summary = run_cohort_job(
+        args.database, args.output, args.workers, args.shard_size, args.window or None,
+        args.flagged_only, args.keep_parts,
+        progress=lambda done, total: print(f"\r{done}/{total} shards", end="", file=sys.stderr)
+    )
+    print(file=sys.stderr)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,397 @@
+"""
+Datalog Engine - Logical Programming Paradigm
+
+This module implements a small, pure-Python Datalog engine for the
+Mental Health Support System. It parses the facts and rules of a Prolog
+source file such as prolog_rules.pl and materializes every derived
+relation bottom-up with semi-naive evaluation and hash-indexed joins, so
+queries become dictionary lookups instead of backtracking searches.
+
+Only the Datalog subset of Prolog is evaluated: facts, and rules whose
+bodies are conjunctions of relation literals and comparisons over atoms,
+numbers and strings. Rules that need lists or built-ins such as findall/3,
+member/2 or length/2 are parsed but kept aside in `skipped_rules`.
+"""
+
+import re
+
+# Token patterns, tried in order
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+|%[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<variable>[A-Z_][A-Za-z0-9_]*)
+  | (?P<atom>[a-z][A-Za-z0-9_]*)
+  | (?P<operator>:-|>=|=<|\\=|==|=:=|=\\=|>|<|=|\\\+)
+  | (?P<punctuation>[(),.\[\]|])
+""", re.VERBOSE | re.DOTALL)
+
+# Comparison operators usable in rule bodies
+COMPARISONS = {
+    ">=": lambda left, right: left >= right,
+    "=<": lambda left, right: left <= right,
+    ">": lambda left, right: left > right,
+    "<": lambda left, right: left < right,
+    "=": lambda left, right: left == right,
+    "==": lambda left, right: left == right,
+    "=:=": lambda left, right: left == right,
+    "\\=": lambda left, right: left != right,
+    "=\\=": lambda left, right: left != right
+}
+
+class Variable:
+    """A logic variable, identified by name within one clause"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        """Initialize a variable"""
+        self.name = name
+
+    def __eq__(self, other):
+        """Variables are equal when their names are"""
+        return isinstance(other, Variable) and other.name == self.name
+
+    def __hash__(self):
+        """Hash by name"""
+        return hash(("Variable", self.name))
+
+    def __repr__(self):
+        """Represent the variable by name"""
+        return self.name
+
+class Compound:
+    """A compound term such as suggests(worry, anxiety), or a list or conjunction"""
+
+    __slots__ = ("functor", "args")
+
+    def __init__(self, functor, args):
+        """Initialize a compound term"""
+        self.functor = functor
+        self.args = tuple(args)
+
+    def __repr__(self):
+        """Represent the term in Prolog syntax"""
+        return f"{self.functor}({', '.join(map(repr, self.args))})"
+
+class Literal:
+    """A relation literal pred(args) or a comparison `left op right` in a rule body"""
+
+    __slots__ = ("predicate", "args", "operator")
+
+    def __init__(self, predicate, args, operator=None):
+        """Initialize a literal; comparisons use operator and two args"""
+        self.predicate = predicate
+        self.args = tuple(args)
+        self.operator = operator
+
+    def __repr__(self):
+        """Represent the literal in Prolog syntax"""
+        if self.operator:
+            return f"{self.args[0]!r} {self.operator} {self.args[1]!r}"
+        return f"{self.predicate}({', '.join(map(repr, self.args))})"
+
+class Rule:
+    """A clause head :- body; facts are rules with an empty body"""
+
+    __slots__ = ("head", "body")
+
+    def __init__(self, head, body):
+        """Initialize a rule"""
+        self.head = head
+        self.body = tuple(body)
+
+    def __repr__(self):
+        """Represent the rule in Prolog syntax"""
+        if not self.body:
+            return f"{self.head!r}."
+        return f"{self.head!r} :- {', '.join(map(repr, self.body))}."
+
+class _Parser:
+    """Recursive-descent parser for the Prolog clause syntax used by the rules file"""
+
+    def __init__(self, source):
+        """Tokenize the source text"""
+        self.tokens = []
+        position = 0
+        while position < len(source):
+            match = TOKEN_PATTERN.match(source, position)
+            if match is None:
+                raise SyntaxError(f"Unexpected character {source[position]!r} at offset {position}")
+            position = match.end()
+            if match.lastgroup != "space":
+                self.tokens.append((match.lastgroup, match.group()))
+        self.index = 0
+
+    def peek(self):
+        """Get the next token without consuming it"""
+        if self.index < len(self.tokens):
+            return self.tokens[self.index]
+        return (None, None)
+
+    def take(self, value=None):
+        """Consume the next token, optionally requiring its text"""
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise SyntaxError(f"Expected {value!r}, found {token[1]!r}")
+        self.index += 1
+        return token
+
+    def clauses(self):
+        """Parse every clause of the source"""
+        while self.peek()[0] is not None:
+            head = self.term()
+            body = []
+            if self.peek()[1] == ":-":
+                self.take(":-")
+                body = self.conjunction()
+            self.take(".")
+            yield head, body
+
+    def conjunction(self):
+        """Parse goal, goal, ... up to the end of the clause or group"""
+        goals = [self.goal()]
+        while self.peek()[1] == ",":
+            self.take(",")
+            goals.append(self.goal())
+        return goals
+
+    def goal(self):
+        """Parse a goal: a term optionally followed by a comparison operator and term"""
+        left = self.term()
+        kind, value = self.peek()
+        if kind == "operator" and value in COMPARISONS:
+            self.take()
+            return Compound(value, (left, self.term()))
+        return left
+
+    def term(self):
+        """Parse a single term"""
+        kind, value = self.take()
+        if kind == "variable":
+            return Variable(value)
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "string":
+            return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        if kind == "atom":
+            if self.peek()[1] != "(":
+                return value
+            self.take("(")
+            args = [self.goal()]
+            while self.peek()[1] == ",":
+                self.take(",")
+                args.append(self.goal())
+            self.take(")")
+            return Compound(value, args)
+        if value == "(":
+            goals = self.conjunction()
+            self.take(")")
+            return goals[0] if len(goals) == 1 else Compound(",", goals)
+        if value == "[":
+            items = []
+            if self.peek()[1] != "]":
+                items.append(self.term())
+                while self.peek()[1] in (",", "|"):
+                    self.take()
+                    items.append(self.term())
+            self.take("]")
+            return Compound("[]", items)
+        raise SyntaxError(f"Unexpected token {value!r}")
+
+# Check whether a term is a plain Datalog argument
+def _is_simple(term):
+    """A Datalog argument is a variable, atom, number or string"""
+    return not isinstance(term, Compound)
+
+# Convert a parsed goal into a body literal, or None if it is not Datalog
+def _to_literal(goal):
+    """Convert a parsed goal into a Literal, or None if it needs full Prolog"""
+    if isinstance(goal, str):
+        return Literal(goal, ())
+    if not isinstance(goal, Compound) or not all(map(_is_simple, goal.args)):
+        return None
+    if goal.functor in COMPARISONS:
+        return Literal(None, goal.args, goal.functor)
+    if goal.functor in (",", "[]") or goal.functor in BUILTINS:
+        return None
+    return Literal(goal.functor, goal.args)
+
+# Built-in predicates of full Prolog that this engine does not evaluate
+BUILTINS = {"findall", "member", "length", "is", "not", "call", "bagof", "setof", "append"}
+
+class DatalogEngine:
+    """Bottom-up Datalog evaluator with hash indexes over every relation"""
+
+    def __init__(self):
+        """Initialize an empty program"""
+        # Relations keep facts in first-derived order: predicate -> {tuple: None}
+        self.relations = {}
+        self.rules = []
+        self.skipped_rules = []
+        # (predicate, bound argument positions) -> {key tuple: [fact tuples]}
+        self._indexes = {}
+
+    @classmethod
+    def from_file(cls, filename):
+        """Create an engine from a Prolog source file and materialize it"""
+        with open(filename, "r", encoding="utf-8") as file:
+            return cls.from_source(file.read())
+
+    @classmethod
+    def from_source(cls, source):
+        """Create an engine from Prolog source text and materialize it"""
+        engine = cls()
+        for head, body in _Parser(source).clauses():
+            engine.add_clause(head, body)
+        engine.materialize()
+        return engine
+
+    def add_clause(self, head, body):
+        """Add a parsed clause as a fact, a Datalog rule or a skipped rule"""
+        head_literal = _to_literal(head)
+        body_literals = [_to_literal(goal) for goal in body]
+        if head_literal is None or head_literal.operator or None in body_literals:
+            self.skipped_rules.append(Rule(head, body))
+            return
+        if not body_literals:
+            if any(isinstance(arg, Variable) for arg in head_literal.args):
+                self.skipped_rules.append(Rule(head, body))
+            else:
+                self.add_fact(head_literal.predicate, head_literal.args)
+            return
+
+        # Range restriction: head and comparison variables must be bound by a relation literal
+        bound = {
+            arg for literal in body_literals if not literal.operator
+            for arg in literal.args if isinstance(arg, Variable)
+        }
+        needed = {arg for arg in head_literal.args if isinstance(arg, Variable)}
+        for literal in body_literals:
+            if literal.operator:
+                needed.update(arg for arg in literal.args if isinstance(arg, Variable))
+        if not needed <= bound:
+            self.skipped_rules.append(Rule(head, body))
+            return
+        self.rules.append(Rule(head_literal, body_literals))
+
+    def add_fact(self, predicate, args):
+        """Add a ground fact; returns True if it is new"""
+        relation = self.relations.setdefault(predicate, {})
+        fact = tuple(args)
+        if fact in relation:
+            return False
+        relation[fact] = None
+        for (indexed_predicate, positions), index in self._indexes.items():
+            if indexed_predicate == predicate:
+                key = tuple(fact[position] for position in positions)
+                index.setdefault(key, []).append(fact)
+        return True
+
+    def _index(self, predicate, positions):
+        """Get (building on first use) the hash index of a relation on some positions"""
+        index = self._indexes.get((predicate, positions))
+        if index is None:
+            index = {}
+            for fact in self.relations.get(predicate, ()):
+                key = tuple(fact[position] for position in positions)
+                index.setdefault(key, []).append(fact)
+            self._indexes[(predicate, positions)] = index
+        return index
+
+    def _candidates(self, literal, binding, delta):
+        """Facts of a literal's relation compatible with the current binding"""
+        values = [binding.get(arg, arg) if isinstance(arg, Variable) else arg for arg in literal.args]
+        positions = tuple(i for i, value in enumerate(values) if not isinstance(value, Variable))
+        key = tuple(values[i] for i in positions)
+        if delta is not None:
+            return [fact for fact in delta if all(fact[i] == values[i] for i in positions)]
+        if not positions:
+            return list(self.relations.get(literal.predicate, ()))
+        return self._index(literal.predicate, positions).get(key, ())
+
+    def _solve(self, body, position, binding, delta_position, delta):
+        """Enumerate bindings satisfying body[position:]"""
+        if position == len(body):
+            yield binding
+            return
+        literal = body[position]
+        if literal.operator:
+            left, right = (binding.get(arg, arg) if isinstance(arg, Variable) else arg for arg in literal.args)
+            try:
+                satisfied = COMPARISONS[literal.operator](left, right)
+            except TypeError:
+                satisfied = False
+            if satisfied:
+                yield from self._solve(body, position + 1, binding, delta_position, delta)
+            return
+
+        facts = self._candidates(literal, binding, delta if position == delta_position else None)
+        for fact in facts:
+            extended = dict(binding)
+            for arg, value in zip(literal.args, fact):
+                if isinstance(arg, Variable):
+                    if extended.setdefault(arg, value) != value:
+                        break
+            else:
+                yield from self._solve(body, position + 1, extended, delta_position, delta)
+
+    def _fire(self, rule, delta_position=None, delta=None):
+        """Derive the head facts of a rule; returns the new ones"""
+        derived = []
+        for binding in self._solve(rule.body, 0, {}, delta_position, delta):
+            args = tuple(binding[arg] if isinstance(arg, Variable) else arg for arg in rule.head.args)
+            if self.add_fact(rule.head.predicate, args):
+                derived.append((rule.head.predicate, args))
+        return derived
+
+    def _skip_unsupported_dependents(self):
+        """Set aside rules that use a relation defined only by skipped rules"""
+        while True:
+            defined = set(self.relations) | {rule.head.predicate for rule in self.rules}
+            unsupported = {
+                rule.head.functor if isinstance(rule.head, Compound) else rule.head
+                for rule in self.skipped_rules
+            } - defined
+            dependents = [
+                rule for rule in self.rules
+                if any(literal.predicate in unsupported for literal in rule.body)
+            ]
+            if not dependents:
+                return
+            for rule in dependents:
+                self.rules.remove(rule)
+                self.skipped_rules.append(rule)
+
+    def materialize(self):
+        """Compute every derived relation to a fixpoint with semi-naive evaluation"""
+        self._skip_unsupported_dependents()
+
+        # First round: every rule over the full relations
+        delta = {}
+        for rule in self.rules:
+            for predicate, fact in self._fire(rule):
+                delta.setdefault(predicate, []).append(fact)
+
+        # Later rounds only join against facts derived in the previous round
+        while delta:
+            next_delta = {}
+            for rule in self.rules:
+                for position, literal in enumerate(rule.body):
+                    if literal.operator or literal.predicate not in delta:
+                        continue
+                    for predicate, fact in self._fire(rule, position, delta[literal.predicate]):
+                        next_delta.setdefault(predicate, []).append(fact)
+            delta = next_delta
+
+    def facts(self, predicate):
+        """Get every fact of a relation, in derivation order"""
+        return list(self.relations.get(predicate, ()))
+
+    def query(self, predicate, *pattern):
+        """Get the facts of a relation matching a pattern; None matches anything"""
+        positions = tuple(i for i, value in enumerate(pattern) if value is not None)
+        if not positions:
+            return self.facts(predicate)
+        key = tuple(pattern[i] for i in positions)
+        return list(self._index(predicate, positions).get(key, ()))
@@ -5,80 +5,155 @@ This module provides an interface between Python and Prolog rules
 for the Mental Health Support System.
 """
 
-# In a real implementation, we would use PySwip or a similar library
-# to interface with actual Prolog. For simplicity and to avoid
-# dependencies, we'll simulate the Prolog behavior in Python.
+import os
+from bisect import bisect_left
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+
+from logical.datalog import DatalogEngine
+from monitoring.instrumentation import timed
+
+# Rules file shipped next to this module
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prolog_rules.pl")
+
+# Parse and materialize a rules file once per process
+@lru_cache(maxsize=None)
+def load_rules(filename=RULES_FILE):
+    """Get the materialized Datalog engine for a Prolog rules file"""
+    return DatalogEngine.from_file(filename)
+
+# Read the severity thresholds out of the severity/3 rules
+def severity_ladder(engine):
+    """Get (levels, upper bounds) of severity/3: the highest symptom count of each level but the last
+
+    severity/3 builds on symptom_count/3, which needs findall/3, so the engine keeps
+    its rules aside; their `Count =< N` comparisons give the bounds.
+    """
+    bounded = []
+    unbounded = []
+    for rule in engine.skipped_rules:
+        if getattr(rule.head, "predicate", None) != "severity":
+            continue
+        level = rule.head.args[2]
+        bounds = [literal.args[1] for literal in rule.body if getattr(literal, "operator", None) == "=<"]
+        if bounds:
+            bounded.append((min(bounds), level))
+        else:
+            unbounded.append(level)
+    if len(unbounded) != 1:
+        raise ValueError("severity/3 needs exactly one level without a `Count =< N` bound")
+    bounded.sort()
+    return tuple(level for _, level in bounded) + tuple(unbounded), tuple(bound for bound, _ in bounded)
+
+# Group (key, value) facts into {key: [values]} keeping fact order
+def _group_facts(facts):
+    """Group two-argument facts by their first argument"""
+    groups = {}
+    for key, value in facts:
+        groups.setdefault(key, []).append(value)
+    return groups
 
 class PrologInterface:
     """Interface to Prolog rules - Logical Programming example"""
     
-    def __init__(self):
+    def __init__(self, rules_file=RULES_FILE):
         """Initialize the Prolog interface"""
+        # Facts and derived relations of prolog_rules.pl, evaluated bottom-up
+        self.engine = load_rules(rules_file)
+        
         # Define mood categories
-        self.mood_categories = {
-            1: "negative", 2: "negative", 3: "negative",
-            4: "low", 5: "low",
-            6: "neutral",
-            7: "positive", 8: "positive", 9: "positive", 10: "positive"
-        }
+        self.mood_categories = dict(self.engine.facts("mood_category"))
         
         # Define coping strategies
-        self.coping_strategies = {
-            "deep_breathing": "Try this deep breathing exercise: Breathe in for 4 counts, hold for 4, and exhale for 6. Repeat 5 times.",
-            "mindfulness": "Practice mindfulness: Focus on your surroundings and identify 5 things you can see, 4 things you can touch, 3 things you can hear, 2 things you can smell, and 1 thing you can taste.",
-            "physical_activity": "Take a 10-minute walk or do some light stretching to release tension and improve your mood.",
-            "journaling": "Write down your thoughts and feelings in a journal. This can help process emotions and gain perspective.",
-            "social_connection": "Reach out to a friend or family member for support. Social connection can improve mood and reduce stress.",
-            "gratitude": "Write down three things you're grateful for today, no matter how small.",
-            "music": "Listen to music that matches the mood you want to achieve, not necessarily your current mood.",
-            "nature": "Spend 15 minutes outside in nature, which has been shown to reduce stress and improve mood.",
-            "progressive_relaxation": "Try progressive muscle relaxation: Tense and then release each muscle group in your body, starting from your toes and working up to your head.",
-            "distraction": "Engage in a pleasant activity that will distract you from negative thoughts, such as reading, watching a show, or playing a game."
-        }
+        self.coping_strategies = dict(self.engine.facts("coping_strategy"))
         
         # Define which strategies are suitable for which mood categories
-        self.mood_strategy_map = {
-            "deep_breathing": ["negative", "low", "neutral"],
-            "mindfulness": ["negative", "low", "neutral", "positive"],
-            "physical_activity": ["negative", "low", "neutral", "positive"],
-            "journaling": ["negative", "low", "neutral", "positive"],
-            "social_connection": ["low", "neutral", "positive"],
-            "gratitude": ["low", "neutral", "positive"],
-            "music": ["negative", "low", "neutral", "positive"],
-            "nature": ["negative", "low", "neutral", "positive"],
-            "progressive_relaxation": ["negative", "low"],
-            "distraction": ["negative", "low"]
-        }
+        self.mood_strategy_map = _group_facts(self.engine.facts("suitable_for_mood"))
         
         # Define which strategies are suitable for which concerns
         self.concern_strategy_map = {
-            "stress": ["deep_breathing", "mindfulness", "physical_activity", "journaling", "music", "nature", "progressive_relaxation"],
-            "anxiety": ["deep_breathing", "mindfulness", "physical_activity", "journaling", "music", "nature", "progressive_relaxation", "distraction"],
-            "depression": ["physical_activity", "journaling", "social_connection", "gratitude", "music", "nature", "distraction"],
-            "sleep": ["physical_activity", "progressive_relaxation"],
-            "concentration": ["mindfulness"],
-            "motivation": ["gratitude", "music"],
-            "social": ["social_connection"]
+            concern: [strategy for strategy, _ in self.engine.query("suitable_for_concern", None, concern)]
+            for (concern,) in self.engine.facts("concern")
         }
         
         # Define symptom to condition mapping
         self.symptom_condition_map = {
-            "sleep_issues": ["stress", "anxiety", "depression"],
-            "fatigue": ["stress", "depression"],
-            "concentration_problems": ["stress", "anxiety", "depression"],
-            "irritability": ["stress", "anxiety"],
-            "worry": ["anxiety", "stress"],
-            "sadness": ["depression"],
-            "loss_of_interest": ["depression"],
-            "physical_tension": ["anxiety", "stress"],
-            "racing_thoughts": ["anxiety"],
-            "appetite_changes": ["depression", "stress"]
+            symptom: [condition for _, condition in self.engine.query("suggests", symptom, None)]
+            for (symptom,) in self.engine.facts("symptom")
         }
+        
+        # Conditions in the order primary_concern/2 prefers them on ties
+        self.conditions = tuple(dict.fromkeys(
+            condition for _, condition in self.engine.facts("suggests")
+        ))
+        
+        # severity/3: levels and the highest symptom count of each but the last
+        self.severity_levels, self.severity_upper_bounds = severity_ladder(self.engine)
+        
+        # Compile the strategy relations into bitmask indexes for fast queries
+        self._compile_strategy_index()
+        self._compile_symptom_index()
+        
+        # The tables are read-only, so one instance can serve every session and thread
+        self._freeze_tables()
+    
+    def _freeze_tables(self):
+        """Replace the public tables with read-only views and tuples"""
+        self.mood_categories = MappingProxyType(self.mood_categories)
+        self.coping_strategies = MappingProxyType(self.coping_strategies)
+        for name in ("mood_strategy_map", "concern_strategy_map", "symptom_condition_map"):
+            table = {key: tuple(values) for key, values in getattr(self, name).items()}
+            setattr(self, name, MappingProxyType(table))
+        self.mood_strategy_masks = MappingProxyType(self.mood_strategy_masks)
+        self.concern_strategy_masks = MappingProxyType(self.concern_strategy_masks)
+        self.mood_concern_strategy_masks = MappingProxyType(self.mood_concern_strategy_masks)
+        self.symptom_columns = MappingProxyType(self.symptom_columns)
+        self.symptom_incidence.setflags(write=False)
+    
+    def _compile_strategy_index(self):
+        """Compile the materialized strategy relations into bitmask indexes"""
+        # Bit i stands for the i-th strategy, in the order strategies are recommended
+        self.strategy_order = tuple(self.mood_strategy_map)
+        strategy_bits = {strategy: 1 << i for i, strategy in enumerate(self.strategy_order)}
+        
+        # suitable_strategy_mood_only(Strategy, MoodCategory)
+        self.mood_strategy_masks = {}
+        for strategy, mood in self.engine.facts("suitable_strategy_mood_only"):
+            self.mood_strategy_masks[mood] = self.mood_strategy_masks.get(mood, 0) | strategy_bits[strategy]
+        
+        # suitable_strategy_concern_only(Strategy, Concern)
+        self.concern_strategy_masks = {}
+        for strategy, concern in self.engine.facts("suitable_strategy_concern_only"):
+            self.concern_strategy_masks[concern] = self.concern_strategy_masks.get(concern, 0) | strategy_bits.get(strategy, 0)
+        
+        # suitable_strategy(Strategy, MoodCategory, Concern)
+        self.mood_concern_strategy_masks = {}
+        for strategy, mood, concern in self.engine.facts("suitable_strategy"):
+            key = (mood, concern)
+            self.mood_concern_strategy_masks[key] = self.mood_concern_strategy_masks.get(key, 0) | strategy_bits[strategy]
+        
+        # Memoized query results: (mood_category, has_concerns, known concerns) -> names.
+        # Entries are immutable and set atomically, so concurrent queries may share it
+        self._strategy_cache = {}
+    
+    def _compile_symptom_index(self):
+        """Compile suggests/2 into a symptom x condition incidence matrix"""
+        self.symptom_order = tuple(self.symptom_condition_map)
+        self.symptom_columns = {symptom: i for i, symptom in enumerate(self.symptom_order)}
+        condition_columns = {condition: j for j, condition in enumerate(self.conditions)}
+        
+        self.symptom_incidence = np.zeros((len(self.symptom_order), len(self.conditions)), dtype=np.int64)
+        for symptom, conditions in self.symptom_condition_map.items():
+            for condition in conditions:
+                self.symptom_incidence[self.symptom_columns[symptom], condition_columns[condition]] += 1
     
     def get_mood_category(self, mood_rating):
         """Get the mood category for a given mood rating"""
         return self.mood_categories.get(mood_rating, "neutral")
     
+    @timed("prolog.get_coping_strategies")
     def get_coping_strategies(self, mood_rating, concerns=None):
         """
         Get coping strategies based on mood and concerns
@@ -89,53 +164,60 @@ class PrologInterface:
         
         mood_category = self.get_mood_category(mood_rating)
         
-        # Find strategies suitable for the mood
-        suitable_strategies = []
-        for strategy, suitable_moods in self.mood_strategy_map.items():
-            if mood_category in suitable_moods:
-                # If no concerns, add all strategies suitable for the mood
-                if not concerns:
-                    suitable_strategies.append({
-                        "name": strategy,
-                        "description": self.coping_strategies[strategy]
-                    })
-                else:
-                    # Check if strategy is suitable for any of the concerns
-                    for concern in concerns:
-                        if concern in self.concern_strategy_map and strategy in self.concern_strategy_map[concern]:
-                            suitable_strategies.append({
-                                "name": strategy,
-                                "description": self.coping_strategies[strategy]
-                            })
-                            break
-        
-        # Return top 3 strategies
-        return suitable_strategies[:3]
+        # Unknown concerns match no strategy, so only known ones go into the key;
+        # whether any concerns were given at all still changes the answer
+        known_concerns = frozenset(
+            concern for concern in concerns if concern in self.concern_strategy_masks
+        )
+        key = (mood_category, bool(concerns), known_concerns)
+        names = self._strategy_cache.get(key)
+        
+        if names is None:
+            # suitable_strategy(Strategy, MoodCategory, Concern) for any given concern
+            if concerns:
+                mask = 0
+                for concern in known_concerns:
+                    mask |= self.mood_concern_strategy_masks.get((mood_category, concern), 0)
+            else:
+                mask = self.mood_strategy_masks.get(mood_category, 0)
+            
+            # Take the top 3 strategies, lowest bit first
+            names = []
+            while mask and len(names) < 3:
+                lowest_bit = mask & -mask
+                names.append(self.strategy_order[lowest_bit.bit_length() - 1])
+                mask ^= lowest_bit
+            names = tuple(names)
+            self._strategy_cache[key] = names
+        
+        return [
+            {
+                "name": strategy,
+                "description": self.coping_strategies[strategy]
+            }
+            for strategy in names
+        ]
     
+    @timed("prolog.analyze_symptoms")
     def analyze_symptoms(self, symptoms):
         """
         Analyze symptoms and suggest possible conditions
         This simulates the Prolog rules for symptom analysis
         """
-        # Count symptoms for each condition
-        condition_counts = {"stress": 0, "anxiety": 0, "depression": 0}
+        # symptom_count/3: count symptoms for each condition via the suggests index
+        condition_counts = dict.fromkeys(self.conditions, 0)
         
         for symptom in symptoms:
             if symptom in self.symptom_condition_map:
                 for condition in self.symptom_condition_map[symptom]:
                     condition_counts[condition] += 1
         
-        # Determine primary concern
+        # primary_concern/2: first condition with the highest count
         primary_concern = max(condition_counts, key=condition_counts.get)
         
-        # Determine severity
+        # severity/3: the first level whose upper bound the count does not exceed
         count = condition_counts[primary_concern]
-        if count <= 2:
-            severity = "low"
-        elif count <= 4:
-            severity = "moderate"
-        else:
-            severity = "high"
+        severity = self.severity_levels[bisect_left(self.severity_upper_bounds, count)]
         
         return {
             "primary_concern": primary_concern,
@@ -143,6 +225,63 @@ class PrologInterface:
             "condition_counts": condition_counts
         }
     
+    def symptom_matrix(self, symptom_lists):
+        """Encode symptom lists as a rows x symptoms matrix of occurrence counts"""
+        rows = []
+        columns = []
+        for row, symptoms in enumerate(symptom_lists):
+            for symptom in symptoms:
+                column = self.symptom_columns.get(symptom)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        
+        # Repeated symptoms count repeatedly, as in the scalar path
+        width = len(self.symptom_order)
+        cells = np.asarray(rows, dtype=np.int64) * width + np.asarray(columns, dtype=np.int64)
+        counts = np.bincount(cells, minlength=len(symptom_lists) * width)
+        return counts.reshape(len(symptom_lists), width)
+    
+    @timed("prolog.analyze_symptoms_batch")
+    def analyze_symptoms_batch(self, symptom_lists):
+        """
+        Analyze many symptom lists at once
+        Returns the same result dicts as analyze_symptoms, one per list
+        """
+        symptom_lists = list(symptom_lists)
+        if not symptom_lists:
+            return []
+        
+        # symptom_count/3 for every row and condition in one matrix multiply
+        condition_counts = self.symptom_matrix(symptom_lists) @ self.symptom_incidence
+        
+        # argmax returns the first maximum, matching primary_concern/2 on ties
+        primary = condition_counts.argmax(axis=1)
+        primary_counts = condition_counts[np.arange(len(symptom_lists)), primary]
+        severity = np.searchsorted(self.severity_upper_bounds, primary_counts, side="left")
+        
+        return [
+            {
+                "primary_concern": self.conditions[concern],
+                "severity": self.severity_levels[level],
+                "condition_counts": dict(zip(self.conditions, counts))
+            }
+            for concern, level, counts in zip(primary.tolist(), severity.tolist(), condition_counts.tolist())
+        ]
+    
+    def get_recommendations_batch(self, analysis_results):
+        """Get recommendations for many symptom analyses"""
+        # Recommendations only depend on (primary concern, severity)
+        computed = {}
+        batch = []
+        for analysis_result in analysis_results:
+            key = (analysis_result["primary_concern"], analysis_result["severity"])
+            if key not in computed:
+                computed[key] = self.get_recommendations(analysis_result)
+            batch.append([dict(recommendation) for recommendation in computed[key]])
+        return batch
+    
+    @timed("prolog.get_recommendations")
     def get_recommendations(self, analysis_result):
         """Get recommendations based on symptom analysis"""
         primary_concern = analysis_result["primary_concern"]
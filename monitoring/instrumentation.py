@@ -0,0 +1,267 @@
+"""
+Instrumentation Module
+
+This module times the hot paths of the Mental Health Support System and
+exports the timings as Prometheus metrics. Timing is off unless the
+MHSS_METRICS environment variable is set (to anything but "" or "0") before
+the instrumented modules are imported; when it is off, `timed` returns the
+decorated function itself and `timer` a shared no-op context, so
+instrumentation costs nothing.
+
+When on, durations are kept per operation in log-scale buckets, so memory
+stays constant however long the process runs, and exported as a Prometheus
+summary (count, sum and p50/p95/p99):
+    MHSS_METRICS_FILE      file rewritten every MHSS_METRICS_INTERVAL seconds (default 10) and at exit
+    MHSS_METRICS_PORT      serve GET /metrics on this port from a background thread
+
+`profiled` captures a cProfile of one block, such as a single Streamlit rerun.
+"""
+
+import atexit
+import cProfile
+import functools
+import io
+import math
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Whether timing is on; read once, when this module is imported
+ENABLED = os.getenv("MHSS_METRICS", "") not in ("", "0")
+
+# Name of the exported summary metric
+METRIC_NAME = "mhss_operation_duration_seconds"
+
+# Quantiles exported for every operation
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Buckets per doubling of duration; quantiles are accurate to about 2^(1/8) - 1 = 9%
+BUCKETS_PER_OCTAVE = 8
+
+class Histogram:
+    """Log-scale histogram of durations with approximate quantiles"""
+
+    def __init__(self):
+        """Initialize an empty histogram"""
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        # bucket index -> count; bucket b holds durations in [2^(b/8), 2^((b+1)/8))
+        self.buckets = {}
+
+    def observe(self, seconds):
+        """Record one duration"""
+        bucket = math.floor(math.log2(seconds) * BUCKETS_PER_OCTAVE) if seconds > 0 else None
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, fraction):
+        """Estimate a quantile as the geometric middle of its bucket, within the observed range"""
+        if not self.count:
+            return float("nan")
+        rank = fraction * (self.count - 1)
+        seen = 0
+        # Zero durations (bucket None) sort before every other bucket
+        for bucket in sorted(self.buckets, key=lambda bucket: -math.inf if bucket is None else bucket):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                if bucket is None:
+                    return 0.0
+                return min(max(2 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE), self.min), self.max)
+        return self.max
+
+class MetricsRegistry:
+    """Thread-safe set of per-operation duration histograms"""
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation, seconds):
+        """Record one duration of an operation"""
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        """Get {operation: {"count", "sum", quantile: seconds}} for every operation"""
+        with self._lock:
+            return {
+                operation: {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    **{quantile: histogram.quantile(quantile) for quantile in QUANTILES}
+                }
+                for operation, histogram in sorted(self._histograms.items())
+            }
+
+    def render(self):
+        """Render every histogram in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Duration of instrumented operations in seconds.",
+            f"# TYPE {METRIC_NAME} summary"
+        ]
+        for operation, summary in self.snapshot().items():
+            label = operation.replace("\\", "\\\\").replace('"', '\\"')
+            for quantile in QUANTILES:
+                lines.append(f'{METRIC_NAME}{{operation="{label}",quantile="{quantile}"}} {summary[quantile]:.9g}')
+            lines.append(f'{METRIC_NAME}_sum{{operation="{label}"}} {summary["sum"]:.9g}')
+            lines.append(f'{METRIC_NAME}_count{{operation="{label}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the rendered metrics to a file atomically, for node-exporter style collection"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    def clear(self):
+        """Forget every recorded duration"""
+        with self._lock:
+            self._histograms.clear()
+
+# Process-wide registry used by timed and timer
+REGISTRY = MetricsRegistry()
+
+class _Timer:
+    """Context manager recording the duration of its block"""
+
+    __slots__ = ("operation", "started")
+
+    def __init__(self, operation):
+        """Initialize the timer for an operation"""
+        self.operation = operation
+
+    def __enter__(self):
+        """Start timing"""
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Record the elapsed time, whether or not the block raised"""
+        REGISTRY.observe(self.operation, time.perf_counter() - self.started)
+        return False
+
+# Shared no-op context returned by timer when timing is off
+_NULL_TIMER = nullcontext()
+
+# Time a block of code
+def timer(operation):
+    """Get a context manager recording the duration of its block under `operation`"""
+    return _Timer(operation) if ENABLED else _NULL_TIMER
+
+# Time every call of a function
+def timed(operation):
+    """Decorator recording the duration of every call under `operation`
+
+    When timing is off the function is returned unchanged.
+    """
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                REGISTRY.observe(operation, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorate
+
+# Profile one block of code with cProfile
+@contextmanager
+def profiled(enabled, directory="profiles", label="profile"):
+    """Capture a cProfile of the block into <directory>/<label>-<time>.prof when enabled
+
+    Yields a dict that receives "path" and a "summary" of the top functions by
+    cumulative time once the block has finished.
+    """
+    capture = {}
+    if not enabled:
+        yield capture
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield capture
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(25)
+        capture.update(path=path, summary=summary.getvalue())
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry at GET /metrics"""
+
+    def do_GET(self):
+        """Answer /metrics with the rendered registry and anything else with 404"""
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        """Keep scrapes out of the application's output"""
+
+# Serve the metrics over HTTP
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+# Write the metrics to a file periodically
+def write_metrics_periodically(path, interval=10.0):
+    """Rewrite the metrics file every `interval` seconds from a daemon thread, and at exit"""
+    stopped = threading.Event()
+
+    def loop():
+        while not stopped.wait(interval):
+            REGISTRY.write(path)
+
+    threading.Thread(target=loop, name="metrics-writer", daemon=True).start()
+    atexit.register(lambda: (stopped.set(), REGISTRY.write(path)))
+    return stopped
+
+# Whether start_exporters has run in this process
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+# Start the exporters configured by the environment, once per process
+def start_exporters():
+    """Start the file writer and HTTP endpoint set by MHSS_METRICS_FILE and MHSS_METRICS_PORT"""
+    global _exporters_started
+    with _exporters_lock:
+        if not ENABLED or _exporters_started:
+            return
+        _exporters_started = True
+        if os.getenv("MHSS_METRICS_FILE"):
+            write_metrics_periodically(
+                os.getenv("MHSS_METRICS_FILE"), float(os.getenv("MHSS_METRICS_INTERVAL", "10"))
+            )
+        if os.getenv("MHSS_METRICS_PORT"):
+            serve_metrics(int(os.getenv("MHSS_METRICS_PORT")))
@@ -2,11 +2,44 @@
 Assessment Class - Object-Oriented Programming Paradigm
 
 This module implements the Assessment class for the Mental Health Support System.
+Responses are scored one respondent at a time with calculate_score, or a
+whole response matrix at once with score_batch, which gives identical results.
+
+Instruments are defined as data in assessment_catalog.json: questions, option
+sets, scoring bands and interpretations. The catalog is compiled once per
+process into frozen definitions that every CatalogAssessment shares, so new
+instruments need no code and creating an assessment copies nothing.
 """
 
+import json
+import os
+from bisect import bisect_left
+from functools import lru_cache
+from numbers import Integral
+from types import MappingProxyType
+
+import numpy as np
+
+# Catalog of assessment definitions shipped next to this module
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assessment_catalog.json")
+
 class Assessment:
     """Assessment class - Object-Oriented Programming example"""
     
+    # Result levels, from lowest to highest score
+    LEVELS = (
+        ("Low", "Your symptoms are minimal."),
+        ("Moderate", "You're experiencing some symptoms that may benefit from support."),
+        ("High", "Your symptoms suggest you might benefit from professional support.")
+    )
+    
+    # Highest score of each level but the last, per unit of total question weight
+    LEVEL_BOUNDS = (1, 2)
+    
+    # Interpretations from lowest to highest score, and the highest score of each but the last
+    INTERPRETATIONS = ()
+    INTERPRETATION_BOUNDS = ()
+    
     def __init__(self, assessment_id, title, description):
         """Initialize a new Assessment object"""
         self.assessment_id = assessment_id
@@ -14,112 +47,198 @@ class Assessment:
         self.description = description
         self.questions = []
     
-    def add_question(self, question_text, options):
-        """Add a question to the assessment"""
+    def add_question(self, question_text, options, weight=1, reverse=False):
+        """Add a question to the assessment
+        
+        weight: multiplier of the question's response in the score
+        reverse: score the options from last to first, for positively worded questions
+        """
+        if isinstance(self.questions, tuple):
+            raise RuntimeError(f"Assessment {self.assessment_id} shares read-only catalog questions")
         self.questions.append({
             "text": question_text,
-            "options": options
+            "options": options,
+            "weight": weight,
+            "reverse": reverse
         })
     
     def calculate_score(self, responses):
         """Calculate assessment score"""
         if len(responses) != len(self.questions):
             return {"error": "Number of responses doesn't match number of questions"}
+        if not all(0 <= response < len(question["options"]) for question, response in zip(self.questions, responses)):
+            return {"error": "Each response must be the index of one of its question's options"}
         
-        # Simple scoring: sum of response values
-        score = sum(responses)
+        # Weighted sum of response values, with reverse-scored items flipped
+        score = sum(
+            question["weight"] * (len(question["options"]) - 1 - response if question["reverse"] else response)
+            for question, response in zip(self.questions, responses)
+        )
         
         # Determine result based on score
-        if score <= len(responses) * 1:
-            level = "Low"
-            description = "Your symptoms are minimal."
-        elif score <= len(responses) * 2:
-            level = "Moderate"
-            description = "You're experiencing some symptoms that may benefit from support."
-        else:
-            level = "High"
-            description = "Your symptoms suggest you might benefit from professional support."
+        level, description = self.LEVELS[bisect_left(self.level_thresholds(), score)]
         
         return {
             "score": score,
             "level": level,
             "description": description
         }
-
-
-class StressAssessment(Assessment):
-    """Stress Assessment - Demonstrates inheritance in OOP"""
     
-    def __init__(self):
-        """Initialize a Stress Assessment with predefined questions"""
-        super().__init__(
-            "stress_assessment",
-            "Stress Assessment",
-            "This assessment helps identify your current stress levels."
-        )
+    def level_thresholds(self):
+        """Get the highest score of each level but the last"""
+        total_weight = sum(question["weight"] for question in self.questions)
+        return [bound * total_weight for bound in self.LEVEL_BOUNDS]
+    
+    def score_batch(self, responses):
+        """Score a matrix with one row of responses per respondent, like calculate_score
         
-        # Add standard stress assessment questions
-        self.add_question(
-            "How often have you felt that you were unable to control the important things in your life?",
-            ["Never (0)", "Almost Never (1)", "Sometimes (2)", "Fairly Often (3)", "Very Often (4)"]
-        )
-        self.add_question(
-            "How often have you felt nervous and stressed?",
-            ["Never (0)", "Almost Never (1)", "Sometimes (2)", "Fairly Often (3)", "Very Often (4)"]
-        )
-        self.add_question(
-            "How often have you found that you could not cope with all the things that you had to do?",
-            ["Never (0)", "Almost Never (1)", "Sometimes (2)", "Fairly Often (3)", "Very Often (4)"]
-        )
-        self.add_question(
-            "How often have you felt difficulties were piling up so high that you could not overcome them?",
-            ["Never (0)", "Almost Never (1)", "Sometimes (2)", "Fairly Often (3)", "Very Often (4)"]
+        Returns NumPy arrays of scores, levels, descriptions and level indices,
+        plus interpretation indices into INTERPRETATIONS when the assessment has them.
+        """
+        # Ragged rows cannot form a matrix, so their lengths are checked first
+        if not isinstance(responses, np.ndarray) and not all(
+            isinstance(row, (list, tuple, np.ndarray)) and len(row) == len(self.questions) for row in responses
+        ):
+            return {"error": "Number of responses doesn't match number of questions"}
+        responses = np.asarray(responses)
+        if responses.ndim != 2 or responses.shape[1] != len(self.questions):
+            return {"error": "Number of responses doesn't match number of questions"}
+        option_counts = np.array([len(question["options"]) for question in self.questions])
+        if responses.dtype.kind not in "biuf" or ((responses < 0) | (responses >= option_counts)).any():
+            return {"error": "Each response must be the index of one of its question's options"}
+        
+        # Integer scores stay exact integers, as in calculate_score
+        integral = responses.dtype.kind in "biu" and all(
+            isinstance(question["weight"], Integral) for question in self.questions
         )
+        responses = responses.astype(np.int64 if integral else np.float64)
+        
+        # Accumulate question by question, in the order calculate_score adds them,
+        # so that fractional weights round identically
+        scores = np.zeros(len(responses), dtype=responses.dtype)
+        for column, question in enumerate(self.questions):
+            values = responses[:, column]
+            if question["reverse"]:
+                values = len(question["options"]) - 1 - values
+            scores += question["weight"] * values
+        
+        level_indices = np.searchsorted(self.level_thresholds(), scores, side="left")
+        result = {
+            "scores": scores,
+            "levels": np.array([level for level, _ in self.LEVELS])[level_indices],
+            "descriptions": np.array([description for _, description in self.LEVELS])[level_indices],
+            "level_indices": level_indices
+        }
+        if self.INTERPRETATIONS:
+            result["interpretation_indices"] = np.searchsorted(self.INTERPRETATION_BOUNDS, scores, side="left")
+        return result
+    
+    def interpretation_for(self, score):
+        """Get the entry of INTERPRETATIONS covering a score"""
+        return self.INTERPRETATIONS[bisect_left(self.INTERPRETATION_BOUNDS, score)]
+
+
+# Split catalog bands into their upper bounds and contents
+def _compile_bands(assessment_type, name, bands):
+    """Get (highest score of each band but the last, bands) for bisecting"""
+    bounds = tuple(band.get("max_score") for band in bands[:-1])
+    if not bands or None in bounds or "max_score" in bands[-1]:
+        raise ValueError(f"{assessment_type}: every {name} band but the last needs a max_score")
+    if any(lower >= upper for lower, upper in zip(bounds, bounds[1:])):
+        raise ValueError(f"{assessment_type}: {name} bands must have increasing max_score")
+    return bounds, bands
+
+# Compile one catalog entry into an immutable definition
+def compile_definition(entry, option_sets):
+    """Build the frozen definition of one catalog entry; option sets are shared tuples"""
+    assessment_type = entry["type"]
+    questions = []
+    for question in entry["questions"]:
+        options = question.get("options", entry.get("options"))
+        questions.append(MappingProxyType({
+            "text": question["text"],
+            "options": option_sets[options] if isinstance(options, str) else tuple(options),
+            "weight": question.get("weight", 1),
+            "reverse": question.get("reverse", False)
+        }))
+
+    level_bounds, levels = _compile_bands(assessment_type, "level", entry["levels"])
+    interpretation_bounds, interpretations = _compile_bands(
+        assessment_type, "interpretation", entry["interpretations"]
+    )
+    return MappingProxyType({
+        "type": assessment_type,
+        "assessment_id": entry["assessment_id"],
+        "title": entry["title"],
+        "description": entry["description"],
+        "questions": tuple(questions),
+        "levels": tuple((level["level"], level["description"]) for level in levels),
+        "level_bounds": level_bounds,
+        "interpretations": tuple(interpretation["text"] for interpretation in interpretations),
+        "interpretation_bounds": interpretation_bounds,
+        "symptoms": tuple(tuple(interpretation.get("symptoms", ())) for interpretation in interpretations)
+    })
+
+# Parse and compile an assessment catalog once per process
+@lru_cache(maxsize=None)
+def load_catalog(filename=CATALOG_FILE):
+    """Get the read-only {assessment type: compiled definition} of a catalog file, in file order"""
+    with open(filename, encoding="utf-8") as file:
+        catalog = json.load(file)
+    option_sets = {name: tuple(options) for name, options in catalog.get("option_sets", {}).items()}
+    return MappingProxyType({
+        entry["type"]: compile_definition(entry, option_sets)
+        for entry in catalog["assessments"]
+    })
+
+# Create an assessment for every instrument of a catalog
+def catalog_assessments(filename=CATALOG_FILE):
+    """Get {assessment type: CatalogAssessment} for every definition of a catalog, in file order"""
+    return {
+        assessment_type: CatalogAssessment(definition)
+        for assessment_type, definition in load_catalog(filename).items()
+    }
+
+
+class CatalogAssessment(Assessment):
+    """Assessment defined by an entry of the assessment catalog"""
+    
+    def __init__(self, definition):
+        """Initialize an assessment over a compiled catalog definition, without copying it"""
+        super().__init__(definition["assessment_id"], definition["title"], definition["description"])
+        self.assessment_type = definition["type"]
+        # Frozen questions and bands shared with every assessment of this type
+        self.questions = definition["questions"]
+        self.LEVELS = definition["levels"]
+        self.INTERPRETATIONS = definition["interpretations"]
+        self.INTERPRETATION_BOUNDS = definition["interpretation_bounds"]
+        self.symptoms = definition["symptoms"]
+        self._level_bounds = definition["level_bounds"]
+    
+    def level_thresholds(self):
+        """Get the highest score of each level but the last, as set in the catalog"""
+        return self._level_bounds
     
     def interpret_results(self, score):
-        """Provide specific interpretation for stress assessment"""
-        if score <= 4:
-            return "Your stress levels appear to be manageable."
-        elif score <= 8:
-            return "You're experiencing moderate stress. Consider implementing stress management techniques."
-        else:
-            return "You're experiencing high levels of stress. Consider speaking with a mental health professional."
+        """Provide the catalog's interpretation of a score"""
+        return self.interpretation_for(score)
+    
+    def symptoms_for(self, score):
+        """Get the symptoms a score suggests, for the logical analysis"""
+        return self.symptoms[bisect_left(self.INTERPRETATION_BOUNDS, score)]
 
 
-class AnxietyAssessment(Assessment):
-    """Anxiety Assessment - Demonstrates inheritance in OOP"""
+class StressAssessment(CatalogAssessment):
+    """Stress Assessment - Demonstrates inheritance in OOP"""
     
     def __init__(self):
-        """Initialize an Anxiety Assessment with predefined questions"""
-        super().__init__(
-            "anxiety_assessment",
-            "Anxiety Assessment",
-            "This assessment helps identify symptoms of anxiety."
-        )
-        
-        # Add standard anxiety assessment questions
-        self.add_question(
-            "How often have you been feeling nervous, anxious, or on edge?",
-            ["Not at all (0)", "Several days (1)", "More than half the days (2)", "Nearly every day (3)"]
-        )
-        self.add_question(
-            "How often have you not been able to stop or control worrying?",
-            ["Not at all (0)", "Several days (1)", "More than half the days (2)", "Nearly every day (3)"]
-        )
-        self.add_question(
-            "How often have you been worrying too much about different things?",
-            ["Not at all (0)", "Several days (1)", "More than half the days (2)", "Nearly every day (3)"]
-        )
-        self.add_question(
-            "How often have you had trouble relaxing?",
-            ["Not at all (0)", "Several days (1)", "More than half the days (2)", "Nearly every day (3)"]
-        )
+        """Initialize a Stress Assessment from the catalog"""
+        super().__init__(load_catalog()["stress"])
+
+
+class AnxietyAssessment(CatalogAssessment):
+    """Anxiety Assessment - Demonstrates inheritance in OOP"""
     
-    def interpret_results(self, score):
-        """Provide specific interpretation for anxiety assessment"""
-        if score <= 4:
-            return "Your anxiety levels appear to be within a normal range."
-        elif score <= 8:
-            return "You're experiencing moderate anxiety. Consider learning anxiety management techniques."
-        else:
-            return "You're experiencing significant anxiety symptoms. Consider speaking with a mental health professional."
+    def __init__(self):
+        """Initialize an Anxiety Assessment from the catalog"""
+        super().__init__(load_catalog()["anxiety"])
@@ -0,0 +1,196 @@
+"""
+Record Classes - Object-Oriented Programming Paradigm
+
+This module implements MoodEntry and AssessmentResult, compact records for
+the mood entries and assessment results of the Mental Health Support System.
+Fields live in __slots__, timestamps are integer epoch microseconds and
+concerns are interned tuples shared by records with the same concerns (for
+the most recently used concern lists), so a record costs a fraction of the dict it replaces. Records still read
+like those dicts (record["mood_rating"], record.get("concerns"), dict(record))
+and convert to and from them with to_dict/from_dict for JSON.
+"""
+
+import itertools
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from numbers import Integral
+
+from procedural.mood_store import (
+    MOOD_ENTRY_FIELDS, MoodEntryView, timestamp_to_epoch, epoch_to_timestamp
+)
+
+# Field names of an assessment result, in dict order
+ASSESSMENT_RESULT_FIELDS = (
+    "assessment_id",
+    "timestamp",
+    "assessment_type",
+    "score",
+    "level",
+    "description"
+)
+
+# Most distinct concern lists kept shared; the least recently used are evicted
+MAX_SHARED_CONCERNS = 1024
+
+# Shared concern tuples in LRU order; equal concern lists map to one tuple of interned names
+_concern_tuples = OrderedDict()
+_concern_lock = threading.Lock()
+
+# Intern a list of concerns
+def intern_concerns(concerns):
+    """Get the shared tuple of interned names equal to a concern list
+
+    Free-form concerns cannot grow the table past MAX_SHARED_CONCERNS lists; an
+    evicted list simply gets a new tuple, equal to the old one, when next seen.
+    """
+    key = tuple(concerns) if concerns else ()
+    with _concern_lock:
+        shared = _concern_tuples.get(key)
+        if shared is not None:
+            _concern_tuples.move_to_end(key)
+            return shared
+        shared = _concern_tuples[key] = tuple(sys.intern(str(concern)) for concern in key)
+        if len(_concern_tuples) > MAX_SHARED_CONCERNS:
+            _concern_tuples.popitem(last=False)
+        return shared
+
+# Stamps of in-place record edits, increasing, so journals can find edited records without diffing
+_edit_stamps = itertools.count(1)
+_last_edit = 0
+
+# Get a mark separating earlier record edits from later ones
+def edit_mark():
+    """Get a number above the stamp of every record edit so far and below every later one"""
+    return next(_edit_stamps)
+
+# Get the stamp of the latest record edit
+def last_edit():
+    """Get the stamp of the most recent in-place record edit, or 0 if there was none"""
+    return _last_edit
+
+# Convert a timestamp to epoch microseconds
+def _to_epoch(timestamp):
+    """Accept epoch microseconds, an ISO string or a datetime"""
+    return int(timestamp) if isinstance(timestamp, Integral) else timestamp_to_epoch(timestamp)
+
+class Record(Mapping):
+    """Read-mostly mapping over the __slots__ of a record; subclasses set FIELDS"""
+
+    __slots__ = ("_edited",)
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        """Get a field like the dict the record replaces"""
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        """Set a field, converting it like the constructor does, and stamp the edit"""
+        global _last_edit
+        if key not in self._KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+        self._edited = _last_edit = next(_edit_stamps)
+
+    @property
+    def edited(self):
+        """Get the stamp of the record's latest edit through record[key] = value, or 0"""
+        return getattr(self, "_edited", 0)
+
+    def __iter__(self):
+        """Iterate over the field names"""
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        """Get the number of fields"""
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        """Represent the record with its dict form"""
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    @property
+    def timestamp(self):
+        """Get the timestamp as an ISO string"""
+        return epoch_to_timestamp(self.epoch)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        """Set the timestamp from an ISO string, datetime or epoch microseconds"""
+        self.epoch = _to_epoch(value)
+
+    def to_dict(self):
+        """Convert the record to the plain dict used in JSON"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        """Create a record from a dict (or any mapping) with the record's fields"""
+        return cls(*(values[field] for field in cls.FIELDS))
+
+class MoodEntry(Record):
+    """One mood check-in"""
+
+    __slots__ = ("entry_id", "epoch", "mood_rating", "journal_entry", "_concerns", "sleep_hours", "exercised")
+    FIELDS = MOOD_ENTRY_FIELDS
+    _KEYS = frozenset(MOOD_ENTRY_FIELDS)
+
+    def __init__(self, entry_id, timestamp, mood_rating, journal_entry="", concerns=(), sleep_hours=0,
+                 exercised=False):
+        """Initialize a mood entry; timestamp may be epoch microseconds, an ISO string or a datetime"""
+        self.entry_id = entry_id
+        self.epoch = _to_epoch(timestamp)
+        self.mood_rating = mood_rating
+        self.journal_entry = journal_entry
+        self._concerns = intern_concerns(concerns)
+        self.sleep_hours = sleep_hours
+        self.exercised = bool(exercised)
+
+    @property
+    def concerns(self):
+        """Get the concerns as a shared tuple of interned names"""
+        return self._concerns
+
+    @concerns.setter
+    def concerns(self, value):
+        """Set the concerns from any sequence of names"""
+        self._concerns = intern_concerns(value)
+
+    def to_dict(self):
+        """Convert the entry to the plain dict used in JSON"""
+        entry = super().to_dict()
+        entry["concerns"] = list(self._concerns)
+        return entry
+
+class AssessmentResult(Record):
+    """One completed assessment"""
+
+    __slots__ = ("assessment_id", "epoch", "assessment_type", "score", "level", "description")
+    FIELDS = ASSESSMENT_RESULT_FIELDS
+    _KEYS = frozenset(ASSESSMENT_RESULT_FIELDS)
+
+    def __init__(self, assessment_id, timestamp, assessment_type, score, level, description):
+        """Initialize a result; type, level and description are interned, as they repeat"""
+        self.assessment_id = assessment_id
+        self.epoch = _to_epoch(timestamp)
+        self.assessment_type = sys.intern(assessment_type)
+        self.score = score
+        self.level = sys.intern(level)
+        self.description = sys.intern(description)
+
+# Get a mood entry as a compact record
+def as_mood_entry(entry):
+    """Convert a mood entry dict to a MoodEntry; records and store views are kept as they are"""
+    if isinstance(entry, (MoodEntry, MoodEntryView)):
+        return entry
+    return MoodEntry.from_dict(entry)
+
+# Get an assessment result as a compact record
+def as_assessment_result(result):
+    """Convert an assessment result dict to an AssessmentResult; records are kept as they are"""
+    if isinstance(result, AssessmentResult):
+        return result
+    return AssessmentResult.from_dict(result)
@@ -4,6 +4,110 @@ User Class - Object-Oriented Programming Paradigm
 This module implements the User class for the Mental Health Support System.
 """
 
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+
+import numpy as np
+
+from procedural.mood_store import MoodStore, timestamp_to_epoch
+from oop.records import as_mood_entry, as_assessment_result
+
+class MoodHistory(Sequence):
+    """Time-ordered mood entries, optionally backed by the rows of a MoodStore
+
+    Rows bulk-loaded from a store stay in its columns (for a mapped snapshot,
+    in the mapping) and are read through dict views; entries added later are
+    kept as records after them. Only an out-of-order entry landing among the
+    store rows turns those rows into a list of views.
+    """
+
+    def __init__(self, store=None):
+        """Initialize a history, over the rows a time-ordered store holds now if one is given"""
+        self._store = store
+        self._store_size = len(store) if store is not None else 0
+        # Store rows: timestamp column view and prefix sums of the ratings
+        self._store_timestamps = store.timestamps if store is not None else np.empty(0, dtype=np.int64)
+        self._store_prefix_sums = np.zeros(self._store_size + 1, dtype=np.int64)
+        if store is not None:
+            np.cumsum(store.ratings, dtype=np.int64, out=self._store_prefix_sums[1:])
+        # Entries after the store rows, with parallel epoch timestamps and prefix sums
+        self._entries = []
+        self._timestamps = []
+        self._prefix_sums = [int(self._store_prefix_sums[-1])]
+
+    def __len__(self):
+        """Get the number of entries"""
+        return self._store_size + len(self._entries)
+
+    def __getitem__(self, index):
+        """Get an entry, or a list of entries for a slice"""
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("mood history index out of range")
+        if index < self._store_size:
+            return self._store[index]
+        return self._entries[index - self._store_size]
+
+    def last_epoch(self):
+        """Get the epoch timestamp of the newest entry"""
+        if self._timestamps:
+            return self._timestamps[-1]
+        return int(self._store_timestamps[-1])
+
+    def bisect_left(self, epoch):
+        """Get the position of the first entry at or after an epoch timestamp"""
+        position = int(np.searchsorted(self._store_timestamps, epoch, side="left"))
+        if position < self._store_size:
+            return position
+        return self._store_size + bisect_left(self._timestamps, epoch)
+
+    def bisect_right(self, epoch):
+        """Get the position of the first entry after an epoch timestamp"""
+        position = int(np.searchsorted(self._store_timestamps, epoch, side="right"))
+        if position < self._store_size:
+            return position
+        return self._store_size + bisect_right(self._timestamps, epoch)
+
+    def rating_sum(self, count):
+        """Get the sum of the mood ratings of the newest `count` entries"""
+        return self._prefix_sum(len(self)) - self._prefix_sum(len(self) - count)
+
+    def _prefix_sum(self, position):
+        """Get the sum of the mood ratings of the first `position` entries"""
+        if position <= self._store_size:
+            return int(self._store_prefix_sums[position])
+        return self._prefix_sums[position - self._store_size]
+
+    def append(self, mood_entry):
+        """Append an entry that is newer than every entry held"""
+        self._entries.append(mood_entry)
+        self._timestamps.append(mood_entry.epoch)
+        self._prefix_sums.append(self._prefix_sums[-1] + mood_entry["mood_rating"])
+
+    def insert(self, position, mood_entry):
+        """Insert an entry at a position that keeps the history time-ordered"""
+        if position < self._store_size:
+            self._release_store()
+        position -= self._store_size
+        self._entries.insert(position, mood_entry)
+        self._timestamps.insert(position, mood_entry.epoch)
+        del self._prefix_sums[position + 1:]
+        for entry in self._entries[position:]:
+            self._prefix_sums.append(self._prefix_sums[-1] + entry["mood_rating"])
+
+    def _release_store(self):
+        """Move the store rows into the entry list, as views, so entries can go among them"""
+        self._entries[:0] = [self._store[row] for row in range(self._store_size)]
+        self._timestamps[:0] = self._store_timestamps.tolist()
+        self._prefix_sums[:0] = self._store_prefix_sums[:-1].tolist()
+        self._store = None
+        self._store_size = 0
+        self._store_timestamps = np.empty(0, dtype=np.int64)
+        self._store_prefix_sums = np.zeros(1, dtype=np.int64)
+
 class User:
     """User class - Object-Oriented Programming example"""
     
@@ -17,8 +121,12 @@ class User:
             "notifications_enabled": True,
             "check_in_time": "18:00"
         }
-        self.mood_history = []
+        # Mood history is kept sorted by time (oldest first)
+        self.mood_history = MoodHistory()
         self.assessment_history = []
+        self._mood_entry_listeners = []
+        # Incremented on every change to the histories, for version-keyed caches
+        self.history_version = 0
     
     def update_preferences(self, new_preferences):
         """Update user preferences"""
@@ -35,27 +143,58 @@ class User:
         }
     
     def add_mood_entry(self, mood_entry):
-        """Add a mood entry to user's history"""
-        self.mood_history.append(mood_entry)
+        """Add a mood entry to user's history, as a compact record"""
+        mood_entry = as_mood_entry(mood_entry)
+        history = self.mood_history
+        if not history or mood_entry.epoch > history.last_epoch():
+            # In-order entry: O(1) append
+            history.append(mood_entry)
+        else:
+            # Out-of-order entry; equal timestamps go first so that the newest-first
+            # order matches a stable sort over insertion order
+            history.insert(history.bisect_left(mood_entry.epoch), mood_entry)
+        self.history_version += 1
+        
+        for listener in self._mood_entry_listeners:
+            listener(mood_entry)
+    
+    def add_mood_entries(self, mood_entries):
+        """Add many mood entries; a time-ordered MoodStore loads in bulk into an empty history"""
+        if (isinstance(mood_entries, MoodStore) and not self.mood_history and not self._mood_entry_listeners
+                and np.all(np.diff(mood_entries.timestamps) > 0)):
+            # Strictly increasing timestamps are exactly the in-order appends of add_mood_entry;
+            # the history reads the store's rows in place instead of copying them into records
+            self.mood_history = MoodHistory(mood_entries)
+            self.history_version += 1
+            return
+        for mood_entry in mood_entries:
+            self.add_mood_entry(mood_entry)
+    
+    def subscribe(self, listener):
+        """Call listener(mood_entry) for every mood entry added from now on"""
+        self._mood_entry_listeners.append(listener)
     
     def add_assessment_result(self, assessment_result):
-        """Add an assessment result to user's history"""
-        self.assessment_history.append(assessment_result)
+        """Add an assessment result to user's history, as a compact record"""
+        self.assessment_history.append(as_assessment_result(assessment_result))
+        self.history_version += 1
     
     def get_recent_mood_entries(self, count=7):
         """Get the most recent mood entries"""
-        sorted_entries = sorted(
-            self.mood_history,
-            key=lambda entry: entry["timestamp"],
-            reverse=True
-        )
-        return sorted_entries[:count]
+        if count <= 0:
+            return []
+        return self.mood_history[:-count - 1:-1]
     
     def get_average_mood(self, days=7):
         """Calculate average mood over specified number of days"""
-        recent_entries = self.get_recent_mood_entries(days)
-        if not recent_entries:
+        count = min(days, len(self.mood_history))
+        if count <= 0:
             return 0
         
-        total = sum(entry["mood_rating"] for entry in recent_entries)
-        return total / len(recent_entries)
+        return self.mood_history.rating_sum(count) / count
+    
+    def get_mood_entries_by_date_range(self, start_date, end_date):
+        """Get mood entries within a date range, oldest first"""
+        start = self.mood_history.bisect_left(timestamp_to_epoch(start_date))
+        end = self.mood_history.bisect_right(timestamp_to_epoch(end_date))
+        return self.mood_history[start:end]
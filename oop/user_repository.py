@@ -0,0 +1,259 @@
+"""
+User Repository - Object-Oriented Programming Paradigm
+
+This module implements the UserRepository class, which serves many users from
+one process. Users are loaded on demand from the SQLite backend, the most
+recently used ones are kept in memory, changes are written back in batches by
+a background thread, and per-user locks keep concurrent sessions of the same
+user from interleaving their updates.
+"""
+
+import atexit
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from oop.user import User
+from oop.records import as_mood_entry, as_assessment_result
+from functional.incremental_insights import IncrementalInsights
+from procedural.sqlite_storage import (
+    save_user, load_user, insert_mood_entries, insert_assessment,
+    select_mood_entries, select_assessments
+)
+
+# Number of lock stripes; users hashing to the same stripe share a lock
+LOCK_STRIPES = 1024
+
+class UserRepository:
+    """LRU cache of User objects over SQLite storage, with write-behind"""
+
+    def __init__(self, pool, capacity=10000, flush_interval=1.0, insights_window=7):
+        """Initialize the repository over an open ConnectionPool
+
+        capacity: number of users kept in memory; least recently used clean users are evicted
+        flush_interval: seconds between background flushes of pending changes
+        """
+        self.pool = pool
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.insights_window = insights_window
+        # user_id -> (User, IncrementalInsights), least recently used first
+        self._users = OrderedDict()
+        # user_id -> {"mood_entries": [...], "assessments": [...], "preferences": bool}
+        self._pending = {}
+        # Pending changes taken by a flush that is still writing them
+        self._flushing = {}
+        self._lock = threading.Lock()
+        # A fixed set of lock stripes, so locks never need to be created or evicted
+        self._user_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.loads = 0
+        self.evictions = 0
+        self.flush_errors = 0
+
+        self._flusher = threading.Thread(target=self._flush_periodically, name="user-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    @contextmanager
+    def lock(self, user_id):
+        """Hold the lock of one user for the duration of a with-block"""
+        with self._user_locks[hash(user_id) % LOCK_STRIPES]:
+            yield
+
+    def _load(self, user_id):
+        """Build a User and its insights from storage, or None if the user does not exist"""
+        info = load_user(self.pool, user_id)
+        if info is None:
+            return None
+        user = User(info["user_id"], info["username"], info["email"])
+        user.preferences.update(info["preferences"])
+        insights = IncrementalInsights(window=self.insights_window)
+        # Stored entries come in insertion order; User keeps its history sorted
+        for entry in select_mood_entries(self.pool, user_id):
+            user.add_mood_entry(entry)
+        for assessment in select_assessments(self.pool, user_id):
+            user.add_assessment_result(assessment)
+        insights.subscribe_to(user)
+        self.loads += 1
+        return user, insights
+
+    def _entry(self, user_id, create=None):
+        """Get the cached (User, insights) of a user, loading or creating it on a miss"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._users.move_to_end(user_id)
+                return entry
+
+        with self.lock(user_id):
+            # Another session may have loaded the user while we waited for the lock
+            with self._lock:
+                entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._load(user_id)
+                if entry is None:
+                    if create is None:
+                        return None
+                    save_user(self.pool, create, create.get("preferences"))
+                    entry = self._load(user_id)
+                with self._lock:
+                    self._users[user_id] = entry
+                    self._evict()
+        return entry
+
+    def _evict(self):
+        """Drop least recently used users without pending changes; caller holds _lock"""
+        excess = len(self._users) - self.capacity
+        if excess <= 0:
+            return
+        # Users with pending or in-flight changes stay until written, so a reload never misses them.
+        # Walk from the least recently used end only until enough clean users are found
+        clean = []
+        for user_id in self._users:
+            if user_id not in self._pending and user_id not in self._flushing:
+                clean.append(user_id)
+                if len(clean) == excess:
+                    break
+        for user_id in clean:
+            del self._users[user_id]
+            self.evictions += 1
+
+    def get(self, user_id):
+        """Get a user, loading it from storage on first use; None if it does not exist"""
+        entry = self._entry(user_id)
+        return entry[0] if entry is not None else None
+
+    def get_or_create(self, user_id, username, email, preferences=None):
+        """Get a user, creating it in storage if it does not exist"""
+        create = {"user_id": user_id, "username": username, "email": email, "preferences": preferences}
+        return self._entry(user_id, create)[0]
+
+    def insights(self, user_id):
+        """Get the incrementally maintained insights of a user"""
+        entry = self._entry(user_id)
+        return entry[1] if entry is not None else None
+
+    def _changes(self, user_id):
+        """Get the pending changes of a user; caller holds _lock"""
+        changes = self._pending.get(user_id)
+        if changes is None:
+            changes = self._pending[user_id] = {"mood_entries": [], "assessments": [], "preferences": False}
+        return changes
+
+    def _update(self, user_id, apply, change):
+        """Apply a change to a cached user under its lock and queue it for writing"""
+        with self.lock(user_id):
+            entry = self._entry(user_id)
+            if entry is None:
+                raise KeyError(f"Unknown user: {user_id}")
+            result = apply(entry[0])
+            with self._lock:
+                change(self._changes(user_id))
+                # The user may have been evicted since _entry; loads need this lock,
+                # so nobody reloaded it and this object is still the current one
+                self._users.setdefault(user_id, entry)
+        return result
+
+    def add_mood_entry(self, user_id, mood_entry):
+        """Add a mood entry to a user now and to storage on the next flush"""
+        # One record is shared by the user and the pending write, which assigns its id
+        mood_entry = as_mood_entry(mood_entry)
+        self._update(
+            user_id,
+            lambda user: user.add_mood_entry(mood_entry),
+            lambda changes: changes["mood_entries"].append(mood_entry)
+        )
+        return mood_entry
+
+    def add_assessment_result(self, user_id, assessment_result):
+        """Add an assessment result to a user now and to storage on the next flush"""
+        assessment_result = as_assessment_result(assessment_result)
+        self._update(
+            user_id,
+            lambda user: user.add_assessment_result(assessment_result),
+            lambda changes: changes["assessments"].append(assessment_result)
+        )
+        return assessment_result
+
+    def update_preferences(self, user_id, new_preferences):
+        """Update a user's preferences now and in storage on the next flush"""
+        return self._update(
+            user_id,
+            lambda user: user.update_preferences(new_preferences),
+            lambda changes: changes.update(preferences=True)
+        )
+
+    def _write(self, user_id, changes):
+        """Write one user's pending changes to storage, dropping each part once stored"""
+        with_ids = [entry for entry in changes["mood_entries"] if entry["entry_id"] is not None]
+        without_ids = [entry for entry in changes["mood_entries"] if entry["entry_id"] is None]
+        insert_mood_entries(self.pool, user_id, with_ids)
+        changes["mood_entries"] = without_ids
+        stored = insert_mood_entries(self.pool, user_id, without_ids, assign_ids=True)
+        changes["mood_entries"] = []
+        for entry, stored_entry in zip(without_ids, stored):
+            entry["entry_id"] = stored_entry["entry_id"]
+
+        while changes["assessments"]:
+            assessment = changes["assessments"][0]
+            stored_assessment = insert_assessment(self.pool, user_id, assessment)
+            assessment["assessment_id"] = stored_assessment["assessment_id"]
+            changes["assessments"].pop(0)
+
+        if changes["preferences"]:
+            user = self.get(user_id)
+            with self.lock(user_id):
+                save_user(self.pool, user.get_user_info(), dict(user.preferences))
+            changes["preferences"] = False
+
+    def flush(self):
+        """Write all pending changes to storage; returns the number of users written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            written = 0
+            for user_id, changes in pending.items():
+                try:
+                    self._write(user_id, changes)
+                    written += 1
+                except Exception:
+                    # Keep the unwritten changes for the next flush, ahead of newer ones
+                    self.flush_errors += 1
+                    with self._lock:
+                        newer = self._pending.get(user_id)
+                        if newer is not None:
+                            changes["mood_entries"].extend(newer["mood_entries"])
+                            changes["assessments"].extend(newer["assessments"])
+                            changes["preferences"] = changes["preferences"] or newer["preferences"]
+                        self._pending[user_id] = changes
+            with self._lock:
+                self._flushing = {}
+                self._evict()
+            return written
+
+    def _flush_periodically(self):
+        """Background loop flushing pending changes every flush_interval seconds"""
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background flusher and write everything still pending"""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._flusher.join()
+        self.flush()
+
+    def stats(self):
+        """Get cache and write-behind counts"""
+        with self._lock:
+            return {
+                "cached_users": len(self._users),
+                "capacity": self.capacity,
+                "pending_users": len(self._pending),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "flush_errors": self.flush_errors
+            }
@@ -0,0 +1,158 @@
+"""
+Binary Snapshot Module - Procedural Programming Paradigm
+
+This module implements a versioned binary snapshot format for the data dict
+of the Mental Health Support System. Loading a JSON snapshot parses every
+entry into Python objects; a binary snapshot is instead memory-mapped and
+its mood entry columns are used in place as read-only NumPy arrays, so
+loading takes the same few milliseconds for any history length, and worker
+processes that load the same file share its pages through the OS cache.
+
+Layout (all integers little-endian):
+
+    header    8-byte MAGIC, uint32 format version, uint32 metadata length
+    metadata  UTF-8 JSON: entry count, column offsets, concern names,
+              custom entry ids, custom concern lists and every other key
+              of the data dict
+    columns   the fixed-width MoodStore columns, then the journal text
+              arena, each starting at a multiple of ALIGNMENT bytes
+
+A mapped store is copied into memory of its own by the first append
+(copy-on-write), so the file is never modified in place. The mapping stays
+open while any view of it is alive and is closed when the last one is
+garbage-collected. Windows cannot replace a file that is mapped, which the
+next compaction does, so there snapshots are read into memory instead.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from procedural.mood_store import MoodStore, json_default
+
+# First bytes of every binary snapshot; cannot start a JSON document
+MAGIC = b"\x89MHSSNP\n"
+
+# Version of the layout written by write_binary_snapshot
+FORMAT_VERSION = 1
+
+# Magic, format version and metadata length
+HEADER = struct.Struct("<8sII")
+
+# Columns start at multiples of this many bytes, so every view is aligned
+ALIGNMENT = 64
+
+# MoodStore columns in file order, with their on-disk dtypes
+COLUMN_DTYPES = (
+    ("timestamps", "<i8"),
+    ("ratings", "i1"),
+    ("sleep_hours", "<f4"),
+    ("flags", "u1"),
+    ("concerns", "<u8"),
+    ("entry_numbers", "<i8"),
+    ("journal_offsets", "<i8")
+)
+
+# Whether snapshots are memory-mapped; Windows cannot os.replace a mapped file
+MAP_SNAPSHOTS = os.name != "nt"
+
+# Round a position up to the next column boundary
+def _align(position):
+    """Round position up to a multiple of ALIGNMENT"""
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+# Check whether a file is a binary snapshot
+def is_binary_snapshot(filename):
+    """Whether filename starts with the binary snapshot MAGIC"""
+    try:
+        with open(filename, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+# Write data as a binary snapshot
+def write_binary_snapshot(data, file, generation=0):
+    """Write a data dict whose mood_entries is a MoodStore to an open binary file"""
+    store = data["mood_entries"]
+    stored = store.columns()
+    columns = {name: np.ascontiguousarray(stored[name], dtype=dtype) for name, dtype in COLUMN_DTYPES}
+    arena = store.journal_arena
+
+    # Offsets are relative to the start of the column section, which follows the metadata
+    offsets = {}
+    position = 0
+    for name, _ in COLUMN_DTYPES:
+        offsets[name] = position
+        position = _align(position + columns[name].nbytes)
+    offsets["journal_arena"] = position
+
+    metadata = json.dumps({
+        "generation": generation,
+        "count": len(store),
+        "offsets": offsets,
+        "arena_length": len(arena),
+        "concern_names": store.concern_names,
+        "custom_ids": {str(row): entry_id for row, entry_id in store.custom_ids.items()},
+        "custom_concerns": {str(row): concerns for row, concerns in store.custom_concerns.items()},
+        "chronological": store.chronological,
+        "data": {key: value for key, value in data.items() if key != "mood_entries"}
+    }, separators=(",", ":"), default=json_default).encode("utf-8")
+
+    file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(metadata)))
+    file.write(metadata)
+    file.write(bytes(_align(HEADER.size + len(metadata)) - HEADER.size - len(metadata)))
+
+    # Zero padding keeps every column at the offset recorded in the metadata
+    written = 0
+    for name, _ in COLUMN_DTYPES:
+        file.write(bytes(offsets[name] - written))
+        file.write(columns[name].data)
+        written = offsets[name] + columns[name].nbytes
+    file.write(bytes(offsets["journal_arena"] - written))
+    file.write(arena)
+
+# Load a binary snapshot without copying its columns
+def read_binary_snapshot(filename):
+    """Map a binary snapshot and get (data dict, journal generation)
+
+    data["mood_entries"] is a MoodStore over read-only views of the mapping, or
+    of the file's bytes where MAP_SNAPSHOTS is off.
+    """
+    with open(filename, "rb") as file:
+        if MAP_SNAPSHOTS:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            mapping = file.read()
+
+    magic, version, metadata_length = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a binary snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{filename} has snapshot format version {version}; expected {FORMAT_VERSION}")
+    metadata = json.loads(mapping[HEADER.size:HEADER.size + metadata_length])
+    start = _align(HEADER.size + metadata_length)
+
+    count = metadata["count"]
+    offsets = metadata["offsets"]
+    columns = {
+        name: np.frombuffer(
+            mapping, dtype=dtype, offset=start + offsets[name],
+            count=count + 1 if name == "journal_offsets" else count
+        )
+        for name, dtype in COLUMN_DTYPES
+    }
+    arena_start = start + offsets["journal_arena"]
+    arena = memoryview(mapping)[arena_start:arena_start + metadata["arena_length"]]
+
+    data = metadata["data"]
+    data["mood_entries"] = MoodStore.from_columns(
+        columns, arena, metadata["concern_names"],
+        {int(row): entry_id for row, entry_id in metadata["custom_ids"].items()},
+        metadata["chronological"],
+        # Absent from snapshots written before concern lists kept their order
+        {int(row): concerns for row, concerns in metadata.get("custom_concerns", {}).items()}
+    )
+    return data, metadata["generation"]
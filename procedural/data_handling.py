@@ -6,14 +6,19 @@ and storage in the Mental Health Support System.
 """
 
 import datetime
-import json
-import os
+import random
+
+from monitoring.instrumentation import timed
+from procedural.journal import save_journaled, load_journaled
+from procedural.mood_store import MoodStore, timestamp_to_epoch, entry_epoch
+from procedural.sqlite_storage import SQLiteData, insert_mood_entries, insert_assessment
+from oop.records import MoodEntry, AssessmentResult, as_mood_entry, as_assessment_result
 
 # Initialize data storage
 def initialize_data():
     """Initialize empty data structures for the application"""
     data = {
-        "mood_entries": [],
+        "mood_entries": MoodStore(),
         "assessments_taken": [],
         "user_info": {
             "user_id": "user_1",
@@ -23,107 +28,124 @@ def initialize_data():
     }
     return data
 
+# Mood rating, journal text, concerns and sleep hours of the demonstration week, newest day first
+SAMPLE_DAYS = (
+    (6, "Feeling okay today. A bit stressed about the upcoming project deadline.", ("stress",), 6),
+    (4, "Had a difficult day. Failed my quiz and feeling down. Didn't sleep well.", ("stress", "depression"), 5),
+    (3, "Still feeling down. Having trouble concentrating on my work.", ("depression", "concentration"), 6),
+    (3, "Another tough day. Feeling overwhelmed with coursework.", ("stress", "anxiety"), 5),
+    (5, "Slightly better today. Had a good study session with friends.", ("stress",), 7),
+    (7, "Good day! Finished an assignment and feeling accomplished.", (), 8),
+    (6, "Normal day. Nothing special happened.", (), 7)
+)
+
+# Synthetic histories longer than this are packed more densely than one entry per day
+SAMPLE_SPAN = datetime.timedelta(days=3650)
+
 # Generate sample data for demonstration
-def generate_sample_data():
-    """Generate sample mood entries for demonstration purposes"""
+def generate_sample_data(num_entries=None, seed=0):
+    """Generate sample mood entries for demonstration purposes, newest first
+
+    With num_entries, generate that many synthetic entries instead of the
+    demonstration week; a given seed always yields the same values.
+    """
+    if num_entries is not None:
+        mood_entries = list(iter_sample_data(num_entries, seed))
+        mood_entries.reverse()
+        return mood_entries
+    
     mood_entries = []
     
     # Generate sample data for the past week using procedural programming
-    for i in range(7):
+    for i, (mood_rating, journal_text, concerns, sleep_hours) in enumerate(SAMPLE_DAYS):
         entry_date = datetime.datetime.now() - datetime.timedelta(days=i)
         
-        # Generate some realistic sample data
-        if i == 0:  # Today
-            mood_rating = 6
-            journal_text = "Feeling okay today. A bit stressed about the upcoming project deadline."
-            concerns = ["stress"]
-            sleep_hours = 6
-        elif i == 1:  # Yesterday
-            mood_rating = 4
-            journal_text = "Had a difficult day. Failed my quiz and feeling down. Didn't sleep well."
-            concerns = ["stress", "depression"]
-            sleep_hours = 5
-        elif i == 2:  # 2 days ago
-            mood_rating = 3
-            journal_text = "Still feeling down. Having trouble concentrating on my work."
-            concerns = ["depression", "concentration"]
-            sleep_hours = 6
-        elif i == 3:  # 3 days ago
-            mood_rating = 3
-            journal_text = "Another tough day. Feeling overwhelmed with coursework."
-            concerns = ["stress", "anxiety"]
-            sleep_hours = 5
-        elif i == 4:  # 4 days ago
-            mood_rating = 5
-            journal_text = "Slightly better today. Had a good study session with friends."
-            concerns = ["stress"]
-            sleep_hours = 7
-        elif i == 5:  # 5 days ago
-            mood_rating = 7
-            journal_text = "Good day! Finished an assignment and feeling accomplished."
-            concerns = []
-            sleep_hours = 8
-        else:  # 6 days ago
-            mood_rating = 6
-            journal_text = "Normal day. Nothing special happened."
-            concerns = []
-            sleep_hours = 7
-        
-        # Create a mood entry dictionary
-        mood_entry = {
-            "entry_id": f"entry_{i}",
-            "timestamp": entry_date.isoformat(),
-            "mood_rating": mood_rating,
-            "journal_entry": journal_text,
-            "concerns": concerns,
-            "sleep_hours": sleep_hours,
-            "exercised": i % 3 == 0  # Exercise every 3 days in our sample
-        }
+        # Create a mood entry record
+        mood_entry = MoodEntry(
+            f"entry_{i}",
+            entry_date,
+            mood_rating,
+            journal_text,
+            concerns,
+            sleep_hours,
+            i % 3 == 0  # Exercise every 3 days in our sample
+        )
         
         # Add to mood entries list
         mood_entries.append(mood_entry)
     
     return mood_entries
 
+# Generate a synthetic history lazily
+def iter_sample_data(num_entries, seed=0, end=None):
+    """Yield num_entries synthetic mood entries, oldest first, ending at `end` (default now)
+
+    Entries vary the demonstration week randomly; they are one day apart, or
+    closer when that would reach back further than SAMPLE_SPAN.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.datetime.now()
+    step = min(datetime.timedelta(days=1), SAMPLE_SPAN / max(num_entries, 1))
+    
+    for i in range(num_entries):
+        mood_rating, journal_text, concerns, sleep_hours = rng.choice(SAMPLE_DAYS)
+        age = num_entries - 1 - i
+        yield MoodEntry(
+            f"entry_{age}",
+            end - step * age,
+            min(10, max(1, mood_rating + rng.randint(-1, 1))),
+            journal_text,
+            concerns,
+            min(12, max(0, sleep_hours + rng.randint(-1, 1))),
+            age % 3 == 0
+        )
+
 # Save data to file
+@timed("save_data")
 def save_data(data, filename):
-    """Save data to a JSON file"""
+    """Save data to a snapshot file plus an append-only change log"""
+    if isinstance(data, SQLiteData):
+        # Every change is already committed to the database
+        return True
     try:
-        with open(filename, 'w') as file:
-            json.dump(data, file, indent=4)
+        save_journaled(data, filename)
         return True
     except Exception as e:
         print(f"Error saving data: {e}")
         return False
 
 # Load data from file
+@timed("load_data")
 def load_data(filename):
-    """Load data from a JSON file"""
+    """Load data from a JSON or binary snapshot file and replay its change log"""
     try:
-        if os.path.exists(filename):
-            with open(filename, 'r') as file:
-                return json.load(file)
-        else:
-            return None
+        return load_journaled(filename)
     except Exception as e:
         print(f"Error loading data: {e}")
         return None
 
+# Create a mood entry timestamped now
+def create_mood_entry(entry_id, mood_rating, journal_entry, concerns, sleep_hours, exercised):
+    """Create a new mood entry record without storing it"""
+    return MoodEntry(
+        entry_id,
+        datetime.datetime.now(),
+        mood_rating,
+        journal_entry,
+        concerns,
+        sleep_hours,
+        exercised
+    )
+
 # Add a new mood entry
 def add_mood_entry(data, mood_rating, journal_entry, concerns, sleep_hours, exercised):
     """Add a new mood entry to the data"""
-    entry_id = f"entry_{len(data['mood_entries'])}"
-    timestamp = datetime.datetime.now().isoformat()
+    # SQLite data numbers entries inside the insert transaction instead
+    entry_id = None if isinstance(data, SQLiteData) else f"entry_{len(data['mood_entries'])}"
+    new_entry = create_mood_entry(entry_id, mood_rating, journal_entry, concerns, sleep_hours, exercised)
     
-    new_entry = {
-        "entry_id": entry_id,
-        "timestamp": timestamp,
-        "mood_rating": mood_rating,
-        "journal_entry": journal_entry,
-        "concerns": concerns,
-        "sleep_hours": sleep_hours,
-        "exercised": exercised
-    }
+    if isinstance(data, SQLiteData):
+        return as_mood_entry(insert_mood_entries(data.pool, data.user_id, [new_entry], assign_ids=True)[0])
     
     data["mood_entries"].append(new_entry)
     return new_entry
@@ -131,13 +153,16 @@ def add_mood_entry(data, mood_rating, journal_entry, concerns, sleep_hours, exer
 # Get mood entries for a specific date range
 def get_mood_entries_by_date_range(data, start_date, end_date):
     """Get mood entries within a specific date range"""
-    start = datetime.datetime.fromisoformat(start_date)
-    end = datetime.datetime.fromisoformat(end_date)
+    if hasattr(data["mood_entries"], "between"):
+        # Columnar and SQLite stores answer range queries from their own indexes
+        return data["mood_entries"].between(start_date, end_date)
+    
+    start = timestamp_to_epoch(start_date)
+    end = timestamp_to_epoch(end_date)
     
     filtered_entries = []
     for entry in data["mood_entries"]:
-        entry_date = datetime.datetime.fromisoformat(entry["timestamp"])
-        if start <= entry_date <= end:
+        if start <= entry_epoch(entry) <= end:
             filtered_entries.append(entry)
     
     return filtered_entries
@@ -145,17 +170,19 @@ def get_mood_entries_by_date_range(data, start_date, end_date):
 # Add assessment result
 def add_assessment_result(data, assessment_type, score, level, description):
     """Add a new assessment result to the data"""
-    assessment_id = f"assessment_{len(data['assessments_taken'])}"
-    timestamp = datetime.datetime.now().isoformat()
+    # SQLite data numbers assessments inside the insert transaction instead
+    assessment_id = None if isinstance(data, SQLiteData) else f"assessment_{len(data['assessments_taken'])}"
+    new_assessment = AssessmentResult(
+        assessment_id,
+        datetime.datetime.now(),
+        assessment_type,
+        score,
+        level,
+        description
+    )
     
-    new_assessment = {
-        "assessment_id": assessment_id,
-        "timestamp": timestamp,
-        "assessment_type": assessment_type,
-        "score": score,
-        "level": level,
-        "description": description
-    }
+    if isinstance(data, SQLiteData):
+        return as_assessment_result(insert_assessment(data.pool, data.user_id, new_assessment))
     
     data["assessments_taken"].append(new_assessment)
     return new_assessment
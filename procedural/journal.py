@@ -0,0 +1,336 @@
+"""
+Journal Module - Procedural Programming Paradigm
+
+This module implements append-only, journaled persistence for the data dict
+of the Mental Health Support System. A data file consists of
+
+- a snapshot: the full data dict, written atomically, either as JSON or,
+  when the mood entries are a MoodStore, in the memory-mapped binary format
+  of procedural.binary_snapshot (set MHSS_SNAPSHOT_FORMAT=json to keep JSON), and
+- a write-ahead log next to it (`<filename>.log`): one compact JSON record
+  per line for every list item appended or replaced, or value replaced,
+  since the snapshot.
+
+Saving only appends the records that changed since the previous save, so
+adding a check-in to a MoodStore costs O(1) regardless of history length.
+MoodStores are append-only. Records edited in place through record[key] = value
+carry an edit stamp (oop.records), so list items are only looked at again when
+some record was edited since the previous save; other list items are compared
+with a copy of what was persisted. The log is
+periodically compacted into a new snapshot, and fsync calls are batched.
+Loading detects the snapshot format from its first bytes and converts list
+items to the record types the application appends.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+
+from procedural.mood_store import MoodStore, json_default
+from procedural.binary_snapshot import is_binary_snapshot, write_binary_snapshot, read_binary_snapshot
+from oop.records import Record, as_assessment_result, edit_mark, last_edit
+
+# fsync the log after this many unsynced records ...
+SYNC_EVERY_RECORDS = 32
+
+# ... or when the oldest unsynced record is this many seconds old
+SYNC_INTERVAL_SECONDS = 1.0
+
+# Rewrite the snapshot once the log holds this many records
+COMPACT_EVERY_RECORDS = 10000
+
+# Key of the snapshot generation stored inside snapshot files
+GENERATION_KEY = "_journal_generation"
+
+# Format of new snapshots of columnar data: "binary" or "json"
+SNAPSHOT_FORMAT = os.getenv("MHSS_SNAPSHOT_FORMAT", "binary")
+
+# Per-file journal state, keyed by absolute snapshot path
+_journals = {}
+_journals_lock = threading.Lock()
+
+# Get the path of the write-ahead log for a snapshot file
+def journal_path(filename):
+    """Get the write-ahead log path belonging to a snapshot file"""
+    return filename + ".log"
+
+# Encode one log record as a compact JSON line
+def _encode_record(generation, operation, key, value, index=None):
+    """Encode a journal record as a single JSON line"""
+    record = {"g": generation, "op": operation, "key": key, "value": value}
+    if index is not None:
+        record["index"] = index
+    return json.dumps(record, separators=(",", ":"), default=json_default) + "\n"
+
+# fsync a directory so renames inside it are durable
+def _sync_directory(path):
+    """fsync the directory containing path, where the platform supports it"""
+    try:
+        descriptor = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+# Copy a list item as it is persisted
+def _persisted_item(item):
+    """Get a detached copy of a list item in its JSON form (records and views as dicts)"""
+    return copy.deepcopy(item.to_dict() if hasattr(item, "to_dict") else item)
+
+# Remember what has been persisted for each key of the data dict
+def _persisted_shape(data):
+    """Get the persisted length of MoodStores and lists, copies of lists' non-record items and copies of other values"""
+    lists = {}
+    values = {}
+    for key, value in data.items():
+        if isinstance(value, MoodStore):
+            # Stored rows cannot change, so the length says what is persisted
+            lists[key] = len(value)
+        elif isinstance(value, list):
+            # Records stamp their own edits; other items are compared with a copy
+            copies = {index: _persisted_item(item) for index, item in enumerate(value) if not isinstance(item, Record)}
+            lists[key] = {"length": len(value), "copies": copies}
+        else:
+            values[key] = copy.deepcopy(value)
+    return lists, values
+
+# Get the log records bringing a persisted list up to date
+def _list_changes(generation, key, value, persisted, mark):
+    """Get (records, still appendable) for a list or MoodStore against its persisted shape
+
+    mark is the edit_mark() taken at the previous save; records stamped after it were edited since.
+    """
+    if isinstance(persisted, int):
+        if not isinstance(value, MoodStore) or len(value) < persisted:
+            return [], False
+        return [_encode_record(generation, "append", key, value[index]) for index in range(persisted, len(value))], True
+
+    length, copies = persisted["length"], persisted["copies"]
+    if not isinstance(value, list) or len(value) < length:
+        # The list was replaced by another type or shrunk; appends cannot express that
+        return [], False
+    edited = []
+    if last_edit() > mark:
+        # Some record was edited in place since the last save: find those in this list
+        edited = [index for index in range(length)
+                  if isinstance(value[index], Record) and value[index].edited > mark]
+    for index, saved in copies.items():
+        if _persisted_item(value[index]) != saved:
+            edited.append(index)
+
+    records = []
+    for index in sorted(edited):
+        current = _persisted_item(value[index])
+        records.append(_encode_record(generation, "replace", key, current, index))
+        if index in copies:
+            copies[index] = current
+    for index in range(length, len(value)):
+        item = value[index]
+        records.append(_encode_record(generation, "append", key, item))
+        if not isinstance(item, Record):
+            copies[index] = _persisted_item(item)
+    persisted["length"] = len(value)
+    return records, True
+
+# Write a full snapshot atomically and start a fresh log
+def _compact(state, data, filename):
+    """Write data as a new snapshot generation and truncate the log"""
+    generation = state["generation"] + 1
+
+    temporary = filename + ".tmp"
+    if SNAPSHOT_FORMAT == "binary" and isinstance(data.get("mood_entries"), MoodStore):
+        with open(temporary, "wb") as file:
+            write_binary_snapshot(data, file, generation)
+            file.flush()
+            os.fsync(file.fileno())
+    else:
+        snapshot = dict(data)
+        snapshot[GENERATION_KEY] = generation
+        with open(temporary, "w") as file:
+            json.dump(snapshot, file, separators=(",", ":"), default=json_default)
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temporary, filename)
+    _sync_directory(filename)
+
+    # Records of older generations are ignored on replay, so truncating the
+    # log after the snapshot is in place is crash-safe
+    if state["log"] is not None:
+        state["log"].close()
+    state["log"] = open(journal_path(filename), "w")
+    state["generation"] = generation
+    state["edit_mark"] = edit_mark()
+    state["lists"], state["values"] = _persisted_shape(data)
+    state["records"] = 0
+    state["unsynced"] = 0
+
+# Flush and fsync the log of one journal state
+def _sync(state):
+    """fsync pending log records"""
+    if state["log"] is not None and state["unsynced"]:
+        state["log"].flush()
+        os.fsync(state["log"].fileno())
+    state["unsynced"] = 0
+    state["last_sync"] = time.monotonic()
+
+# Create an empty journal state
+def _new_state(generation=0):
+    """Create journal state for a file without a known persisted shape"""
+    return {
+        "generation": generation,
+        "lists": None,
+        "values": None,
+        "edit_mark": 0,
+        "log": None,
+        "records": 0,
+        "unsynced": 0,
+        "last_sync": time.monotonic(),
+        "lock": threading.Lock()
+    }
+
+# Get (or create) the journal state of a file
+def _state_for(filename):
+    """Get the journal state of a snapshot file"""
+    path = os.path.abspath(filename)
+    with _journals_lock:
+        state = _journals.get(path)
+        if state is None:
+            state = _journals[path] = _new_state()
+        return state
+
+# Save data by appending the changes since the last save
+def save_journaled(data, filename):
+    """Persist data, appending only new records to the write-ahead log"""
+    state = _state_for(filename)
+    with state["lock"]:
+        if state["lists"] is None or set(data) != set(state["lists"]) | set(state["values"]):
+            # Nothing known about this file yet: start from a full snapshot
+            _compact(state, data, filename)
+            return
+
+        mark = edit_mark()
+        lines = []
+        for key, value in data.items():
+            if key in state["lists"]:
+                records, appendable = _list_changes(
+                    state["generation"], key, value, state["lists"][key], state["edit_mark"]
+                )
+                if not appendable:
+                    _compact(state, data, filename)
+                    return
+                lines.extend(records)
+            elif value != state["values"][key]:
+                lines.append(_encode_record(state["generation"], "set", key, value))
+
+        if lines:
+            try:
+                state["log"].write("".join(lines))
+                state["log"].flush()
+            except BaseException:
+                # The persisted copies already include these records: resync with a snapshot
+                state["lists"] = None
+                raise
+            # Persisted shapes of lists were updated item by item above
+            for key, value in data.items():
+                if key in state["lists"]:
+                    if isinstance(value, MoodStore):
+                        state["lists"][key] = len(value)
+                else:
+                    state["values"][key] = copy.deepcopy(value)
+            state["records"] += len(lines)
+            state["unsynced"] += len(lines)
+
+        state["edit_mark"] = mark
+
+        if state["records"] >= COMPACT_EVERY_RECORDS:
+            _compact(state, data, filename)
+        elif (state["unsynced"] >= SYNC_EVERY_RECORDS
+                or time.monotonic() - state["last_sync"] >= SYNC_INTERVAL_SECONDS):
+            _sync(state)
+
+# Load data by reading the snapshot and replaying the log tail
+def load_journaled(filename):
+    """Load data from a snapshot plus its write-ahead log, or None if neither exists"""
+    log_path = journal_path(filename)
+    if not os.path.exists(filename) and not os.path.exists(log_path):
+        return None
+
+    data = {}
+    generation = 0
+    if is_binary_snapshot(filename):
+        # Mapped, not parsed; the first replayed append copies the store
+        data, generation = read_binary_snapshot(filename)
+    elif os.path.exists(filename):
+        with open(filename, "r") as file:
+            data = json.load(file)
+        generation = data.pop(GENERATION_KEY, 0)
+
+    records = 0
+    if os.path.exists(log_path):
+        valid_length = 0
+        with open(log_path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash: everything after it is discarded
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_length += len(line)
+                if record["g"] != generation:
+                    continue
+                if record["op"] == "append":
+                    data.setdefault(record["key"], []).append(record["value"])
+                elif record["op"] == "replace":
+                    data[record["key"]][record["index"]] = record["value"]
+                else:
+                    data[record["key"]] = record["value"]
+                records += 1
+        if valid_length < os.path.getsize(log_path):
+            with open(log_path, "r+b") as file:
+                file.truncate(valid_length)
+
+    # Loaded items get the types the application appends: store rows and result records
+    if "mood_entries" in data and not isinstance(data["mood_entries"], MoodStore):
+        data["mood_entries"] = MoodStore.from_entries(data["mood_entries"])
+    if isinstance(data.get("assessments_taken"), list):
+        data["assessments_taken"] = [as_assessment_result(result) for result in data["assessments_taken"]]
+
+    state = _state_for(filename)
+    with state["lock"]:
+        if state["log"] is not None:
+            state["log"].close()
+        lock = state["lock"]
+        state.update(_new_state(generation))
+        state["lock"] = lock
+        state["log"] = open(log_path, "a")
+        state["edit_mark"] = edit_mark()
+        state["lists"], state["values"] = _persisted_shape(data)
+        state["records"] = records
+    return data
+
+# Force pending log records to disk
+def sync_journal(filename):
+    """fsync any log records of a file that are not yet durable"""
+    state = _state_for(filename)
+    with state["lock"]:
+        _sync(state)
+
+# Close the log of a file
+def close_journal(filename):
+    """fsync and close the log of a file, forgetting its journal state"""
+    path = os.path.abspath(filename)
+    with _journals_lock:
+        state = _journals.pop(path, None)
+    if state is not None:
+        with state["lock"]:
+            _sync(state)
+            if state["log"] is not None:
+                state["log"].close()
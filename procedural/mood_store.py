@@ -0,0 +1,435 @@
+"""
+Mood Store - Columnar storage for mood entries
+
+This module provides a NumPy-backed, column-oriented store for mood entries
+in the Mental Health Support System. Each field of a mood entry is kept in
+its own typed array instead of one Python dict per entry, which keeps memory
+low for long histories and lets the analysis functions work on whole columns.
+"""
+
+import datetime
+from collections.abc import Mapping
+from numbers import Integral
+
+import numpy as np
+
+# Field names of a mood entry, in the order used by the dict view
+MOOD_ENTRY_FIELDS = (
+    "entry_id",
+    "timestamp",
+    "mood_rating",
+    "journal_entry",
+    "concerns",
+    "sleep_hours",
+    "exercised"
+)
+
+# Bits of the per-entry flags column
+EXERCISED_FLAG = 1
+# Set when sleep_hours was given as an integer, so it reads back as one
+INTEGER_SLEEP_FLAG = 2
+
+# Concerns are stored as a 64-bit bitset; concerns interned after the first 64
+# have no bit, and entries mentioning them keep their list in _custom_concerns
+MAX_CONCERNS = 64
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Convert an ISO timestamp (or datetime) to integer microseconds since the epoch
+def timestamp_to_epoch(timestamp):
+    """Convert an ISO timestamp string or datetime to epoch microseconds"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+
+# Convert integer epoch microseconds back to an ISO timestamp string
+def epoch_to_timestamp(value):
+    """Convert epoch microseconds to an ISO timestamp string"""
+    return (EPOCH + datetime.timedelta(microseconds=int(value))).isoformat()
+
+# Get the epoch timestamp of a mood entry
+def entry_epoch(entry):
+    """Get an entry's timestamp as epoch microseconds; records and views skip parsing"""
+    epoch = getattr(entry, "epoch", None)
+    return timestamp_to_epoch(entry["timestamp"]) if epoch is None else epoch
+
+# json.dump default hook for columnar mood data
+def json_default(value):
+    """Serialize mood stores, entry views and records as plain lists and dicts"""
+    if isinstance(value, MoodStore):
+        return value.to_dicts()
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class MoodEntryView(Mapping):
+    """Read-only dict view of one row of a MoodStore"""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        """Initialize a view of the given row"""
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, key):
+        """Get a field of the entry"""
+        if key not in MOOD_ENTRY_FIELDS:
+            raise KeyError(key)
+        return self._store._value(self._row, key)
+
+    def __iter__(self):
+        """Iterate over the field names"""
+        return iter(MOOD_ENTRY_FIELDS)
+
+    def __len__(self):
+        """Get the number of fields"""
+        return len(MOOD_ENTRY_FIELDS)
+
+    def __repr__(self):
+        """Represent the view like the dict it stands for"""
+        return repr(self.to_dict())
+
+    @property
+    def epoch(self):
+        """Get the entry's timestamp as epoch microseconds"""
+        return int(self._store._timestamps[self._row])
+
+    def to_dict(self):
+        """Materialize the entry as a plain dict"""
+        return {field: self[field] for field in MOOD_ENTRY_FIELDS}
+
+class MoodStore:
+    """Columnar store of mood entries"""
+
+    def __init__(self, capacity=16):
+        """Initialize an empty store with room for `capacity` entries"""
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._ratings = np.empty(capacity, dtype=np.int8)
+        self._sleep_hours = np.empty(capacity, dtype=np.float32)
+        self._flags = np.empty(capacity, dtype=np.uint8)
+        self._concerns = np.empty(capacity, dtype=np.uint64)
+        # Numeric part of "entry_<n>" ids; -1 marks an id kept in _custom_ids
+        self._entry_numbers = np.empty(capacity, dtype=np.int64)
+        self._custom_ids = {}
+        # Concern lists the bitset cannot reproduce (order, duplicates or concerns without a bit)
+        self._custom_concerns = {}
+        # True while timestamps are non-decreasing, enabling binary search
+        self._chronological = True
+        # Journal text lives in one UTF-8 arena addressed by an offset table
+        self._journal_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._journal_arena = bytearray()
+        # Interned concern names; a concern's id is its bit in the bitset
+        self.concern_names = []
+        self._concern_ids = {}
+        # True while the columns are read-only buffers owned by someone else
+        self._shared = False
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Create a store holding the given mood entries"""
+        store = cls(capacity=len(entries) if hasattr(entries, "__len__") else 16)
+        store.extend(entries)
+        return store
+
+    @classmethod
+    def from_columns(cls, columns, journal_arena, concern_names=(), custom_ids=None, chronological=True,
+                     custom_concerns=None):
+        """Create a store over existing columns (as returned by columns()) without copying them
+
+        Read-only columns, such as views of a memory-mapped snapshot, stay shared
+        until the first append, which copies the store into memory it owns.
+        """
+        store = cls(capacity=1)
+        store._size = len(columns["timestamps"])
+        store._timestamps = columns["timestamps"]
+        store._ratings = columns["ratings"]
+        store._sleep_hours = columns["sleep_hours"]
+        store._flags = columns["flags"]
+        store._concerns = columns["concerns"]
+        store._entry_numbers = columns["entry_numbers"]
+        store._journal_offsets = columns["journal_offsets"]
+        store._journal_arena = journal_arena
+        store._custom_ids = dict(custom_ids or {})
+        store._custom_concerns = dict(custom_concerns or {})
+        store._chronological = chronological
+        for concern in concern_names:
+            store.intern_concern(concern)
+        store._shared = not all(column.flags.writeable for column in columns.values())
+        return store
+
+    def columns(self):
+        """Get the fixed-width columns of the stored entries, plus journal text offsets"""
+        return {
+            "timestamps": self._timestamps[:self._size],
+            "ratings": self._ratings[:self._size],
+            "sleep_hours": self._sleep_hours[:self._size],
+            "flags": self._flags[:self._size],
+            "concerns": self._concerns[:self._size],
+            "entry_numbers": self._entry_numbers[:self._size],
+            "journal_offsets": self._journal_offsets[:self._size + 1]
+        }
+
+    @property
+    def journal_arena(self):
+        """Get the UTF-8 journal text of all entries, addressed by the journal offsets"""
+        return self._journal_arena[:self._journal_offsets[self._size]]
+
+    @property
+    def custom_ids(self):
+        """Get {row: entry_id} for entries whose id is not of the form entry_<n>"""
+        return dict(self._custom_ids)
+
+    @property
+    def custom_concerns(self):
+        """Get {row: concerns} for entries whose concern list the bitset cannot reproduce"""
+        return {row: list(concerns) for row, concerns in self._custom_concerns.items()}
+
+    @property
+    def chronological(self):
+        """Whether timestamps are non-decreasing, so range queries can binary search"""
+        return self._chronological
+
+    def __len__(self):
+        """Get the number of entries"""
+        return self._size
+
+    def __iter__(self):
+        """Iterate over dict views of the entries"""
+        for row in range(self._size):
+            yield MoodEntryView(self, row)
+
+    def __getitem__(self, index):
+        """Get a dict view of an entry (negative indexes allowed)"""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("mood entry index out of range")
+        return MoodEntryView(self, index)
+
+    def __repr__(self):
+        """Represent the store"""
+        return f"MoodStore({self._size} entries)"
+
+    def _own_buffers(self):
+        """Replace shared read-only columns with copies the store owns (copy-on-write)"""
+        # Shared columns are exactly full, so growing by one entry copies every one of them
+        self._grow(self._size + 1)
+        self._journal_arena = bytearray(self._journal_arena)
+        self._shared = False
+
+    def _grow(self, needed):
+        """Make room for at least `needed` entries"""
+        capacity = len(self._timestamps)
+        if needed <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_timestamps", "_ratings", "_sleep_hours", "_flags",
+                     "_concerns", "_entry_numbers"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+        offsets = np.zeros(capacity + 1, dtype=np.int64)
+        offsets[:self._size + 1] = self._journal_offsets[:self._size + 1]
+        self._journal_offsets = offsets
+
+    def intern_concern(self, concern):
+        """Get the id of a concern, interning it if it is new; ids from MAX_CONCERNS on have no bit"""
+        concern_id = self._concern_ids.get(concern)
+        if concern_id is None:
+            concern_id = len(self.concern_names)
+            self.concern_names.append(concern)
+            self._concern_ids[concern] = concern_id
+        return concern_id
+
+    def _encode_concerns(self, concerns):
+        """Encode a list of concerns as (bitset, whether decoding the bitset gives the list back)"""
+        bits = 0
+        exact = True
+        previous_id = -1
+        for concern in concerns or ():
+            concern_id = self.intern_concern(concern)
+            # The bitset decodes to distinct concerns in interning order, within the first 64
+            exact = exact and previous_id < concern_id < MAX_CONCERNS
+            previous_id = concern_id
+            if concern_id < MAX_CONCERNS:
+                bits |= 1 << concern_id
+        return bits, exact
+
+    def _decode_concerns(self, bits):
+        """Decode a concern bitset back to a list of names"""
+        bits = int(bits)
+        concerns = []
+        concern_id = 0
+        while bits:
+            if bits & 1:
+                concerns.append(self.concern_names[concern_id])
+            bits >>= 1
+            concern_id += 1
+        return concerns
+
+    def append(self, entry):
+        """Append a mood entry (a dict or dict view) and return its row"""
+        row = self._size
+        if self._shared:
+            self._own_buffers()
+        self._grow(row + 1)
+
+        entry_id = entry["entry_id"]
+        prefix, _, number = entry_id.partition("_")
+        if prefix == "entry" and number.isdigit():
+            self._entry_numbers[row] = int(number)
+        else:
+            self._entry_numbers[row] = -1
+            self._custom_ids[row] = entry_id
+
+        self._timestamps[row] = entry_epoch(entry)
+        if row and self._timestamps[row] < self._timestamps[row - 1]:
+            self._chronological = False
+        self._ratings[row] = entry["mood_rating"]
+        sleep_hours = entry["sleep_hours"]
+        self._sleep_hours[row] = sleep_hours
+        self._flags[row] = ((EXERCISED_FLAG if entry["exercised"] else 0)
+                            | (INTEGER_SLEEP_FLAG if isinstance(sleep_hours, Integral) else 0))
+        self._concerns[row], exact = self._encode_concerns(entry["concerns"])
+        if not exact:
+            self._custom_concerns[row] = list(entry["concerns"])
+
+        self._journal_arena += (entry["journal_entry"] or "").encode("utf-8")
+        self._journal_offsets[row + 1] = len(self._journal_arena)
+
+        self._size = row + 1
+        return row
+
+    def extend(self, entries):
+        """Append several mood entries"""
+        for entry in entries:
+            self.append(entry)
+
+    def _value(self, row, field):
+        """Decode one field of one row"""
+        if field == "entry_id":
+            number = self._entry_numbers[row]
+            return self._custom_ids[row] if number < 0 else f"entry_{number}"
+        if field == "timestamp":
+            return epoch_to_timestamp(self._timestamps[row])
+        if field == "mood_rating":
+            return int(self._ratings[row])
+        if field == "journal_entry":
+            start, end = self._journal_offsets[row], self._journal_offsets[row + 1]
+            return str(self._journal_arena[start:end], "utf-8")
+        if field == "concerns":
+            concerns = self._custom_concerns.get(row)
+            return list(concerns) if concerns is not None else self._decode_concerns(self._concerns[row])
+        if field == "sleep_hours":
+            if self._flags[row] & INTEGER_SLEEP_FLAG:
+                return int(self._sleep_hours[row])
+            return round(float(self._sleep_hours[row]), 6)
+        return bool(self._flags[row] & EXERCISED_FLAG)
+
+    # Column accessors - views of the filled part of each array
+    @property
+    def timestamps(self):
+        """Epoch-microsecond timestamps of all entries"""
+        return self._timestamps[:self._size]
+
+    @property
+    def ratings(self):
+        """Mood ratings of all entries"""
+        return self._ratings[:self._size]
+
+    @property
+    def sleep_hours(self):
+        """Hours of sleep of all entries"""
+        return self._sleep_hours[:self._size]
+
+    @property
+    def exercised(self):
+        """Boolean array telling which entries record exercise"""
+        return (self._flags[:self._size] & EXERCISED_FLAG).astype(bool)
+
+    @property
+    def concern_bits(self):
+        """Concern bitsets of all entries, covering the first MAX_CONCERNS interned concerns"""
+        return self._concerns[:self._size]
+
+    def has_concern(self, concern):
+        """Boolean array telling which entries mention a concern"""
+        concern_id = self._concern_ids.get(concern)
+        if concern_id is None:
+            return np.zeros(self._size, dtype=bool)
+        if concern_id >= MAX_CONCERNS:
+            # Concerns without a bit only appear in the custom concern lists
+            mask = np.zeros(self._size, dtype=bool)
+            mask[[row for row, concerns in self._custom_concerns.items() if concern in concerns]] = True
+            return mask
+        return (self.concern_bits & np.uint64(1 << concern_id)) != 0
+
+    def newest_first(self):
+        """Row order sorting entries by timestamp, newest first"""
+        # Stable on the negated keys, so ties keep insertion order like sorted(reverse=True)
+        return np.argsort(-self.timestamps, kind="stable")
+
+    def ratings_newest_first(self):
+        """Mood ratings as a list ordered newest first"""
+        return self.ratings[self.newest_first()].tolist()
+
+    def summary(self):
+        """Aggregate counts and sums used by the analysis functions"""
+        sleep_hours = self.sleep_hours.astype(np.float64)
+        empty = self._size == 0
+        return {
+            "count": self._size,
+            "rating_sum": int(self.ratings.sum(dtype=np.int64)),
+            "sleep_sum": float(sleep_hours.sum()),
+            "min_sleep": None if empty else float(sleep_hours.min()),
+            "max_sleep": None if empty else float(sleep_hours.max()),
+            "exercise_count": int(np.count_nonzero(self._flags[:self._size] & EXERCISED_FLAG))
+        }
+
+    def take(self, rows):
+        """Create a new store holding the given rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        subset = MoodStore(capacity=len(rows))
+        subset._size = len(rows)
+        subset._timestamps[:len(rows)] = self._timestamps[rows]
+        subset._ratings[:len(rows)] = self._ratings[rows]
+        subset._sleep_hours[:len(rows)] = self._sleep_hours[rows]
+        subset._flags[:len(rows)] = self._flags[rows]
+        subset._concerns[:len(rows)] = self._concerns[rows]
+        subset._entry_numbers[:len(rows)] = self._entry_numbers[rows]
+        subset.concern_names = list(self.concern_names)
+        subset._concern_ids = dict(self._concern_ids)
+        subset._chronological = bool(np.all(np.diff(subset.timestamps) >= 0))
+        for new_row, row in enumerate(rows.tolist()):
+            if row in self._custom_ids:
+                subset._custom_ids[new_row] = self._custom_ids[row]
+            if row in self._custom_concerns:
+                subset._custom_concerns[new_row] = self._custom_concerns[row]
+            start, end = self._journal_offsets[row], self._journal_offsets[row + 1]
+            subset._journal_arena += self._journal_arena[start:end]
+            subset._journal_offsets[new_row + 1] = len(subset._journal_arena)
+        return subset
+
+    def between(self, start, end):
+        """Create a new store with the entries whose timestamp is in [start, end]"""
+        start, end = timestamp_to_epoch(start), timestamp_to_epoch(end)
+        timestamps = self.timestamps
+        if self._chronological:
+            # O(log n) binary search on the sorted timestamp column
+            first = np.searchsorted(timestamps, start, side="left")
+            last = np.searchsorted(timestamps, end, side="right")
+            return self.take(np.arange(first, max(first, last)))
+        rows = np.flatnonzero((timestamps >= start) & (timestamps <= end))
+        return self.take(rows)
+
+    def to_dicts(self):
+        """Materialize all entries as a list of plain dicts"""
+        return [view.to_dict() for view in self]
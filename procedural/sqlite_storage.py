@@ -0,0 +1,492 @@
+"""
+SQLite Storage Module - Procedural Programming Paradigm
+
+This module stores the data of the Mental Health Support System in an
+embedded SQLite database instead of in-memory dicts and JSON files. Users,
+mood entries, normalized concerns and assessment results live in their own
+tables, indexed on (user_id, timestamp); every query is a fixed SQL string,
+so sqlite3's statement cache reuses the prepared statements.
+"""
+
+import json
+import operator
+import queue
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from procedural.mood_store import timestamp_to_epoch, epoch_to_timestamp, entry_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    email TEXT NOT NULL,
+    preferences TEXT NOT NULL DEFAULT '{}',
+    mood_entry_count INTEGER NOT NULL DEFAULT 0,
+    assessment_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS concerns (
+    concern_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS mood_entries (
+    row_id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users (user_id),
+    entry_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    mood_rating INTEGER NOT NULL,
+    journal_entry TEXT NOT NULL,
+    sleep_hours REAL NOT NULL,
+    exercised INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mood_entries_user_time ON mood_entries (user_id, timestamp);
+CREATE TABLE IF NOT EXISTS mood_entry_concerns (
+    row_id INTEGER NOT NULL REFERENCES mood_entries (row_id),
+    position INTEGER NOT NULL,
+    concern_id INTEGER NOT NULL REFERENCES concerns (concern_id),
+    PRIMARY KEY (row_id, position)
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    row_id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users (user_id),
+    assessment_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    assessment_type TEXT NOT NULL,
+    score NUMERIC NOT NULL,
+    level TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assessments_user_time ON assessments (user_id, timestamp);
+"""
+
+# Statements used by this module; fixed strings so they stay in the statement cache
+INSERT_USER = (
+    "INSERT OR IGNORE INTO users (user_id, username, email, preferences) VALUES (?, ?, ?, ?)"
+)
+UPDATE_USER = "UPDATE users SET username = ?, email = ?, preferences = ? WHERE user_id = ?"
+SELECT_USER = "SELECT user_id, username, email, preferences FROM users WHERE user_id = ?"
+SELECT_USER_IDS = "SELECT user_id FROM users ORDER BY user_id"
+SELECT_USER_IDS_BETWEEN = "SELECT user_id FROM users WHERE user_id BETWEEN ? AND ? ORDER BY user_id"
+RESERVE_MOOD_ENTRY_NUMBERS = (
+    "UPDATE users SET mood_entry_count = mood_entry_count + ? WHERE user_id = ?"
+)
+RESERVE_ASSESSMENT_NUMBERS = (
+    "UPDATE users SET assessment_count = assessment_count + ? WHERE user_id = ?"
+)
+SELECT_COUNTERS = "SELECT mood_entry_count, assessment_count FROM users WHERE user_id = ?"
+SELECT_MAX_MOOD_ROW = "SELECT COALESCE(MAX(row_id), 0) FROM mood_entries"
+INSERT_CONCERN = "INSERT OR IGNORE INTO concerns (name) VALUES (?)"
+SELECT_CONCERN = "SELECT concern_id FROM concerns WHERE name = ?"
+INSERT_MOOD_ENTRY = (
+    "INSERT INTO mood_entries (row_id, user_id, entry_id, timestamp, mood_rating, journal_entry,"
+    " sleep_hours, exercised) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_MOOD_ENTRY_CONCERN = (
+    "INSERT INTO mood_entry_concerns (row_id, position, concern_id) VALUES (?, ?, ?)"
+)
+INSERT_ASSESSMENT = (
+    "INSERT INTO assessments (user_id, assessment_id, timestamp, assessment_type, score, level,"
+    " description) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_ASSESSMENTS = (
+    "SELECT assessment_id, timestamp, assessment_type, score, level, description"
+    " FROM assessments WHERE user_id = ? ORDER BY row_id"
+)
+SELECT_MOOD_ENTRIES = (
+    "SELECT row_id, entry_id, timestamp, mood_rating, journal_entry, sleep_hours, exercised"
+    " FROM mood_entries WHERE user_id = ? AND timestamp BETWEEN ? AND ? ORDER BY row_id"
+)
+SELECT_MOOD_ENTRY_AT = (
+    "SELECT row_id, entry_id, timestamp, mood_rating, journal_entry, sleep_hours, exercised"
+    " FROM mood_entries WHERE user_id = ? AND timestamp BETWEEN ? AND ? ORDER BY row_id LIMIT 1 OFFSET ?"
+)
+SELECT_MOOD_ENTRY_FROM_END = (
+    "SELECT row_id, entry_id, timestamp, mood_rating, journal_entry, sleep_hours, exercised"
+    " FROM mood_entries WHERE user_id = ? AND timestamp BETWEEN ? AND ? ORDER BY row_id DESC LIMIT 1 OFFSET ?"
+)
+SELECT_CONCERNS_OF_ROW = (
+    "SELECT c.name FROM mood_entry_concerns AS mec JOIN concerns AS c ON c.concern_id = mec.concern_id"
+    " WHERE mec.row_id = ? ORDER BY mec.position"
+)
+SELECT_MOOD_ENTRY_CONCERNS = (
+    "SELECT mec.row_id, c.name FROM mood_entry_concerns AS mec"
+    " JOIN concerns AS c ON c.concern_id = mec.concern_id"
+    " WHERE mec.row_id IN (SELECT row_id FROM mood_entries"
+    " WHERE user_id = ? AND timestamp BETWEEN ? AND ?)"
+    " ORDER BY mec.row_id, mec.position"
+)
+SELECT_MOOD_SUMMARY = (
+    "SELECT COUNT(*), COALESCE(SUM(mood_rating), 0), COALESCE(SUM(sleep_hours), 0.0),"
+    " MIN(sleep_hours), MAX(sleep_hours), COALESCE(SUM(exercised), 0)"
+    " FROM mood_entries WHERE user_id = ? AND timestamp BETWEEN ? AND ?"
+)
+SELECT_RATINGS_NEWEST_FIRST = (
+    "SELECT mood_rating FROM mood_entries WHERE user_id = ? AND timestamp BETWEEN ? AND ?"
+    " ORDER BY timestamp DESC, row_id ASC"
+)
+SELECT_MOOD_COLUMNS_BETWEEN = (
+    "SELECT user_id, timestamp, mood_rating, sleep_hours, exercised FROM mood_entries"
+    " WHERE user_id BETWEEN ? AND ? ORDER BY user_id, timestamp DESC, row_id"
+)
+
+# Timestamp bounds covering every entry
+MIN_TIMESTAMP = -(2 ** 63)
+MAX_TIMESTAMP = 2 ** 63 - 1
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared between threads"""
+
+    def __init__(self, database, size=4):
+        """Open `size` connections to the database file (or ":memory:")"""
+        self.database = database
+        if database == ":memory:":
+            # Named shared-cache memory database, so all pooled connections see it
+            target = f"file:mental-health-{id(self)}?mode=memory&cache=shared"
+        else:
+            target = f"file:{database}"
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        for _ in range(size):
+            connection = sqlite3.connect(
+                target,
+                uri=True,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=256
+            )
+            connection.execute("PRAGMA foreign_keys = ON")
+            if database == ":memory:":
+                # Shared-cache tables are locked during writes unless readers opt out
+                connection.execute("PRAGMA read_uncommitted = 1")
+            else:
+                connection.execute("PRAGMA journal_mode = WAL")
+                connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA busy_timeout = 5000")
+            self._connections.append(connection)
+            self._idle.put(connection)
+        self._concern_ids = {}
+        self._concern_lock = threading.Lock()
+        # SQLite allows a single writer; queue writers here instead of busy-waiting
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        connection = self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection inside a write transaction"""
+        with self._write_lock, self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                # Concern ids cached during the transaction may have been rolled back
+                with self._concern_lock:
+                    self._concern_ids.clear()
+                raise
+            connection.execute("COMMIT")
+
+    def concern_id(self, connection, name):
+        """Get the id of a concern name, inserting it on first use"""
+        concern_id = self._concern_ids.get(name)
+        if concern_id is None:
+            connection.execute(INSERT_CONCERN, (name,))
+            concern_id = connection.execute(SELECT_CONCERN, (name,)).fetchone()[0]
+            with self._concern_lock:
+                self._concern_ids[name] = concern_id
+        return concern_id
+
+    def close(self):
+        """Close every connection of the pool"""
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+
+# Open a database and make sure the schema exists
+def open_database(database, pool_size=4):
+    """Open an SQLite database as a connection pool and create missing tables"""
+    pool = ConnectionPool(database, pool_size)
+    with pool.connection() as connection:
+        connection.executescript(SCHEMA)
+    return pool
+
+# Create or update a user row
+def save_user(pool, user_info, preferences=None):
+    """Insert a user, or update the stored username, email and preferences"""
+    preferences_json = json.dumps(preferences or {})
+    with pool.transaction() as connection:
+        connection.execute(INSERT_USER, (
+            user_info["user_id"], user_info["username"], user_info["email"], preferences_json
+        ))
+        if preferences is not None:
+            connection.execute(UPDATE_USER, (
+                user_info["username"], user_info["email"], preferences_json, user_info["user_id"]
+            ))
+
+# Load a user row
+def load_user(pool, user_id):
+    """Get a user's info and preferences, or None if the user does not exist"""
+    with pool.connection() as connection:
+        row = connection.execute(SELECT_USER, (user_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "user_id": row[0],
+        "username": row[1],
+        "email": row[2],
+        "preferences": json.loads(row[3])
+    }
+
+# List every stored user id
+def list_user_ids(pool):
+    """Get the ids of all stored users"""
+    with pool.connection() as connection:
+        return [row[0] for row in connection.execute(SELECT_USER_IDS)]
+
+# List the stored user ids within a range
+def list_user_ids_between(pool, first_user_id, last_user_id):
+    """Get the ids of stored users in [first_user_id, last_user_id], sorted"""
+    with pool.connection() as connection:
+        return [row[0] for row in connection.execute(SELECT_USER_IDS_BETWEEN, (first_user_id, last_user_id))]
+
+# Bulk insert mood entries for one user
+def insert_mood_entries(pool, user_id, entries, assign_ids=False):
+    """Insert mood entries in one transaction; assign_ids numbers them entry_<n>"""
+    entries = list(entries)
+    if not entries:
+        return entries
+    with pool.transaction() as connection:
+        cursor = connection.execute(RESERVE_MOOD_ENTRY_NUMBERS, (len(entries), user_id))
+        if cursor.rowcount != 1:
+            raise KeyError(f"Unknown user: {user_id}")
+        next_number = connection.execute(SELECT_COUNTERS, (user_id,)).fetchone()[0] - len(entries)
+        # Row ids are assigned here so both tables can be filled with executemany
+        next_row = connection.execute(SELECT_MAX_MOOD_ROW).fetchone()[0] + 1
+
+        entry_rows = []
+        concern_rows = []
+        for offset, entry in enumerate(entries):
+            if assign_ids:
+                entry = dict(entry, entry_id=f"entry_{next_number + offset}")
+                entries[offset] = entry
+            row_id = next_row + offset
+            entry_rows.append((
+                row_id,
+                user_id,
+                entry["entry_id"],
+                entry_epoch(entry),
+                entry["mood_rating"],
+                entry["journal_entry"] or "",
+                entry["sleep_hours"],
+                1 if entry["exercised"] else 0
+            ))
+            for position, concern in enumerate(entry["concerns"] or ()):
+                concern_rows.append((row_id, position, pool.concern_id(connection, concern)))
+
+        connection.executemany(INSERT_MOOD_ENTRY, entry_rows)
+        connection.executemany(INSERT_MOOD_ENTRY_CONCERN, concern_rows)
+    return entries
+
+# Insert one assessment result for one user
+def insert_assessment(pool, user_id, assessment):
+    """Insert an assessment result; an assessment_id of None is assigned assessment_<n>"""
+    with pool.transaction() as connection:
+        cursor = connection.execute(RESERVE_ASSESSMENT_NUMBERS, (1, user_id))
+        if cursor.rowcount != 1:
+            raise KeyError(f"Unknown user: {user_id}")
+        if assessment["assessment_id"] is None:
+            number = connection.execute(SELECT_COUNTERS, (user_id,)).fetchone()[1] - 1
+            assessment = dict(assessment, assessment_id=f"assessment_{number}")
+        connection.execute(INSERT_ASSESSMENT, (
+            user_id,
+            assessment["assessment_id"],
+            entry_epoch(assessment),
+            assessment["assessment_type"],
+            assessment["score"],
+            assessment["level"],
+            assessment["description"]
+        ))
+    return assessment
+
+# Query assessment results for one user
+def select_assessments(pool, user_id):
+    """Get a user's assessment results in insertion order"""
+    with pool.connection() as connection:
+        rows = connection.execute(SELECT_ASSESSMENTS, (user_id,)).fetchall()
+    return [
+        {
+            "assessment_id": row[0],
+            "timestamp": epoch_to_timestamp(row[1]),
+            "assessment_type": row[2],
+            "score": row[3],
+            "level": row[4],
+            "description": row[5]
+        }
+        for row in rows
+    ]
+
+# Query mood entries for one user within a timestamp range
+def select_mood_entries(pool, user_id, start=MIN_TIMESTAMP, end=MAX_TIMESTAMP):
+    """Get a user's mood entries with epoch timestamps in [start, end], in insertion order"""
+    with pool.connection() as connection:
+        rows = connection.execute(SELECT_MOOD_ENTRIES, (user_id, start, end)).fetchall()
+        concern_rows = connection.execute(SELECT_MOOD_ENTRY_CONCERNS, (user_id, start, end)).fetchall()
+
+    concerns = {}
+    for row_id, name in concern_rows:
+        concerns.setdefault(row_id, []).append(name)
+    return [_mood_entry_dict(row, concerns.get(row[0], [])) for row in rows]
+
+# Query one mood entry by position
+def select_mood_entry_at(pool, user_id, index, start=MIN_TIMESTAMP, end=MAX_TIMESTAMP):
+    """Get the entry at a position of select_mood_entries' result (negative counts from the end)
+
+    Only that row and its concerns are read. Raises IndexError when out of range.
+    """
+    statement, offset = (SELECT_MOOD_ENTRY_AT, index) if index >= 0 else (SELECT_MOOD_ENTRY_FROM_END, -index - 1)
+    with pool.connection() as connection:
+        row = connection.execute(statement, (user_id, start, end, offset)).fetchone()
+        if row is None:
+            raise IndexError("mood entry index out of range")
+        concerns = [name for name, in connection.execute(SELECT_CONCERNS_OF_ROW, (row[0],))]
+    return _mood_entry_dict(row, concerns)
+
+# Build the dict of one selected mood entry row
+def _mood_entry_dict(row, concerns):
+    """Convert a (row_id, entry_id, timestamp, ...) row and its concerns to a mood entry dict"""
+    return {
+        "entry_id": row[1],
+        "timestamp": epoch_to_timestamp(row[2]),
+        "mood_rating": row[3],
+        "journal_entry": row[4],
+        "concerns": concerns,
+        "sleep_hours": row[5],
+        "exercised": bool(row[6])
+    }
+
+# Query the analysis columns of many users' mood entries
+def select_mood_columns(pool, first_user_id, last_user_id):
+    """Get (user_id, epoch, rating, sleep, exercised) rows of users in [first_user_id, last_user_id]
+
+    Rows are grouped by user, newest first with ties in insertion order: the order
+    in which User.get_recent_mood_entries returns a loaded user's entries.
+    """
+    with pool.connection() as connection:
+        return connection.execute(SELECT_MOOD_COLUMNS_BETWEEN, (first_user_id, last_user_id)).fetchall()
+
+# Aggregate mood entries inside SQLite
+def select_mood_summary(pool, user_id, start=MIN_TIMESTAMP, end=MAX_TIMESTAMP):
+    """Compute count, sums and sleep extremes of a user's mood entries in SQL"""
+    with pool.connection() as connection:
+        row = connection.execute(SELECT_MOOD_SUMMARY, (user_id, start, end)).fetchone()
+    return {
+        "count": row[0],
+        "rating_sum": row[1],
+        "sleep_sum": row[2],
+        "min_sleep": row[3],
+        "max_sleep": row[4],
+        "exercise_count": row[5]
+    }
+
+class SQLiteMoodEntries:
+    """Lazy view of one user's mood entries (optionally a timestamp range) in SQLite"""
+
+    def __init__(self, pool, user_id, start=MIN_TIMESTAMP, end=MAX_TIMESTAMP):
+        """Initialize a view over entries with epoch timestamps in [start, end]"""
+        self.pool = pool
+        self.user_id = user_id
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        """Count the entries in SQL"""
+        return self.summary()["count"]
+
+    def __iter__(self):
+        """Iterate over the entries as dicts"""
+        return iter(select_mood_entries(self.pool, self.user_id, self.start, self.end))
+
+    def __getitem__(self, index):
+        """Get one entry as a dict, reading only that row; slices read the whole range"""
+        if isinstance(index, slice):
+            return select_mood_entries(self.pool, self.user_id, self.start, self.end)[index]
+        return select_mood_entry_at(self.pool, self.user_id, operator.index(index), self.start, self.end)
+
+    def append(self, entry):
+        """Insert an entry that already has an entry_id"""
+        insert_mood_entries(self.pool, self.user_id, [entry])
+
+    def extend(self, entries):
+        """Bulk insert entries that already have entry_ids"""
+        insert_mood_entries(self.pool, self.user_id, entries)
+
+    def between(self, start_date, end_date):
+        """Narrow the view to an ISO timestamp range"""
+        return SQLiteMoodEntries(
+            self.pool,
+            self.user_id,
+            max(self.start, timestamp_to_epoch(start_date)),
+            min(self.end, timestamp_to_epoch(end_date))
+        )
+
+    def summary(self):
+        """Aggregate counts and sums used by the analysis functions, computed in SQL"""
+        return select_mood_summary(self.pool, self.user_id, self.start, self.end)
+
+    def ratings_newest_first(self):
+        """Mood ratings ordered newest first, sorted by the (user_id, timestamp) index"""
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                SELECT_RATINGS_NEWEST_FIRST, (self.user_id, self.start, self.end)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+class SQLiteData(Mapping):
+    """Data dict of one user backed by SQLite, usable with the data_handling functions"""
+
+    def __init__(self, pool, user_id):
+        """Initialize the data of an existing user"""
+        self.pool = pool
+        self.user_id = user_id
+
+    def __getitem__(self, key):
+        """Get mood_entries, assessments_taken or user_info"""
+        if key == "mood_entries":
+            return SQLiteMoodEntries(self.pool, self.user_id)
+        if key == "assessments_taken":
+            return select_assessments(self.pool, self.user_id)
+        if key == "user_info":
+            user = load_user(self.pool, self.user_id)
+            return {field: user[field] for field in ("user_id", "username", "email")}
+        raise KeyError(key)
+
+    def __iter__(self):
+        """Iterate over the keys of the data dict"""
+        return iter(("mood_entries", "assessments_taken", "user_info"))
+
+    def __len__(self):
+        """Get the number of keys"""
+        return 3
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create or update a user of a server-mode database")
+    parser.add_argument("database", help="SQLite database file of the server mode (MHSS_DATABASE)")
+    parser.add_argument("user_id", help="user ID, as the authentication proxy passes it")
+    parser.add_argument("username")
+    parser.add_argument("email")
+    args = parser.parse_args()
+
+    pool = open_database(args.database, pool_size=1)
+    save_user(pool, {"user_id": args.user_id, "username": args.username, "email": args.email})
+    pool.close()
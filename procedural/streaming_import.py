@@ -0,0 +1,250 @@
+"""
+Streaming Import Module - Procedural Programming Paradigm
+
+This module imports large historical exports of mood entries without
+loading the whole file into memory. Entries are parsed one at a time from
+JSON Lines files or from JSON arrays (either a top-level array or the
+"mood_entries" array of a data dict), grouped into batches and handed to
+sinks such as a User, a MoodStore or a StreamingSummary aggregator.
+"""
+
+import json
+import os
+import time
+
+# Bytes read from the file per chunk
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+class _ChunkReader:
+    """Incremental JSON tokenizer over a file read in fixed-size chunks"""
+
+    def __init__(self, file, chunk_size):
+        """Initialize a reader over an open text file"""
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read the next chunk, dropping the consumed part of the buffer"""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self):
+        """Get the next non-whitespace character without consuming it ("" at EOF)"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def expect(self, characters):
+        """Consume the next non-whitespace character, which must be one of `characters`"""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} in JSON input, found {character!r}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """Decode the next JSON value, reading more chunks until it is complete"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number ending exactly at the buffer end may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.position = end
+            return value
+
+# Stream the elements of the JSON array at the reader's position
+def _iter_array(reader):
+    """Yield the elements of a JSON array one at a time"""
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.position += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",]") == "]":
+            return
+
+# Read mood entries from a JSON Lines file
+def iter_json_lines(filename):
+    """Yield one mood entry per non-empty line of a JSON Lines file"""
+    with open(filename, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+# Read mood entries from a JSON array file
+def iter_json_array(filename, chunk_size=CHUNK_SIZE):
+    """Yield mood entries from a top-level JSON array or a data dict's "mood_entries" array"""
+    with open(filename, "r", encoding="utf-8") as file:
+        reader = _ChunkReader(file, chunk_size)
+        if reader.peek() == "[":
+            yield from _iter_array(reader)
+            return
+
+        # A data dict: skip other keys and stream only the mood entries
+        reader.expect("{")
+        found = False
+        if reader.peek() == "}":
+            reader.position += 1
+        else:
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                if key == "mood_entries":
+                    found = True
+                    yield from _iter_array(reader)
+                else:
+                    reader.value()
+                if reader.expect(",}") == "}":
+                    break
+        if not found:
+            raise ValueError(f"{filename} is a JSON object without a mood_entries array")
+
+# Tell a JSON Lines export from a data dict by content
+def _is_json_lines(filename, chunk_size=CHUNK_SIZE):
+    """Whether a file starting with "{" holds one object per line rather than a data dict
+
+    Only the first object is read, and a data dict only up to its "mood_entries" key.
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        reader = _ChunkReader(file, chunk_size)
+        reader.expect("{")
+        keys = set()
+        if reader.peek() == "}":
+            reader.position += 1
+        else:
+            while True:
+                key = reader.value()
+                if key == "mood_entries":
+                    return False
+                keys.add(key)
+                reader.expect(":")
+                reader.value()
+                if reader.expect(",}") == "}":
+                    break
+        # Another top-level value after the first object means JSON Lines
+        if reader.peek():
+            return True
+        if "mood_rating" in keys:
+            # A single mood entry
+            return True
+        raise ValueError(f"{filename} is a JSON object without a mood_entries array")
+
+# Read mood entries from any supported export format
+def iter_mood_entries(filename, chunk_size=CHUNK_SIZE):
+    """Yield mood entries from a JSON Lines or JSON export, detected by content, not by name"""
+    with open(filename, "r", encoding="utf-8") as file:
+        first = file.read(1)
+        while first and first.isspace():
+            first = file.read(1)
+    if first == "[" or (first == "{" and not _is_json_lines(filename, chunk_size)):
+        return iter_json_array(filename, chunk_size)
+    return iter_json_lines(filename)
+
+# Group an iterable into lists of at most `size` items
+def batched(items, size):
+    """Yield lists of up to `size` consecutive items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Sink adding every entry of a batch to a User
+def user_sink(user):
+    """Create a sink that adds each imported entry to a User"""
+    def sink(batch):
+        for entry in batch:
+            user.add_mood_entry(entry)
+    return sink
+
+# Sink feeding every entry of a batch to an aggregator with observe()
+def aggregator_sink(aggregator):
+    """Create a sink that feeds each imported entry to aggregator.observe"""
+    def sink(batch):
+        for entry in batch:
+            aggregator.observe(entry)
+    return sink
+
+# Stream an export into sinks
+def import_mood_entries(filename, sinks, batch_size=1000, progress=None, progress_every=100):
+    """Import mood entries in batches, calling every sink with each batch
+
+    `sinks` are callables taking a list of entries (a MoodStore's `extend`,
+    user_sink(user), aggregator_sink(summary), ...). `progress`, if given,
+    is called with the running report every `progress_every` batches.
+    Returns a report of entries, bytes, elapsed seconds and throughput.
+    """
+    total_bytes = os.path.getsize(filename)
+    started = time.perf_counter()
+    entries = 0
+    batches = 0
+
+    def report(finished=False):
+        elapsed = time.perf_counter() - started
+        return {
+            "entries": entries,
+            "batches": batches,
+            "bytes": total_bytes,
+            "seconds": elapsed,
+            "entries_per_second": entries / elapsed if elapsed else 0.0,
+            # Throughput in bytes is only known once the whole file is consumed
+            "megabytes_per_second": total_bytes / elapsed / 1e6 if finished and elapsed else None
+        }
+
+    for batch in batched(iter_mood_entries(filename), batch_size):
+        for sink in sinks:
+            sink(batch)
+        entries += len(batch)
+        batches += 1
+        if progress is not None and batches % progress_every == 0:
+            progress(report())
+
+    final_report = report(finished=True)
+    if progress is not None:
+        progress(final_report)
+    return final_report
+
+# Print a progress line for a running import
+def print_progress(report):
+    """Print an import progress report"""
+    line = f"{report['entries']:,} entries in {report['seconds']:.1f}s ({report['entries_per_second']:,.0f} entries/s"
+    if report["megabytes_per_second"] is not None:
+        line += f", {report['megabytes_per_second']:.1f} MB/s"
+    print(line + ")")
+
+if __name__ == "__main__":
+    import sys
+
+    from functional.incremental_insights import StreamingSummary
+
+    # Summarize an export with constant memory: running aggregates over every
+    # entry, and mood patterns over the newest week as on the dashboard
+    summary = StreamingSummary(recent=7)
+    import_mood_entries(sys.argv[1], [aggregator_sink(summary)], progress=print_progress)
+    print(f"Average mood: {summary.average_mood():.2f}")
+    for insight in summary.insights():
+        print(f"- {insight['description']}")